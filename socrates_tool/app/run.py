@@ -6,6 +6,7 @@ import subprocess
 
 # to use the module ast_helper
 sys.path.append("./tools/overflow/")
+sys.path.append("./template/tools/overflow/")
 
 def exec_command(command, showstdout=False):
     
@@ -52,12 +53,35 @@ def str2bool(v):
         raise argparse.ArgumentTypeError('Boolean value expected.')
 
 def clean():
-    shutil.rmtree('./tmp')
     os.remove('./tmp.sol')
     os.remove('./contract_tmp.sol')
 
+def check_compiles(source):
+    """
+    Compiles the source with solc before setting up the project.
+    Contracts that already failed in a previous run are rejected
+    using the diagnostic saved in the compilation cache.
+    The compilation is the one of main.py (asthelper.compile_contract),
+    so the analysis of the source reads it from the cache.
+    :return: the result of compile_contract, None if the source does not compile
+    """
+    from modules import asthelper
+
+    try:
+        return asthelper.compile_contract(source)
+    except Exception as e:
+        if e.args[0] != 'AstCompileErr':
+            raise e
+        print("The contract cannot be compiled with solc:")
+        print(e.args[1])
+        return None
+
 def main(args):
     
+    # === Check that the contract compiles
+    if args.precheck and check_compiles(args.source) is None:
+        sys.exit(-1)
+
     # === Create new folder
     # it will delete and re-create the folder if it already exists
     print("creating new folder")
@@ -109,7 +133,9 @@ def main(args):
         print("running z3 analysis")
 
         if args.instrument:
-            instrumentation_command = "python3 ./tools/overflow/utils/instrumentation.py -o tmp.sol -s contract_tmp.sol"
+            # if-revert, throw and assert are guards of the analysis, the source does not need to be rewritten
+            instrumentation_command = "python3 ./tools/overflow/utils/instrumentation.py -o tmp.sol -s contract_tmp.sol "
+            instrumentation_command += '-t="0" -if="0" -a="0"'
             exec_command(instrumentation_command)
             exec_command("python3 ./tools/overflow/main.py -s tmp.sol -o outputs -c " + args.contract)
         else:
@@ -180,6 +206,8 @@ if __name__ == "__main__":
 
     parser.add_argument('-i', '--instrument', type=str2bool, help='Instrument for Z3 analysis',
                         default=1, choices=[False, True])
+    parser.add_argument('-p', '--precheck', type=str2bool, help='Reject contracts that do not compile with solc',
+                        default=1, choices=[False, True])
     
     
     requiredNamed = parser.add_argument_group('Required arguments')
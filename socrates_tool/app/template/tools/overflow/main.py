@@ -1,8 +1,7 @@
 import sys, argparse
 import logging
 from modules import asthelper
-from modules import astvisitor
-from modules import mapper
+from modules import analysiscache
 from modules import filewriter
 
 def main(args):
@@ -11,27 +10,29 @@ def main(args):
     # Parsing Args
     contract_path, output_folder, contract_name = (args.source, args.output, args.contract)
 
+    logging.info("Compiling and extracting json" + contract_path)
+
+    # Compile, Generate AST and ABI (single compiler invocation)
+    compilation = asthelper.compile_contract(contract_path, compact=args.compact)
+    ast_json = compilation['asts']
+
     if args.function:
         functions_under_test.append(args.function)
     elif args.contract:
         filewriter.create_dir(output_folder)
         output_folder = '{}/{}'.format(output_folder, args.contract)
-        abi = asthelper.get_abi(contract_path, args.contract)
-        functions_under_test = [x['name'] for x in abi if 'name' in x]
+        functions_under_test = asthelper.function_names(compilation, args.contract)
 
-    logging.info("Compiling and extracting json" + contract_path)
-
-    # Compile, Generate AST
-    ast_json = asthelper.compile(contract_path)
+    # Visit and map to Z3 (the context of the contract is computed once for all the functions,
+    # the functions already analyzed in other contracts are taken from the cache)
+    analyzed_functions = analysiscache.analyze_contract(ast_json, functions_under_test, contract_name)
 
     for function_name in functions_under_test:
 
         try:
-            # Visit
-            inspected_function = astvisitor.visit_ast(ast_json, function_name)
-
-            # Map to Z3
-            z3_generated_code = mapper.ast_to_z3(inspected_function)
+            z3_generated_code = analyzed_functions[function_name]
+            if isinstance(z3_generated_code, Exception):
+                raise z3_generated_code
 
             # Write On File
             output_file_path = filewriter.write_z3_script(output_folder, function_name, z3_generated_code)
@@ -57,6 +58,7 @@ if __name__ == "__main__":
     requiredNamed.add_argument('-c', '--contract', help='Name of the contract under test (es. BecToken_example)', required=True)
     requiredNamed.add_argument('-f', '--function', help='(Optional) Specify the name of single function to test (es. batchTransfer)', required=False)
     requiredNamed.add_argument('-o', '--output', help='Output folder', required=True)
+    parser.add_argument('-m', '--compact', help='(Optional) Keep the AST in a compact form, for big contracts', action='store_true')
 
     try:
         args = parser.parse_args()
@@ -0,0 +1,275 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+
+from models import astnode
+
+
+class AstIndex:
+    """
+    Index of an AST built with a single visit of the tree.
+
+    Every object (dict) of the tree gets a position in pre-order, the same order
+    in which the recursive visit of asthelper finds the nodes. The subtree of a
+    container is the range of positions [start, end), so the nodes of a subtree
+    with a given nodeType are found with a binary search.
+
+    The index reflects the tree at the time it is built.
+    """
+
+    # properties that can be tested without reading the nodes (see CompactAst)
+    columns = frozenset()
+
+    # file index -> (starts, ends, positions, enclosing) of the nodes with a src, see node_at_offset
+    _spans = None
+
+    def __init__(self, ast):
+        self.ast = ast
+
+        # position -> object (every dict of the tree in pre-order)
+        self.nodes = []
+
+        # position -> position after the last object of its subtree
+        self._ends = []
+
+        # id(dict) -> position, id(list) -> list
+        self._positions = {}
+        self._lists = {}
+
+        # id(dict) -> parent dict (None for the root ones)
+        self._parents = {}
+
+        # solc node id -> node
+        self._by_id = {}
+
+        # nodeType -> (list of positions, list of nodes)
+        self._by_type = {}
+
+        self._build(ast)
+
+    def _build(self, ast):
+        nodes = self.nodes
+        positions = self._positions
+        parents = self._parents
+        by_type = self._by_type
+        by_id = self._by_id
+
+        # explicit stack of (container, parent dict)
+        stack = [(ast, None)]
+
+        while stack:
+            container, parent = stack.pop()
+
+            if type(container) is dict:
+                position = len(nodes)
+                positions[id(container)] = position
+                parents[id(container)] = parent
+                nodes.append(container)
+
+                node_type = container.get('nodeType')
+                if type(node_type) is str:
+                    if node_type not in by_type:
+                        by_type[node_type] = ([], [])
+                    type_positions, type_nodes = by_type[node_type]
+                    type_positions.append(position)
+                    type_nodes.append(container)
+                    if 'id' in container:
+                        by_id[container['id']] = container
+
+                parent = container
+                values = container.values()
+            else:
+                self._lists[id(container)] = container
+                values = container
+
+            children = [(v, parent) for v in values if type(v) is dict or type(v) is list]
+            children.reverse()
+            stack += children
+
+        # the subtree of a dict ends where the subtree of its last descendant ends
+        ends = list(range(1, len(nodes) + 1))
+        for position in range(len(nodes) - 1, -1, -1):
+            parent = parents[id(nodes[position])]
+            if parent is not None:
+                parent_position = positions[id(parent)]
+                if ends[position] > ends[parent_position]:
+                    ends[parent_position] = ends[position]
+        self._ends = ends
+
+    def __contains__(self, container):
+        return id(container) in self._positions or id(container) in self._lists
+
+    def node(self, node_id: int) -> dict:
+        """
+        Returns the node with the given solc id, None if missing
+        """
+        return self._by_id.get(node_id)
+
+    def parent(self, node: dict) -> dict:
+        """
+        Returns the closest dict containing the node
+        """
+        return self._parents.get(id(node))
+
+    def node_types(self) -> list:
+        return list(self._by_type)
+
+    def node_at(self, position: int) -> dict:
+        return self.nodes[position]
+
+    def _span(self, position: int):
+        """
+        Returns (start, length, file index) of the src of the node at the position, None if it has no src
+        """
+        src = self.nodes[position].get('src')
+        try:
+            start, length, source = (int(x) for x in src.split(':'))
+        except (AttributeError, ValueError):
+            return None
+        return start, length, source
+
+    def _build_spans(self):
+        """
+        Sorts the spans of each file by start, from the longest, and links each span
+        to the closest one containing it: the src of solc are nested like the nodes
+        """
+        spans = {}
+        for position in range(len(self._ends)):
+            span = self._span(position)
+            if span is not None and span[0] >= 0 and span[1] >= 0:
+                start, length, source = span
+                spans.setdefault(source, []).append((start, -length, position))
+
+        self._spans = {}
+        for source, items in spans.items():
+            items.sort()
+            starts = array('q', [x[0] for x in items])
+            ends = array('q', [x[0] - x[1] for x in items])
+            positions = array('i', [x[2] for x in items])
+
+            enclosing = array('i')
+            stack = []
+            for i in range(len(items)):
+                while stack and ends[stack[-1]] < ends[i]:
+                    stack.pop()
+                enclosing.append(stack[-1] if stack else -1)
+                stack.append(i)
+
+            self._spans[source] = (starts, ends, positions, enclosing)
+
+    def _containing(self, offset: int, source: int) -> list:
+        """
+        Returns the indexes of the spans containing the offset, from the innermost
+        """
+        if self._spans is None:
+            self._build_spans()
+        if source not in self._spans:
+            return []
+
+        starts, ends, _, enclosing = self._spans[source]
+        found = []
+        i = bisect_right(starts, offset) - 1
+        while i != -1:
+            if ends[i] > offset:
+                found.append(i)
+            i = enclosing[i]
+        return found
+
+    def node_at_offset(self, offset: int, source: int = 0) -> dict:
+        """
+        Returns the innermost node whose src contains the byte offset, None if missing
+        :param source: file index of the src (0 is the first source compiled)
+        """
+        found = self._containing(offset, source)
+        if not found:
+            return None
+        return self.node_at(self._spans[source][2][found[0]])
+
+    def nodes_overlapping(self, start: int, end: int, source: int = 0) -> list:
+        """
+        Returns the nodes whose src overlaps the bytes from start to end (excluded),
+        the ones containing start when end == start. Nodes are sorted by start, the outer ones first.
+        """
+        found = list(reversed(self._containing(start, source)))
+        if source in self._spans:
+            starts, ends, _, _ = self._spans[source]
+            found += [i for i in range(bisect_right(starts, start), bisect_left(starts, end)) if ends[i] > starts[i]]
+
+        return [self.node_at(self._spans[source][2][i]) for i in found]
+
+    def subtree(self, container=None, prefilter=None) -> list:
+        """
+        Returns all the objects of the subtree (container included) in pre-order
+        :param container: dict or list of the tree, default the root
+        :param prefilter: (Optional) dict property in columns -> predicate on its value, the objects failing it can be skipped
+        """
+        start, end = self._range(container)
+        return self.nodes[start:end]
+
+    def nodes_of_types(self, node_types: list, container=None, prefilter=None) -> list:
+        """
+        Returns the nodes with one of the nodeTypes inside the subtree of container, in pre-order
+        :param prefilter: (Optional) dict property in columns -> predicate on its value, the nodes failing it can be skipped
+        """
+        start, end = self._range(container)
+
+        slices = []
+        for node_type in node_types:
+            positions, nodes = self._by_type.get(node_type, ([], []))
+            i = bisect_left(positions, start)
+            j = bisect_left(positions, end)
+            if i < j:
+                slices.append(zip(positions[i:j], nodes[i:j]))
+
+        if len(slices) == 1:
+            return [node for _, node in slices[0]]
+
+        return [node for _, node in merge(*slices, key=lambda x: x[0])]
+
+    def wrap(self, node: dict, container=None, wrapped: dict = None) -> astnode.AstNode:
+        """
+        Returns the node as AstNode, with the chain of its parents
+        :param container: the chain stops at the parents inside container (default the root)
+        :param wrapped: (Optional) dict id(parent) -> AstNode, to share the parents among many calls
+        """
+        start, end = self._range(container)
+
+        if wrapped is None:
+            wrapped = {}
+
+        chain = []
+        parent = self.parent(node)
+        while parent is not None and id(parent) not in wrapped and start <= self._positions[id(parent)] < end:
+            chain.append(parent)
+            parent = self.parent(parent)
+
+        wrapped_parent = wrapped.get(id(parent)) if parent is not None else None
+        for ancestor in reversed(chain):
+            wrapped_parent = astnode.AstNode(wrapped_parent, ancestor)
+            wrapped[id(ancestor)] = wrapped_parent
+
+        return astnode.AstNode(wrapped_parent, node)
+
+    def wrap_all(self, nodes: list, container=None) -> list:
+        """
+        Returns the nodes as AstNode, nodes with the same parents share the same parent AstNode
+        """
+        wrapped = {}
+        return [self.wrap(x, container, wrapped) for x in nodes]
+
+    def _range(self, container):
+        if container is None:
+            container = self.ast
+
+        if type(container) is dict:
+            position = self._positions[id(container)]
+            return position, self._ends[position]
+
+        # list: from the first to the last object it contains
+        ranges = [self._range(x) for x in container if type(x) is dict or type(x) is list]
+        ranges = [x for x in ranges if x[0] < x[1]]
+
+        if not ranges:
+            return 0, 0
+
+        return ranges[0][0], ranges[-1][1]
@@ -3,6 +3,8 @@ from modules import expressionhelper
 
 class AstNode:
 
+	__slots__ = ('parent', 'dic')
+
 	def __init__(self, parent, dic):
 		self.parent = parent
 		self.dic = dic
@@ -90,6 +92,9 @@ class AstNode:
 		if self.dic['nodeType'] in ['BinaryOperation', 'UnaryOperation']:
 			return expressionhelper.Expression(self.dic, self.parent).to_string()
 
+		if self.dic['nodeType'] == 'ClosedForm':
+			return expressionhelper.ClosedForm(self.dic, self.parent).to_string()
+
 		return self.dic['nodeType']
 
 	def to_sol_string(self):
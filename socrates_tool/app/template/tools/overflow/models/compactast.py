@@ -0,0 +1,749 @@
+import hashlib
+import json
+import mmap
+import re
+import struct
+import sys
+import weakref
+import zlib
+from array import array
+from bisect import bisect_left
+from heapq import merge
+
+from models import astnode, astindex
+
+# a member stored in its own payload is replaced by {UNIT_KEY: unit} in the payload of its contract
+UNIT_KEY = '$unit'
+
+# zlib level of the payloads, they are compressed once and decoded at most once
+COMPRESSION_LEVEL = 1
+
+MISSING = -1
+MISSING_ID = -(1 << 63)
+MISSING_SRC = '-1:-1:-1'
+
+# first bytes of the binary snapshots (see CompactAst.save), the last one is the version
+SNAPSHOT_MAGIC = b'SOLAST\0\3'
+
+# src written as solc does ("start:length:file"), with offsets fitting the arrays
+SRC_RE = re.compile(r'(0|-?[1-9][0-9]{0,8}):(0|-?[1-9][0-9]{0,8}):(0|-?[1-9][0-9]{0,8})\Z')
+
+# properties holding solc ids (or lists of ids), and the ids inside a typeIdentifier (es. t_contract$_Token_$42)
+ID_FIELDS = frozenset(['id', 'referencedDeclaration', 'scope', 'superFunction', 'functionReturnParameters'])
+ID_LIST_FIELDS = frozenset(['overloadedDeclarations', 'linearizedBaseContracts', 'contractDependencies', 'baseFunctions',
+                            'assignments', 'usedErrors'])
+TYPE_ID_RE = re.compile(r'(?<=_\$)(0|[1-9][0-9]*)(?![0-9])')
+
+# properties replaced in the canonical json (see _canonical)
+CANONICAL_FIELDS = ID_FIELDS | ID_LIST_FIELDS | {'typeIdentifier', 'src'}
+
+# canonical payloads of the compact ASTs alive, by structural hash (sha256)
+HASH_SIZE = hashlib.sha256().digest_size
+_shared_payloads = weakref.WeakValueDictionary()
+
+
+class _LazyAstNode(astnode.AstNode):
+    """
+    AstNode of a node which is decoded the first time its dic is read
+    """
+    __slots__ = ('_compact', '_position')
+
+    def __init__(self, parent, compact, position):
+        self.parent = parent
+        self._compact = compact
+        self._position = position
+
+    @property
+    def dic(self):
+        return self._compact.node_at(self._position)
+
+
+class _SharedPayload:
+    __slots__ = ('data', '__weakref__')
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def _preorder(ast) -> list:
+    """
+    Returns the dicts of the tree in pre-order, the order of the positions
+    """
+    nodes = []
+    stack = [ast]
+    while stack:
+        container = stack.pop()
+        if type(container) is dict:
+            nodes.append(container)
+            values = container.values()
+        else:
+            values = container
+        children = [v for v in values if type(v) is dict or type(v) is list]
+        children.reverse()
+        stack += children
+    return nodes
+
+
+def _canonical(nodes: list) -> tuple:
+    """
+    Returns the canonical json of the subtree made of nodes (its dicts in pre-order),
+    the ids it references and how many of them are ids of its nodes. In the canonical json every id is replaced by a
+    placeholder, its index in the ids returned: first the ids of the nodes of the
+    subtree in pre-order, then the others in order of appearance. The src which
+    can be stored in the arrays are replaced by an empty string.
+    Two subtrees differing only in ids and src have the same canonical json.
+    """
+    placeholders = {}
+    for node in nodes:
+        node_id = node.get('id')
+        if type(node_id) is int and node_id != MISSING_ID and node_id not in placeholders:
+            placeholders[node_id] = len(placeholders)
+    internal = len(placeholders)
+
+    def placeholder(node_id):
+        if node_id not in placeholders:
+            placeholders[node_id] = len(placeholders)
+        return placeholders[node_id]
+
+    def replace_type_id(match):
+        return str(placeholder(int(match.group(0))))
+
+    # the nodes are edited while dumping the subtree, then restored
+    originals = []
+    try:
+        for node in nodes:
+            for key in node.keys() & CANONICAL_FIELDS:
+                value = node[key]
+                if key in ID_FIELDS and type(value) is int:
+                    node[key] = placeholder(value)
+                elif key in ID_LIST_FIELDS and type(value) is list:
+                    node[key] = [placeholder(x) if type(x) is int else x for x in value]
+                elif key == 'typeIdentifier' and type(value) is str:
+                    node[key] = TYPE_ID_RE.sub(replace_type_id, value)
+                elif key == 'src' and type(value) is str and value != MISSING_SRC and SRC_RE.match(value):
+                    node[key] = ''
+                else:
+                    continue
+                originals.append((node, key, value))
+        canonical = json.dumps(nodes[0], separators=(',', ':')).encode('utf8')
+    finally:
+        for node, key, value in originals:
+            node[key] = value
+
+    return canonical, list(placeholders), internal
+
+
+def structural_hash(node: dict) -> str:
+    """
+    Returns the hash of the subtree ignoring ids and src: copies of the same code
+    (es. a library flattened in many contracts) have the same hash
+    """
+    canonical, _, _ = _canonical(_preorder(node))
+    return hashlib.sha256(canonical).hexdigest()
+
+
+def _offsets(items: list) -> list:
+    offsets = [0]
+    for item in items:
+        offsets.append(offsets[-1] + len(item))
+    return offsets
+
+
+class _Pool:
+    """
+    Sequence of the items of a snapshot (strings or payloads), each item is decoded when accessed
+    """
+
+    def __init__(self, offsets, blob, decode):
+        self._offsets = offsets
+        self._blob = blob
+        self._decode = decode
+        self._items = {}
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int):
+        if i not in self._items:
+            self._items[i] = self._decode(self._blob[self._offsets[i]:self._offsets[i + 1]])
+        return self._items[i]
+
+
+class CompactAst(astindex.AstIndex):
+    """
+    Compact representation of an AST, usable wherever its AstIndex is.
+
+    The structure of the tree is kept in arrays with an entry for each node in
+    pre-order: nodeType, id, name, src, stateVariable, parent and end of the subtree.
+    The dicts are stored as compressed json, one payload for each member of a contract
+    (function, modifier, event, state variable...) and one for the rest of the tree.
+    A payload is decoded the first time one of its nodes is returned, queries on the
+    columns are answered without decoding anything.
+
+    The payloads of the members are hash-consed: they hold the canonical json of the
+    member (see _canonical), so the copies of the same code (es. SafeMath flattened in
+    every contract) share one payload, also among the compact ASTs alive. The ids
+    and src are restored from the arrays, and from a table of the ids the member
+    references, when the payload is decoded.
+
+    The nodes returned are decoded copies, the tree used to build it can be released.
+    """
+
+    # properties of the nodes stored in the arrays
+    columns = frozenset(['nodeType', 'id', 'name', 'src', 'stateVariable'])
+
+    def __init__(self, ast):
+        # strings (nodeType and name) are stored once, the arrays keep their code
+        self._strings = []
+        self._codes = {}
+
+        self._types = array('i')
+        self._ids = array('q')
+        self._names = array('i')
+        self._states = array('b')
+        self._src = array('i')
+        self._parents = array('i')
+        self._ends = array('i')
+        self._units = array('i')
+
+        # positions of the nodes with a property that cannot be stored in the arrays
+        self._opaque = set()
+
+        # code of the nodeType -> positions
+        self._by_type = {}
+
+        # payloads (each one stored once), payload and first position of each unit, 0 is the root
+        self._payloads = []
+        self._unit_payloads = array('i')
+        self._starts = [0]
+
+        # ids referenced by each unit outside its nodes, from external_offsets[unit] to external_offsets[unit + 1]
+        self._externals = array('q')
+        self._external_offsets = array('q', [0, 0])
+
+        # sha256 of the canonical json of each unit (zeros for the root)
+        self._hashes = bytearray(HASH_SIZE)
+
+        # shared payloads used by this compact AST
+        self._shared = []
+
+        self.metadata = None
+        self._reset()
+        self._build(ast)
+
+    def _reset(self):
+        # decoded objects
+        self._root = None
+        self._decoded = set()
+        self._nodes = {}
+        self._positions = {}
+        self._lists = {}
+
+        # absolutePath of the source units replaced when the root is decoded
+        self._absolute_paths = {}
+
+    def _code(self, string: str) -> int:
+        if string not in self._codes:
+            self._codes[string] = len(self._strings)
+            self._strings.append(string)
+        return self._codes[string]
+
+    def _build(self, ast):
+        contract_code = self._code('ContractDefinition')
+        units = {}
+        members = []
+        contracts = []
+        nodes = []
+
+        code = self._code
+        by_type = self._by_type
+        opaque = self._opaque
+        types = self._types
+        ids = self._ids
+        names = self._names
+        states = self._states
+        src_offsets = self._src
+        parents = self._parents
+        node_units = self._units
+
+        # explicit stack of (container, parent position, unit)
+        stack = [(ast, MISSING, 0)]
+
+        while stack:
+            container, parent, unit = stack.pop()
+
+            if type(container) is dict:
+                position = len(types)
+                nodes.append(container)
+
+                # the dicts in a contract (outside other members) start a new unit
+                if unit == 0 and parent != MISSING and types[parent] == contract_code:
+                    unit = len(self._starts)
+                    self._starts.append(position)
+                    units[id(container)] = unit
+                    members.append(container)
+
+                node_type = container.get('nodeType')
+                if type(node_type) is str:
+                    type_code = code(node_type)
+                    types.append(type_code)
+                    if type_code not in by_type:
+                        by_type[type_code] = array('i')
+                    by_type[type_code].append(position)
+                    if type_code == contract_code and unit == 0:
+                        contracts.append(container)
+                else:
+                    types.append(MISSING)
+                    if 'nodeType' in container:
+                        opaque.add(position)
+
+                node_id = container.get('id')
+                if type(node_id) is int and node_id != MISSING_ID:
+                    ids.append(node_id)
+                else:
+                    ids.append(MISSING_ID)
+                    if 'id' in container:
+                        opaque.add(position)
+
+                name = container.get('name')
+                if type(name) is str:
+                    names.append(code(name))
+                else:
+                    names.append(MISSING)
+                    if 'name' in container:
+                        opaque.add(position)
+
+                state = container.get('stateVariable')
+                if type(state) is bool:
+                    states.append(state)
+                else:
+                    states.append(MISSING)
+                    if 'stateVariable' in container:
+                        opaque.add(position)
+
+                src = container.get('src')
+                offsets = SRC_RE.match(src) if type(src) is str else None
+                if offsets and offsets.group(0) != MISSING_SRC:
+                    src_offsets.extend(map(int, offsets.groups()))
+                else:
+                    src_offsets.extend((MISSING, MISSING, MISSING))
+                    if 'src' in container:
+                        opaque.add(position)
+
+                parents.append(parent)
+                node_units.append(unit)
+
+                parent = position
+                values = container.values()
+            else:
+                values = container
+
+            children = [(v, parent, unit) for v in values if type(v) is dict or type(v) is list]
+            children.reverse()
+            stack += children
+
+        # the subtree of a node ends where the subtree of its last descendant ends
+        ends = array('i', range(1, len(types) + 1))
+        for position in range(len(types) - 1, -1, -1):
+            parent = parents[position]
+            if parent != MISSING and ends[position] > ends[parent]:
+                ends[parent] = ends[position]
+        self._ends = ends
+
+        # solc id -> position, as two sorted arrays
+        with_id = sorted((ids[p], p) for p in range(len(types)) if ids[p] != MISSING_ID and types[p] != MISSING)
+        self._sorted_ids = array('q', [x[0] for x in with_id])
+        self._id_positions = array('i', [x[1] for x in with_id])
+
+        self._unit_payloads.append(len(self._payloads))
+        self._payloads.append(self._root_payload(ast, contracts, units))
+
+        shared = {}
+        for unit in range(1, len(self._starts)):
+            start = self._starts[unit]
+            canonical, node_ids, internal = _canonical(nodes[start:ends[start]])
+            digest = hashlib.sha256(canonical).digest()
+
+            if digest not in shared:
+                payload = _shared_payloads.get(digest)
+                if payload is None:
+                    payload = _SharedPayload(zlib.compress(canonical, COMPRESSION_LEVEL))
+                    _shared_payloads[digest] = payload
+                shared[digest] = len(self._payloads)
+                self._payloads.append(payload.data)
+                self._shared.append(payload)
+
+            self._unit_payloads.append(shared[digest])
+            self._externals.extend(node_ids[internal:])
+            self._external_offsets.append(len(self._externals))
+            self._hashes += digest
+
+    @staticmethod
+    def _compress(value) -> bytes:
+        return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf8'), COMPRESSION_LEVEL)
+
+    def _root_payload(self, ast, contracts: list, units: dict) -> bytes:
+        def marker(value):
+            if type(value) is dict and id(value) in units:
+                return {UNIT_KEY: units[id(value)]}
+            if type(value) is list:
+                return [marker(x) for x in value]
+            return value
+
+        # the members are replaced by markers while dumping the tree, then restored
+        originals = [dict(x) for x in contracts]
+        try:
+            for contract in contracts:
+                contract.update({k: marker(v) for k, v in contract.items()})
+            return self._compress(ast)
+        finally:
+            for contract, original in zip(contracts, originals):
+                contract.update(original)
+
+    def _decode(self, unit: int):
+        if unit in self._decoded:
+            return
+        self._decoded.add(unit)
+
+        root = json.loads(zlib.decompress(self._payloads[self._unit_payloads[unit]]).decode('utf8'))
+        if unit == 0:
+            self._root = root
+            self._replace_absolute_paths()
+            table = None
+        else:
+            table = self._ids_table(unit)
+
+        # assign the positions visiting the decoded payload in the order of _build
+        position = self._starts[unit]
+        stack = [(root, False)]
+
+        while stack:
+            container, skip = stack.pop()
+
+            if skip:
+                # member decoded on its own, its nodes have their positions
+                position = self._ends[self._positions[id(container)]]
+                continue
+
+            if type(container) is dict:
+                if table is not None:
+                    self._restore(container, position, table)
+                self._nodes[position] = container
+                self._positions[id(container)] = position
+                position += 1
+                items = container.items()
+            else:
+                self._lists[id(container)] = container
+                items = enumerate(container)
+
+            children = []
+            members = []
+            for key, value in items:
+                if type(value) is dict and UNIT_KEY in value:
+                    value = self._decode_member(value[UNIT_KEY])
+                    members.append((key, value))
+                    children.append((value, True))
+                elif type(value) is dict or type(value) is list:
+                    children.append((value, False))
+
+            for key, value in members:
+                container[key] = value
+
+            children.reverse()
+            stack += children
+
+    def _ids_table(self, unit: int) -> list:
+        """
+        Returns the ids of the placeholders in the canonical json of the unit
+        """
+        start = self._starts[unit]
+        table = []
+        seen = set()
+        for position in range(start, self._ends[start]):
+            node_id = self._ids[position]
+            if node_id != MISSING_ID and node_id not in seen:
+                seen.add(node_id)
+                table.append(node_id)
+
+        table.extend(self._externals[self._external_offsets[unit]:self._external_offsets[unit + 1]])
+        return table
+
+    def _restore(self, node: dict, position: int, table: list):
+        """
+        Replaces the placeholders of a node decoded from a canonical json
+        """
+        for key in node.keys() & CANONICAL_FIELDS:
+            value = node[key]
+            if key in ID_FIELDS and type(value) is int:
+                node[key] = table[value]
+            elif key in ID_LIST_FIELDS and type(value) is list:
+                node[key] = [table[x] if type(x) is int else x for x in value]
+            elif key == 'typeIdentifier' and type(value) is str:
+                node[key] = TYPE_ID_RE.sub(lambda match: str(table[int(match.group(0))]), value)
+            elif key == 'src' and value == '':
+                offsets = tuple(self._src[3 * position:3 * position + 3])
+                if offsets != (MISSING, MISSING, MISSING):
+                    node[key] = '{}:{}:{}'.format(*offsets)
+
+    def structural_hash(self, node: dict) -> str:
+        """
+        Returns the structural_hash of a node, the one of the members was computed building the compact AST
+        """
+        position = self._positions.get(id(node))
+        if position is not None and position == self._starts[self._units[position]] and position != 0:
+            unit = self._units[position]
+            return bytes(self._hashes[HASH_SIZE * unit:HASH_SIZE * (unit + 1)]).hex()
+
+        return structural_hash(node)
+
+    def _decode_member(self, unit: int) -> dict:
+        self._decode(unit)
+        return self._nodes[self._starts[unit]]
+
+    def set_absolute_path(self, old: str, new: str):
+        """
+        Replaces the absolutePath of the source units (es. the source was compiled with another file name)
+        """
+        self._absolute_paths[old] = new
+        if self._root is not None:
+            self._replace_absolute_paths()
+
+    def _replace_absolute_paths(self):
+        for source_unit in (self._root if type(self._root) is list else [self._root]):
+            if type(source_unit) is dict and source_unit.get('absolutePath') in self._absolute_paths:
+                source_unit['absolutePath'] = self._absolute_paths[source_unit['absolutePath']]
+
+    def save(self, f, metadata: dict = None):
+        """
+        Writes the binary snapshot of the compact AST on the file object f, see load
+        :param metadata: (Optional) json serializable object stored with the snapshot
+        """
+        strings = [self._strings[i].encode('utf8') for i in range(len(self._strings))]
+        payloads = [self._payloads[i] for i in range(len(self._payloads))]
+
+        codes = list(self._by_type)
+        type_positions = array('i')
+        by_type = []
+        for code in codes:
+            by_type.append([code, len(type_positions), len(self._by_type[code])])
+            type_positions.extend(self._by_type[code])
+
+        sections = [
+            ('types', self._types), ('ids', self._ids), ('names', self._names), ('states', self._states),
+            ('src', self._src), ('parents', self._parents), ('ends', self._ends), ('units', self._units),
+            ('starts', array('i', self._starts)), ('sorted_ids', self._sorted_ids),
+            ('id_positions', self._id_positions), ('type_positions', type_positions),
+            ('string_offsets', array('q', _offsets(strings))), ('strings', b''.join(strings)),
+            ('payload_offsets', array('q', _offsets(payloads))), ('payloads', b''.join(bytes(x) for x in payloads)),
+            ('unit_payloads', self._unit_payloads), ('externals', self._externals),
+            ('external_offsets', self._external_offsets), ('hashes', bytes(self._hashes))
+        ]
+
+        table = {}
+        data = []
+        offset = 0
+        for name, section in sections:
+            content = bytes(section)
+            # sections are aligned, so that they can be cast to arrays
+            padding = -len(content) % 8
+            table[name] = [offset, len(content), getattr(section, 'typecode', None) or getattr(section, 'format', 'B')]
+            data += [content, b'\0' * padding]
+            offset += len(content) + padding
+
+        header = json.dumps({
+            'byteorder': sys.byteorder,
+            'sections': table,
+            'by_type': by_type,
+            'opaque': sorted(self._opaque),
+            'metadata': metadata
+        }).encode('utf8')
+        header += b' ' * (-len(header) % 8)
+
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for content in data:
+            f.write(content)
+
+    @classmethod
+    def load(cls, path: str) -> 'CompactAst':
+        """
+        Memory-maps a snapshot written by save: the arrays are read from the mapped file,
+        strings and nodes are decoded when accessed
+        :raise ValueError: if the file is not a snapshot
+        """
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(mapped)
+        if len(view) < 16 or view[:8] != SNAPSHOT_MAGIC:
+            raise ValueError('Not an AST snapshot: ' + path)
+
+        header_length = struct.unpack_from('<Q', view, 8)[0]
+        header = json.loads(bytes(view[16:16 + header_length]).decode('utf8'))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError('AST snapshot written with a different byte order: ' + path)
+
+        data = view[16 + header_length:]
+        sections = {}
+        for name, (offset, length, typecode) in header['sections'].items():
+            if offset + length > len(data):
+                raise ValueError('Truncated AST snapshot: ' + path)
+            sections[name] = data[offset:offset + length].cast(typecode)
+
+        compact = cls.__new__(cls)
+        compact._types = sections['types']
+        compact._ids = sections['ids']
+        compact._names = sections['names']
+        compact._states = sections['states']
+        compact._src = sections['src']
+        compact._parents = sections['parents']
+        compact._ends = sections['ends']
+        compact._units = sections['units']
+        compact._starts = sections['starts']
+        compact._sorted_ids = sections['sorted_ids']
+        compact._id_positions = sections['id_positions']
+        compact._strings = _Pool(sections['string_offsets'], sections['strings'], lambda x: bytes(x).decode('utf8'))
+        compact._payloads = _Pool(sections['payload_offsets'], sections['payloads'], lambda x: x)
+        compact._unit_payloads = sections['unit_payloads']
+        compact._externals = sections['externals']
+        compact._external_offsets = sections['external_offsets']
+        compact._hashes = sections['hashes']
+        compact._shared = []
+        compact._by_type = {code: sections['type_positions'][start:start + count] for code, start, count in header['by_type']}
+        compact._codes = {compact._strings[code]: code for code in compact._by_type}
+        compact._opaque = set(header['opaque'])
+        compact.metadata = header['metadata']
+        compact._reset()
+
+        return compact
+
+    @property
+    def ast(self):
+        """
+        The whole tree (decoding all the payloads)
+        """
+        self._decode(0)
+        return self._root
+
+    def node_at(self, position: int) -> dict:
+        self._decode(self._units[position])
+        return self._nodes[position]
+
+    def _span(self, position: int):
+        offsets = tuple(self._src[3 * position:3 * position + 3])
+        return offsets if offsets != (MISSING, MISSING, MISSING) else None
+
+    def _column_test(self, column: str, test):
+        """
+        Returns the predicate on the position testing the value of the column,
+        the values stored as codes are tested once for each code
+        """
+        if column in ('nodeType', 'name'):
+            codes = self._types if column == 'nodeType' else self._names
+            results = {MISSING: False}
+
+            def test_code(position):
+                code = codes[position]
+                if code not in results:
+                    results[code] = bool(test(self._strings[code]))
+                return results[code]
+
+            return test_code
+
+        if column == 'stateVariable':
+            results = {MISSING: False, 0: bool(test(False)), 1: bool(test(True))}
+            return lambda position: results[self._states[position]]
+
+        if column == 'id':
+            return lambda position: self._ids[position] != MISSING_ID and bool(test(self._ids[position]))
+
+        def test_src(position):
+            offsets = tuple(self._src[3 * position:3 * position + 3])
+            return offsets != (MISSING, MISSING, MISSING) and bool(test('{}:{}:{}'.format(*offsets)))
+
+        return test_src
+
+    def _select(self, positions, prefilter) -> list:
+        """
+        Returns the nodes at the positions, decoding only the ones passing the prefilter
+        :param prefilter: (Optional) dict column -> predicate on its value
+        """
+        if prefilter:
+            tests = [self._column_test(column, test) for column, test in prefilter.items()]
+            positions = [p for p in positions if p in self._opaque or all(t(p) for t in tests)]
+
+        return [self.node_at(p) for p in positions]
+
+    def __contains__(self, container):
+        return id(container) in self._positions or id(container) in self._lists
+
+    def node(self, node_id: int) -> dict:
+        i = bisect_left(self._sorted_ids, node_id)
+        if i == len(self._sorted_ids) or self._sorted_ids[i] != node_id:
+            return None
+        return self.node_at(self._id_positions[i])
+
+    def parent(self, node: dict) -> dict:
+        parent = self._parents[self._positions[id(node)]]
+        return self.node_at(parent) if parent != MISSING else None
+
+    def node_types(self) -> list:
+        return [self._strings[x] for x in self._by_type]
+
+    def subtree(self, container=None, prefilter=None) -> list:
+        start, end = self._range(container)
+        return self._select(range(start, end), prefilter)
+
+    def nodes_of_types(self, node_types: list, container=None, prefilter=None) -> list:
+        start, end = self._range(container)
+
+        slices = []
+        for node_type in node_types:
+            positions = self._by_type.get(self._codes.get(node_type), array('i'))
+            i = bisect_left(positions, start)
+            j = bisect_left(positions, end)
+            if i < j:
+                slices.append(positions[i:j])
+
+        return self._select(merge(*slices), prefilter)
+
+    def wrap(self, node: dict, container=None, wrapped: dict = None) -> astnode.AstNode:
+        start, end = self._range(container)
+
+        if wrapped is None:
+            wrapped = {}
+
+        chain = []
+        parent = self._parents[self._positions[id(node)]]
+        while parent != MISSING and parent not in wrapped and start <= parent < end:
+            chain.append(parent)
+            parent = self._parents[parent]
+
+        wrapped_parent = wrapped.get(parent)
+        for ancestor in reversed(chain):
+            if ancestor in self._nodes:
+                wrapped_parent = astnode.AstNode(wrapped_parent, self._nodes[ancestor])
+            else:
+                # the ancestors outside the decoded payloads are decoded only if read
+                wrapped_parent = _LazyAstNode(wrapped_parent, self, ancestor)
+            wrapped[ancestor] = wrapped_parent
+
+        return astnode.AstNode(wrapped_parent, node)
+
+    def _range(self, container):
+        if container is None:
+            return 0, len(self._types)
+
+        if type(container) is dict:
+            position = self._positions[id(container)]
+            return position, self._ends[position]
+
+        # list: from the first to the last object it contains
+        ranges = [self._range(x) for x in container if type(x) is dict or type(x) is list]
+        ranges = [x for x in ranges if x[0] < x[1]]
+
+        if not ranges:
+            return 0, 0
+
+        return ranges[0][0], ranges[-1][1]
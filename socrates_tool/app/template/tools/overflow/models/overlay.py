@@ -0,0 +1,78 @@
+class Overlay:
+    """
+    Annotations made by one analysis on the nodes of an AST (es. the name given to an
+    expression by astvisitor). The AST is never modified, so one tree can be shared
+    by many analyses, each one with its own overlay.
+
+    An annotated node is read through its copy, which holds the annotations (copy-on-write).
+    The dicts and lists containing annotated nodes are copied only when a subtree
+    is resolved, the rest of the subtree is the one of the AST.
+    """
+
+    def __init__(self):
+        # id(original) -> (original, annotated copy)
+        self._copies = {}
+
+        # id(annotated copy) -> annotated copy
+        self._owned = {}
+
+    def annotate(self, node: dict, annotations: dict) -> dict:
+        """
+        Returns the copy of node with the annotations (the same copy for all the annotations of a node)
+        :param node: node of the AST, or a copy returned by annotate
+        """
+        if id(node) in self._owned:
+            node.update(annotations)
+            return node
+
+        if id(node) not in self._copies:
+            copy = dict(node)
+            self._copies[id(node)] = (node, copy)
+            self._owned[id(copy)] = copy
+
+        copy = self._copies[id(node)][1]
+        copy.update(annotations)
+        return copy
+
+    def get(self, node: dict) -> dict:
+        """
+        Returns the annotated copy of node, node itself if it has no annotations
+        """
+        if id(node) in self._copies:
+            return self._copies[id(node)][1]
+        return node
+
+    def resolve(self, container):
+        """
+        Returns the subtree as seen by the analysis: the annotated nodes are replaced by their copies,
+        the dicts and lists containing them are copied, the other objects are the ones of the AST
+        :param container: dict or list of the AST
+        """
+        if not self._copies:
+            return container
+
+        # id(object) -> resolved object, filled in post-order
+        resolved = {}
+        stack = [(container, False)]
+
+        while stack:
+            current, visited = stack.pop()
+            source = self.get(current) if type(current) is dict else current
+            items = list(source.items()) if type(source) is dict else list(enumerate(source))
+
+            if not visited:
+                stack.append((current, True))
+                stack += [(v, False) for _, v in items if (type(v) is dict or type(v) is list) and id(v) not in resolved]
+                continue
+
+            changed = [(k, resolved[id(v)]) for k, v in items
+                       if (type(v) is dict or type(v) is list) and resolved[id(v)] is not v]
+
+            if changed and source is current:
+                source = dict(source) if type(source) is dict else list(source)
+            for key, value in changed:
+                source[key] = value
+
+            resolved[id(current)] = source
+
+        return resolved[id(container)]
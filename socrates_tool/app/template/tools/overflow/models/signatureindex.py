@@ -0,0 +1,98 @@
+import re
+
+# elementary types written with their canonical name in the signatures
+TYPE_ALIASES = {'uint': 'uint256', 'int': 'int256', 'byte': 'bytes1', 'address payable': 'address'}
+
+# data location at the end of a typeString (es. "uint256[] memory", "string storage ref")
+LOCATION_RE = re.compile(r' (storage|memory|calldata)( ref| pointer)?$')
+
+
+def canonical_type(parameter: dict) -> str:
+    """
+    Returns the type of the parameter as in the canonical signatures (es. uint -> uint256)
+    """
+    type_name = parameter.get('typeName') or {}
+    if type_name.get('nodeType') == 'ElementaryTypeName' and type_name.get('name'):
+        return TYPE_ALIASES.get(type_name['name'], type_name['name'])
+
+    type_string = LOCATION_RE.sub('', (parameter.get('typeDescriptions') or {}).get('typeString') or '')
+    if type_string.startswith('contract '):
+        return 'address'
+    if type_string.startswith('enum '):
+        return 'uint8'
+
+    return TYPE_ALIASES.get(type_string, type_string)
+
+
+def signature(function: dict) -> str:
+    """
+    Returns the fingerprint of the FunctionDefinition: name, parameters and returned types,
+    es. transfer(address,uint256)returns(bool)
+    """
+    parameters = (function.get('parameters') or {}).get('parameters') or []
+    return_parameters = (function.get('returnParameters') or {}).get('parameters') or []
+
+    return '{}({})returns({})'.format(
+        function.get('name'),
+        ','.join(canonical_type(x) for x in parameters),
+        ','.join(canonical_type(x) for x in return_parameters))
+
+
+class SignatureIndex:
+    """
+    Signatures of the implemented functions of each contract of an AST, built with
+    one pass on the FunctionDefinitions. Checking if a contract implements an interface
+    (es. ERC20) is a set inclusion, without comparing the functions one by one.
+    """
+
+    def __init__(self, ast_index):
+        # ContractDefinitions in source order
+        self.contracts = ast_index.nodes_of_types(['ContractDefinition'])
+        self._by_id = {x.get('id'): x for x in self.contracts}
+
+        # contract id -> signatures of its functions
+        self._signatures = {x.get('id'): set() for x in self.contracts}
+
+        # signature -> ids of the contracts defining it
+        self._contracts = {}
+
+        for function in ast_index.nodes_of_types(['FunctionDefinition']):
+            contract = ast_index.parent(function)
+            if not function.get('implemented') or contract is None or contract.get('nodeType') != 'ContractDefinition':
+                continue
+            fingerprint = signature(function)
+            self._signatures[contract.get('id')].add(fingerprint)
+            self._contracts.setdefault(fingerprint, set()).add(contract.get('id'))
+
+    def signatures(self, contract: dict, inherited: bool = False) -> set:
+        """
+        Returns the signatures of the functions implemented by the contract
+        :param inherited: if True, the ones of the contracts it inherits from are included
+        """
+        if not inherited:
+            return set(self._signatures.get(contract.get('id'), ()))
+
+        signatures = set()
+        for contract_id in contract.get('linearizedBaseContracts') or [contract.get('id')]:
+            signatures |= self._signatures.get(contract_id, set())
+        return signatures
+
+    def implementing(self, interface, inherited: bool = False) -> list:
+        """
+        Returns the contracts implementing all the signatures of the interface, in source order
+        :param interface: set of signatures (see signature)
+        :param inherited: if True, the functions inherited from the base contracts count
+        """
+        interface = set(interface)
+
+        if inherited:
+            return [x for x in self.contracts if interface <= self.signatures(x, True)]
+
+        # the contracts defining the rarest signature are the only candidates
+        candidates = set(self._by_id)
+        for fingerprint in sorted(interface, key=lambda x: len(self._contracts.get(x, ()))):
+            candidates &= self._contracts.get(fingerprint, set())
+            if not candidates:
+                break
+
+        return [x for x in self.contracts if x.get('id') in candidates]
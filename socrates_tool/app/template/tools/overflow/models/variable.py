@@ -2,6 +2,8 @@
 
 class Variable:
 
+    __slots__ = ('name', 'type', 'scope', 'stateVariable', 'storageLocation')
+
     def __init__(self, dic):
         self.name = dic.get('name')
 
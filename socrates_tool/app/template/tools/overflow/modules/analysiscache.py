@@ -0,0 +1,208 @@
+import hashlib
+import json
+import re
+from models import astindex
+from models import astnode
+from models import compactast
+from models import overlay
+from models import signatureindex
+from models import variable
+from modules import asthelper
+from modules import astvisitor
+from modules import compilecache
+from modules import expressionhelper
+from modules import mapper
+
+# verdicts which depend only on the function and are stored as the result of the analysis
+CACHED_ERRORS = ['AstVisitErr', 'Z3MapperErr']
+
+# declarations whose code is part of the analysis of their callers
+INLINED_DEFINITIONS = ['ModifierDefinition', 'FunctionDefinition']
+
+# modules generating the constraints and the models they read the AST with,
+# a change in their code invalidates the entries
+ANALYSIS_MODULES = [asthelper, astvisitor, expressionhelper, mapper, astindex, astnode, compactast, overlay, signatureindex, variable]
+
+# names given after the id of a node: the variables of the reassignments (see utils/instrumentation.py
+# convert_reassignment) and the expressions of the requires (see astvisitor.check_for_overflow_candidate).
+# The ids depend on the position of the function in its file, the names are numbered by position instead
+GENERATED_NAME_RE = re.compile(r'(?<![A-Za-z0-9_])(nvar|exp)_(\d+)(?![0-9])')
+
+_analysis_fingerprint = None
+
+
+def analysis_fingerprint() -> str:
+    """
+    Returns the sha256 of the code of the analysis, so that entries
+    produced by a different version of the tool are never returned
+    """
+    global _analysis_fingerprint
+
+    if _analysis_fingerprint is None:
+        digest = hashlib.sha256()
+        for module in ANALYSIS_MODULES:
+            with open(module.__file__, 'rb') as f:
+                digest.update(f.read())
+        _analysis_fingerprint = digest.hexdigest()
+
+    return _analysis_fingerprint
+
+
+def normalize_names(text: str) -> str:
+    """
+    Returns the text with the generated names (see GENERATED_NAME_RE) numbered by their first occurrence,
+    so that the copies of the same code in different positions are the same text
+    """
+    numbers = {}
+
+    def replace(match):
+        return '{}_{}'.format(match.group(1), numbers.setdefault(match.group(0), len(numbers)))
+
+    return GENERATED_NAME_RE.sub(replace, text)
+
+
+def _structural_hash(node: dict, ast_index) -> str:
+    """
+    Returns the structural hash of the node (see asthelper.structural_hash), with its generated names normalized
+    """
+    if not asthelper.find_node(node, {'name': GENERATED_NAME_RE.pattern}, ast_index):
+        return asthelper.structural_hash(node, ast_index)
+
+    return asthelper.structural_hash(json.loads(normalize_names(json.dumps(node))))
+
+
+def _references(node: dict, ast_index) -> dict:
+    """
+    Returns the declarations the node refers to (see asthelper.referenced_declarations), with the
+    library functions called through a MemberAccess (es. a.add(b), inlined by astvisitor.inline_calls)
+    """
+    references = asthelper.referenced_declarations([node], ast_index)
+    for member_access in asthelper.find_all_nodes(node, {'nodeType': '^MemberAccess$'}, ast_index):
+        declaration_id = member_access.dic.get('referencedDeclaration')
+        if type(declaration_id) is int and (ast_index.node(declaration_id) or {}).get('nodeType') in INLINED_DEFINITIONS:
+            references.setdefault(declaration_id, []).append(member_access)
+    return references
+
+
+def function_key(context: dict, function_name: str):
+    """
+    Key of the analysis of a function: the structural hash of its definition (ids, src and the
+    generated names are ignored, so the copies of the same code in many contracts share the key) and the
+    declarations outside the function it refers to, es. the name and type of the state variables
+    and the code of the modifiers and functions it calls
+
+    :param context: dict, returned by astvisitor.visit_context
+    :param function_name: str, function name under test
+    :return: str: hex digest, None if the function is not defined
+    """
+    function_node = astvisitor.function_definition(context, function_name)
+    if function_node is None:
+        return None
+
+    ast_index = context['ast_index']
+    references = _references(function_node.dic, ast_index)
+
+    # the modifiers and functions called are inlined (see astvisitor.summary),
+    # the declarations they refer to are part of the key too
+    definitions = [x for x in references if (ast_index.node(x) or {}).get('nodeType') in INLINED_DEFINITIONS]
+    while definitions:
+        definition = ast_index.node(definitions.pop())
+        related = list(_references(definition, ast_index))
+        if definition['nodeType'] == 'FunctionDefinition':
+            # the functions overriding it are the ones executed
+            related += [x['id'] for x in context['functions'].get(definition.get('name'), [])]
+
+        for declaration_id in related:
+            if declaration_id in references:
+                continue
+            references[declaration_id] = []
+            if (ast_index.node(declaration_id) or {}).get('nodeType') in INLINED_DEFINITIONS:
+                definitions.append(declaration_id)
+
+    # the state variables in storage order, as listed by the analysis
+    state_variables = [x for x in context['state_variables'] if x['id'] in references]
+    state_ids = set(x['id'] for x in state_variables)
+    events_ids = set(x['id'] for x in context['events'])
+
+    declarations = []
+    for declaration_id in references:
+        declaration = ast_index.node(declaration_id)
+        if declaration is None or declaration_id in state_ids:
+            continue
+        if declaration.get('nodeType') in INLINED_DEFINITIONS:
+            declarations.append([declaration['nodeType'], declaration.get('name'), _structural_hash(declaration, ast_index)])
+            continue
+        declarations.append([
+            'EventDefinition' if declaration_id in events_ids else declaration.get('nodeType'),
+            declaration.get('name'),
+            (declaration.get('typeDescriptions') or {}).get('typeString')
+        ])
+
+    description = {
+        'function': _structural_hash(function_node.dic, ast_index),
+        'state_variables': [[x['name'], x['typeDescriptions']['typeString']] for x in state_variables],
+        'declarations': declarations
+    }
+
+    digest = hashlib.sha256()
+    digest.update(analysis_fingerprint().encode('utf8'))
+    digest.update(json.dumps(description, sort_keys=True).encode('utf8'))
+    return digest.hexdigest()
+
+
+def analyze_function(context: dict, function_name: str) -> str:
+    """
+    Returns the Z3 constraints of the paths through the function (see astvisitor.visit_paths and mapper.paths_to_z3).
+    The constraints, or the AstVisitErr/Z3MapperErr raised, are stored in the cache:
+    the functions with the same key are not visited nor mapped again. The generated names
+    in the constraints are normalized (see normalize_names), so they are the same for every copy.
+
+    :param context: dict, returned by astvisitor.visit_context
+    :param function_name: str, function name under test
+    :return: str: generated Z3 code
+    """
+    key = function_key(context, function_name)
+    cached = compilecache.get(key) if key else None
+
+    if cached is not None:
+        if 'error' in cached:
+            raise Exception(*cached['error'])
+        return cached['z3']
+
+    try:
+        z3_generated_code = normalize_names(mapper.paths_to_z3(astvisitor.visit_paths(context, function_name)))
+    except Exception as e:
+        if key and len(e.args) == 2 and e.args[0] in CACHED_ERRORS:
+            compilecache.put(key, {'error': list(e.args)})
+        raise
+
+    if key:
+        compilecache.put(key, {'z3': z3_generated_code})
+
+    return z3_generated_code
+
+
+def analyze_contract(ast_json: list, function_names: list, contract_name: str = None) -> dict:
+    """
+    Returns the Z3 constraints of all the functions under test of a contract, the context
+    shared by the functions is computed once and the cached analyses are reused (see analyze_function).
+    A function which can not be analyzed does not stop the analysis of the others.
+
+    :param ast_json: ast of the file generated using solc
+    :param function_names: List<str>, function names under test
+    :param contract_name: (Optional) str, contract under test
+    :return: dict, function name -> generated Z3 code or the Exception which explains the failure
+    """
+    try:
+        context = astvisitor.visit_context(ast_json, contract_name)
+    except Exception as e:
+        return {function_name: e for function_name in function_names}
+
+    results = {}
+    for function_name in function_names:
+        try:
+            results[function_name] = analyze_function(context, function_name)
+        except Exception as e:
+            results[function_name] = e
+
+    return results
@@ -1,103 +1,375 @@
-import subprocess, json
-from models import variable, astnode
-import uuid
+import json
+import hashlib
+import threading
+from models import variable, astnode, astindex, compactast, signatureindex
+from modules import compilecache, solcpool
 import os
-import glob
 import re
 
-def compile(filename):
+# solc resolves imports from disk, such sources are not cached
+IMPORT_DIRECTIVE_RE = re.compile(rb'^\s*import\s', re.M)
+
+# types of the errors solc reports for the source code, only those are recorded in the negative cache
+SOURCE_ERROR_TYPES = frozenset(['ParserError', 'TypeError', 'DeclarationError', 'SyntaxError'])
+
+# signatures of the functions of an ERC20 contract (see signatureindex.signature)
+ERC20_INTERFACE = frozenset([
+    'transfer(address,uint256)returns(bool)',
+    'transferFrom(address,address,uint256)returns(bool)',
+    'approve(address,uint256)returns(bool)',
+    'balanceOf(address)returns(uint256)',
+    'allowance(address,address)returns(uint256)'
+])
+
+# binary snapshots of the compact ASTs, stored in the compilation cache
+SNAPSHOT_EXTENSION = '.ast'
+
+# query values without these characters are matched as plain strings
+REGEX_METACHARACTERS = frozenset('.^$*+?{}[]\\|()')
+SCALAR_TYPES = (str, int, float, type(None))
+
+# compiled queries kept in memory, the cache is emptied when full
+MAX_COMPILED_QUERIES = 4096
+_compiled_queries = {}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> solcpool.SolcPool:
     """
-    Compiles the solidity source code and import the json
-    :param filename: path of the file containing the source code
-    :return: List of object, one for sources (the first one is the one specified in filename)
+    Returns the pool of solc workers shared by the process
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = solcpool.SolcPool()
+        return _pool
+
+
+def _cache_key(source: bytes, output_selection: dict, imported_units: bool):
+    """
+    Returns the cache key of the compilation or None when it cannot be cached:
+    the output would depend on imported files, which are not part of the key.
+    """
+    if IMPORT_DIRECTIVE_RE.search(source):
+        return None
+
+    flags = ['--standard-json', json.dumps(output_selection, sort_keys=True)]
+    if imported_units:
+        flags.append('imported-units')
+
+    return compilecache.make_key(source, flags)
+
+
+def _standard_json_request(filename: str, source: bytes, output_selection: dict, imported_units: bool) -> dict:
+    """
+    Arguments of the solc pool to compile the source code
+    :param filename: name of the source unit, imports are resolved relatively to it
+    :param source: content of the source code
+    :param output_selection: standard-json selection, es. {'': ['ast']}
+    :param imported_units: if False, solc emits the output only for filename and not for its imports
+    """
+    has_imports = IMPORT_DIRECTIVE_RE.search(source) is not None
+
+    return {
+        'sources': {filename: {'content': source.decode('utf8')}},
+        'output_selection': output_selection,
+        'allow_paths': [os.path.dirname(os.path.abspath(filename))] if has_imports else None,
+        # without imports there is nothing else to select,
+        # keep the request self-contained so that it can be batched
+        'targets': ['*'] if imported_units and has_imports else [filename]
+    }
+
+
+def _failure_key(source: bytes):
+    """
+    Returns the key of the source in the negative cache (None if it cannot be cached).
+    Compile errors depend only on the source code and on the compiler.
+    """
+    if IMPORT_DIRECTIVE_RE.search(source):
+        return None
+
+    return compilecache.make_key(source, ['--compile-errors'])
+
+
+def _raise_if_known_failure(source: bytes):
+    """
+    Raises the AstCompileErr recorded for the source code by a previous compilation
     """
+    failure_key = _failure_key(source)
+    failure = compilecache.get(failure_key) if failure_key else None
+
+    if failure is not None:
+        raise Exception('AstCompileErr', failure['error'])
+
+
+def _check_errors(source: bytes, output: dict) -> dict:
+    """
+    Raises an AstCompileErr if solc reported errors (warnings are ignored)
+    Errors of the source code are recorded in the negative cache, so the source is not compiled again
+    (errors of the compiler or of its input, es. JSONError and IOError, may not happen again)
+    :return: the standard-json output
+    """
+    errors = [e for e in output.get('errors', []) if e['severity'] == 'error']
+
+    if errors:
+        error = '\n'.join(e.get('formattedMessage', e.get('message')) for e in errors)
+        failure_key = _failure_key(source)
+        if failure_key and all(e.get('type') in SOURCE_ERROR_TYPES for e in errors):
+            compilecache.put(failure_key, {'error': error})
+        raise Exception('AstCompileErr', error)
+
+    return output
+
+
+def _compile_standard_json(filename: str, source: bytes, output_selection: dict, imported_units: bool) -> dict:
+    """
+    Compiles the source code through the solc pool
+    :return: standard-json output
+    """
+    request = _standard_json_request(filename, source, output_selection, imported_units)
+    return _check_errors(source, get_pool().compile(**request))
+
+
+def _to_compilation_result(filename: str, output: dict) -> dict:
+    """
+    Converts the standard-json output in the structure returned by compile_contract
+    The AST of filename comes first, then the ones of the imported sources (sorted by source name)
+    """
+    sources = output.get('sources', {})
+    asts = [sources[name]['ast'] for name in sorted(sources, key=lambda x: (x != filename, x)) if 'ast' in sources[name]]
+
+    contracts = {}
+    for source_contracts in output.get('contracts', {}).values():
+        for name, contract in source_contracts.items():
+            contracts[name] = {
+                'abi': contract.get('abi', []),
+                'method_identifiers': contract.get('evm', {}).get('methodIdentifiers', {})
+            }
+
+    return {'filename': filename, 'asts': asts, 'contracts': contracts}
+
+
+def _read_source(filename: str) -> bytes:
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+def _get_cached(cache_key, filename: str):
+    """
+    Returns the cached compilation result, or None
+    """
+    cached = compilecache.get(cache_key) if cache_key else None
+
+    if cached is not None:
+        # the same source could have been compiled with a different file name
+        for ast in cached['asts']:
+            if ast.get('absolutePath') == cached['filename']:
+                ast['absolutePath'] = filename
+        cached['filename'] = filename
+
+    return cached
+
+
+def _compile_cached(filename: str, source: bytes, output_selection: dict, imported_units: bool = True) -> dict:
+    """
+    Compiles the source code, the result is cached on disk by content (see compilecache)
+    Sources which failed to compile are rejected without invoking solc again.
+    :param filename: name of the source unit
+    :param source: content of the source code
+    :param output_selection: standard-json selection
+    :param imported_units: include the output of the imported source units
+    """
+    cache_key = _cache_key(source, output_selection, imported_units)
+
+    cached = _get_cached(cache_key, filename)
+    if cached is not None:
+        return cached
+
+    _raise_if_known_failure(source)
+
+    output = _compile_standard_json(filename, source, output_selection, imported_units)
+    result = _to_compilation_result(filename, output)
+
+    if cache_key:
+        compilecache.put(cache_key, result)
+
+    return result
+
+
+def _load_snapshot(cache_key, filename: str):
+    """
+    Returns the cached compilation result with the AST memory-mapped from its snapshot, or None
+    """
+    path = compilecache.get_file(cache_key, SNAPSHOT_EXTENSION) if cache_key else None
+    if path is None:
+        return None
+
     try:
-        #], stderr=subprocess.DEVNULL
-        result = subprocess.run(['solc', '--ast-compact-json', filename], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout = result.stdout
-        stderr = result.stderr
+        asts = compactast.CompactAst.load(path)
+    except (OSError, ValueError, KeyError):
+        # truncated or written by another version, drop it
+        compilecache.remove(cache_key, SNAPSHOT_EXTENSION)
+        return None
+
+    # the same source could have been compiled with a different file name
+    asts.set_absolute_path(asts.metadata['filename'], filename)
 
-        if not stdout and stderr:
-            raise Exception('AstCompileErr', stderr.decode('utf8'))
+    return {'filename': filename, 'asts': asts, 'contracts': asts.metadata['contracts']}
 
-        # Remove headers from solc output
-        result = stdout.decode('utf8')
-        blocks = result.split('=======')
 
-        # remove header
-        blocks = blocks[1:]
+def _compile_compact(filename: str, source: bytes, output_selection: dict, imported_units: bool = True) -> dict:
+    """
+    Compiles the source code as _compile_cached, with the AST as a CompactAst.
+    The binary snapshot of the CompactAst is cached on disk, later compilations
+    of the same source memory-map it: neither solc nor the json parser run again.
+    """
+    cache_key = _cache_key(source, output_selection, imported_units)
 
-        # 0 -  filename1
-        # 1 - json_file_1
-        # 2 -  filename2
-        # 3 - json_file_2
-        # ...
+    cached = _load_snapshot(cache_key, filename)
+    if cached is not None:
+        return cached
 
-        # odd indexes are the json blocks
-        # even are the name of the files
+    result = _compile_cached(filename, source, output_selection, imported_units)
+    result['asts'] = compactast.CompactAst(result['asts'])
 
-        return [json.loads(block) for i, block in enumerate(blocks) if i % 2 != 0]
+    if cache_key:
+        metadata = {'filename': filename, 'contracts': result['contracts']}
+        compilecache.put_file(cache_key, SNAPSHOT_EXTENSION, lambda f: result['asts'].save(f, metadata))
 
-    except subprocess.CalledProcessError as exc:
-        raise Exception("Status : FAIL", exc.returncode, exc.stderr)
+    return result
 
-def get_abi(filename, contract_name):
+
+def compile(filename, imported_units=True):
     """
     Compiles the solidity source code and import the json
     :param filename: path of the file containing the source code
+    :param imported_units: if False, only the AST of filename is generated and parsed, not the imported ones
     :return: List of object, one for sources (the first one is the one specified in filename)
     """
-    try:
-        # ], stderr=subprocess.DEVNULL
-        result = subprocess.run(['solc', '--abi', filename], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout = result.stdout
-        stderr = result.stderr
+    return _compile_cached(filename, _read_source(filename), {'': ['ast']}, imported_units)['asts']
+
+
+def get_abi(filename, contract_name):
+    """
+    Compiles the solidity source code and import the json
+    :param filename: path of the file containing the source code
+    :param contract_name: name of the contract
+    :return: the abi of the contract (list of object)
+    """
+    return _compile_cached(filename, _read_source(filename), {'*': ['abi']})['contracts'][contract_name]['abi']
+
+
+def compile_contract(filename, compact=False):
+    """
+    Compiles the solidity source code once, returning both the AST and the interface of each contract
+    :param filename: path of the file containing the source code
+    :param compact: if True, the AST is returned as a CompactAst (memory-mapped from its snapshot when cached)
+    :return: dict {
+        'filename': filename,
+        'asts': List of object, one for sources (as returned by compile),
+        'contracts': {contract_name: {'abi': [...], 'method_identifiers': {'transfer(address,uint256)': 'a9059cbb'}}}
+    }
+    """
+    output_selection = {'': ['ast'], '*': ['abi', 'evm.methodIdentifiers']}
+
+    if compact:
+        return _compile_compact(filename, _read_source(filename), output_selection)
+
+    return _compile_cached(filename, _read_source(filename), output_selection)
+
+
+def function_names(compilation: dict, contract_name: str) -> list:
+    """
+    Returns the names of the public/external functions of the contract (overloads are listed once)
+    :param compilation: result of compile_contract
+    :param contract_name: name of the contract
+    """
+    signatures = compilation['contracts'][contract_name]['method_identifiers']
 
-        if not stdout and stderr:
-            raise Exception('AstCompileErr', stderr.decode('utf8'))
+    names = []
+    for signature in signatures:
+        name = signature.split('(')[0]
+        if name not in names:
+            names.append(name)
 
-        # Remove headers from solc output
-        result = stdout.decode('utf8')
-        blocks = result.split('=======')
+    return names
 
-        # remove header
-        blocks = blocks[1:]
 
-        # 0 -  filename1
-        # 1 - json_file_1
-        # 2 -  filename2
-        # 3 - json_file_2
-        # ...
+def compile_from_source(source: str, filename: str = None, compact=False):
+    """
+    Compiles the source code passed in memory, nothing is written on disk,
+    so it can be called concurrently from different threads or processes
+    :param source: solidity source code
+    :param filename: (Optional) name of the source unit, imports are resolved relatively to it
+    :param compact: if True, the AST is returned as a CompactAst (memory-mapped from its snapshot when cached)
+    :return: List with the AST of the source, imported sources are not included
+    """
+    content = source.encode('utf8')
 
-        # odd indexes are the json blocks
-        # even are the name of the files
+    if filename is None:
+        filename = 'source_{}.sol'.format(hashlib.sha1(content).hexdigest())
 
-        abi_list =  [blocks[i+1] for i, block in enumerate(blocks) if ":" + contract_name in block]
-        abi_str = abi_list[0].split('\n')[2]
-        return json.loads(abi_str)
+    if compact:
+        return _compile_compact(filename, content, {'': ['ast']}, imported_units=False)['asts']
 
-    except subprocess.CalledProcessError as exc:
-        raise Exception("Status : FAIL", exc.returncode, exc.stderr)
+    return _compile_cached(filename, content, {'': ['ast']}, imported_units=False)['asts']
 
 
-def compile_from_source(source: str):
-    # remove existing files in tmp
+def compile_batch(filenames: list, chunk_size: int = None) -> dict:
+    """
+    Compiles many files (es. a corpus of contracts) with few solc invocations:
+    each chunk of files is compiled with a single standard-json request and
+    the chunks are compiled in parallel by the workers of the pool.
+    Results already in cache and known compile failures are not compiled again.
+    :param filenames: paths of the files containing the source code
+    :param chunk_size: number of files compiled by one solc invocation (default and
+    upper bound: max_batch_size of the pool)
+    :return: dict {filename: result of compile_contract or the AstCompileErr exception}
+    """
+    output_selection = {'': ['ast'], '*': ['abi', 'evm.methodIdentifiers']}
 
-    import os
-    if not os.path.exists('tmp'):
-        os.makedirs('tmp')
+    results = {}
+    pending = []
 
-    files = glob.glob('./tmp/*')
-    for f in files:
-        os.remove(f)
+    for filename in filenames:
+        source = _read_source(filename)
+        cache_key = _cache_key(source, output_selection, True)
 
-    # create a new tmp file copying the source code
-    temporary_file_path = './tmp/{}'.format(uuid.uuid4().hex)
-    with open(temporary_file_path, 'w') as f:
-        f.write(source)
+        cached = _get_cached(cache_key, filename)
+        if cached is not None:
+            results[filename] = cached
+            continue
 
-    # call compile specifing the created file path
-    return compile(temporary_file_path)
+        try:
+            _raise_if_known_failure(source)
+        except Exception as e:
+            results[filename] = e
+            continue
+
+        pending.append((filename, source, cache_key, _standard_json_request(filename, source, output_selection, True)))
+
+    chunk_size = min(chunk_size or get_pool().max_batch_size, get_pool().max_batch_size)
+
+    futures = []
+    for i in range(0, len(pending), chunk_size):
+        chunk = pending[i:i + chunk_size]
+        futures += zip(chunk, get_pool().submit_batch([request for _, _, _, request in chunk]))
+
+    for (filename, source, cache_key, _), future in futures:
+        try:
+            result = _to_compilation_result(filename, _check_errors(source, future.result()))
+        except Exception as e:
+            results[filename] = e
+            continue
+
+        if cache_key:
+            compilecache.put(cache_key, result)
+        results[filename] = result
+
+    return results
 
 
 def match_function(function_ast, expected_function):
@@ -128,92 +400,307 @@ def match_function(function_ast, expected_function):
     return True
 
 
-def _is_a_match(node, properties):
-    if type(node) is not dict:
-        return False
+def _compile_value(value):
+    """
+    Returns the predicate testing the value of a property against value:
+    equality for int and bool, re.search on the str of scalar values otherwise
+    """
+    if isinstance(value, int):
+        return lambda x: x == value
+
+    # strings without regex syntax, optionally anchored, are compared without regex
+    anchored_start = value.startswith('^')
+    literal = value[1:] if anchored_start else value
+    anchored_end = literal.endswith('$')
+    literal = literal[:-1] if anchored_end else literal
+
+    if REGEX_METACHARACTERS.isdisjoint(literal):
+        # '$' matches also before a trailing new line
+        if anchored_start and anchored_end:
+            test = lambda x: x == literal or x == literal + '\n'
+        elif anchored_start:
+            test = lambda x: x.startswith(literal)
+        elif anchored_end:
+            test = lambda x: x.endswith(literal) or x.endswith(literal + '\n')
+        else:
+            test = lambda x: literal in x
+    else:
+        test = re.compile(value).search
+
+    def match(x):
+        if type(x) is str:
+            return bool(test(x))
+        # dict and list values are never turned into strings
+        return isinstance(x, SCALAR_TYPES) and bool(test(str(x)))
+
+    return match
+
+
+def _compile_query(properties: dict):
+    """
+    Returns the predicate testing if a node matches the properties
+    Compiled queries are cached, so each query is compiled once
+    """
+    key = tuple(properties.items())
+    if key in _compiled_queries:
+        return _compiled_queries[key]
 
-    for property, value in properties.items():
+    tests = [(property, _compile_value(value)) for property, value in key]
 
-        if property not in node:
+    def match(node):
+        if type(node) is not dict:
             return False
 
-        # boolean or int
-        # check specific value
-        if isinstance(value, int) and node[property] != value:
-            return False
+        for property, test in tests:
+            if property not in node or not test(node[property]):
+                return False
 
-        if not isinstance(value, int) and len(re.findall(value, str(node[property]))) == 0:
-           return False
+        return True
+
+    if len(_compiled_queries) >= MAX_COMPILED_QUERIES:
+        _compiled_queries.clear()
+
+    _compiled_queries[key] = match
+    return match
 
-    return True
+
+def _is_a_match(node, properties):
+    return _compile_query(properties)(node)
 
 
-def _find_node(parent, ast, properties):
+def _wrap_parent(path: list, wrapped: list) -> astnode.AstNode:
     """
-    Find and return the first node that match the properties
+    Returns the AstNode of the last container in path, building the missing AstNode of the chain
+    :param path: containers from the root to the parent of a node
+    :param wrapped: AstNode of the containers in path, None if not built yet
+    """
+    parent = None
+    for i, container in enumerate(path):
+        if wrapped[i] is None:
+            wrapped[i] = astnode.AstNode(parent, container)
+        parent = wrapped[i]
+
+    return parent
+
+
+def _children(container):
+    return iter(container.values() if type(container) is dict else container)
+
+
+def _iter_matches(ast, test):
+    """
+    Visits the tree depth-first with an explicit stack, and yields (result, node, AstNode of the parent)
+    for each node where test(node) is truthy. The AstNode of the parents are built only for these nodes.
+    """
+    result = test(ast)
+    if result:
+        yield result, ast, None
+
+    if type(ast) is not dict and type(ast) is not list:
+        return
+
+    # path[i] is the container visited by iterators[i]
+    path = [ast]
+    wrapped = [None]
+    iterators = [_children(ast)]
+
+    while iterators:
+        for element in iterators[-1]:
+            if type(element) is dict or type(element) is list:
+                break
+        else:
+            iterators.pop()
+            path.pop()
+            wrapped.pop()
+            continue
+
+        result = test(element)
+        if result:
+            yield result, element, _wrap_parent(path, wrapped)
+
+        path.append(element)
+        wrapped.append(None)
+        iterators.append(_children(element))
+
+
+def iter_nodes(ast, properties):
+    """
+    Yields the nodes that match the properties, in the order of a depth-first visit
+    The tree is visited with an explicit stack, and the AstNode of the parents
+    are built only for the nodes yielded
     :param ast: object representing the AST
     :param properties: dictionary of the property to search (for example, {'name': 'transfer'})
     """
+    for _, node, parent in _iter_matches(ast, _compile_query(properties)):
+        yield astnode.AstNode(parent, node)
+
+
+def index(ast) -> astindex.AstIndex:
+    """
+    Builds the index of the AST, to answer many queries without visiting the tree again
+    :param ast: object representing the AST (es. the list returned by compile), an AstIndex is returned as it is
+    """
+    if isinstance(ast, astindex.AstIndex):
+        return ast
 
-    if _is_a_match(ast, properties):
-        return astnode.AstNode(parent, ast)
+    return astindex.AstIndex(ast)
 
-    if type(ast) is list:
-        for element in ast:
-            new_parent = astnode.AstNode(parent, ast)
-            found = _find_node(new_parent, element, properties)
-            if found:
-                return found
 
-    elif type(ast) is dict:
-        for key, value in ast.items():
-            if type(value) is dict or type(value) is list:
-                new_parent = astnode.AstNode(parent, ast)
-                found = _find_node(new_parent, value, properties)
-                if found:
-                    return found
+def compact(ast) -> compactast.CompactAst:
+    """
+    Builds the compact representation of the AST, which can be used in place of the AST
+    and of its index (es. by astvisitor.visit_ast). The nodes are decoded when a query
+    returns them, so the AST passed should not be used anymore.
+    :param ast: object representing the AST (es. the list returned by compile)
+    """
+    return compactast.CompactAst(ast)
 
-    return False
 
+def structural_hash(node: dict, ast_index: astindex.AstIndex = None) -> str:
+    """
+    Returns the hash of the subtree of node ignoring ids and src, usable as key for the
+    results on the node: the copies of the same code in many contracts have the same hash
+    :param ast_index: (Optional) the CompactAst containing the node, which already knows the hash of the members
+    """
+    if isinstance(ast_index, compactast.CompactAst) and node in ast_index:
+        return ast_index.structural_hash(node)
+
+    return compactast.structural_hash(node)
+
+
+def _indexed_candidates(ast_index: astindex.AstIndex, ast, properties):
+    """
+    Returns the objects of the subtree ast which can match the properties
+    """
+    # properties the index can test without reading the nodes
+    prefilter = {k: _compile_value(v) for k, v in properties.items() if k in ast_index.columns} or None
+
+    node_type = properties.get('nodeType')
+
+    if node_type is None or isinstance(node_type, int):
+        return ast_index.subtree(ast, prefilter)
+
+    is_a_node_type = _compile_value(node_type)
+    node_types = [x for x in ast_index.node_types() if is_a_node_type(x)]
+    return ast_index.nodes_of_types(node_types, ast, prefilter)
 
-def find_node(ast, properties):
-    return _find_node(None, ast, properties)
+
+def _resolve_index(ast, ast_index):
+    """
+    Returns (ast, index), the index is None if it does not cover ast
+    and ast is None when the whole indexed tree is requested
+    """
+    if isinstance(ast, astindex.AstIndex):
+        return None, ast
+
+    if ast_index is not None and (ast is None or ast in ast_index):
+        return ast, ast_index
+
+    return ast, None
+
+
+def find_node(ast, properties, ast_index: astindex.AstIndex = None):
+    """
+    Find and return the first node that match the properties
+    :param ast: object representing the AST, or its AstIndex
+    :param properties: dictionary of the property to search (for example, {'name': 'transfer'})
+    :param ast_index: (Optional) index of a tree containing ast, used instead of visiting ast
+    """
+    ast, ast_index = _resolve_index(ast, ast_index)
+
+    if ast_index is None:
+        return next(iter_nodes(ast, properties), False)
+
+    is_a_match = _compile_query(properties)
+    for candidate in _indexed_candidates(ast_index, ast, properties):
+        if is_a_match(candidate):
+            return ast_index.wrap(candidate, ast)
+
+    return False
 
 def find_parent(node: astnode.AstNode, properties: dict):
+    is_a_match = _compile_query(properties)
     my_parent = node.parent
-    while my_parent != None and not _is_a_match(my_parent.dic, properties):
+    while my_parent != None and not is_a_match(my_parent.dic):
         my_parent = my_parent.parent
     return my_parent
 
-def _find_all_nodes(parent, ast, properties, outputs):
+def find_all_nodes(ast, properties, ast_index: astindex.AstIndex = None):
+    """
+    Find and return all the nodes that match the properties
+    :param ast: object representing the AST, or its AstIndex
+    :param properties: dictionary of the property to search (for example, {'name': 'transfer'})
+    :param ast_index: (Optional) index of a tree containing ast, used instead of visiting ast
+    """
+    ast, ast_index = _resolve_index(ast, ast_index)
 
-    # Add to the list if it is matching
-    if _is_a_match(ast, properties):
-        outputs.append(astnode.AstNode(parent, ast))
+    if ast_index is None:
+        return list(iter_nodes(ast, properties))
 
-    # Call find_all_nodes on its childs
-    if type(ast) is list:
-        for element in ast:
-            new_parent = astnode.AstNode(parent, ast)
-            _find_all_nodes(new_parent, element, properties, outputs)
+    is_a_match = _compile_query(properties)
+    return ast_index.wrap_all([x for x in _indexed_candidates(ast_index, ast, properties) if is_a_match(x)], ast)
 
-    elif type(ast) is dict:
-        for key, value in ast.items():
-            if type(value) is dict or type(value) is list:
-                new_parent = astnode.AstNode(parent, ast)
-                _find_all_nodes(new_parent, value, properties, outputs)
 
-    # At the end, the element on the top will return the list
-    return outputs
+def find_all_nodes_by_query(ast, queries: dict, ast_index: astindex.AstIndex = None) -> dict:
+    """
+    Find all the nodes that match each query, visiting the tree once
+    :param ast: object representing the AST, or its AstIndex
+    :param queries: dictionary name -> properties (for example, {'calls': {'nodeType': '^FunctionCall$'}})
+    :param ast_index: (Optional) index of a tree containing ast, used instead of visiting ast
+    :return: dictionary name -> list of AstNode, as returned by find_all_nodes
+    """
+    ast, ast_index = _resolve_index(ast, ast_index)
+
+    if ast_index is not None:
+        return {name: find_all_nodes(ast, properties, ast_index) for name, properties in queries.items()}
 
+    tests = [(name, _compile_query(properties)) for name, properties in queries.items()]
 
-def find_all_nodes(ast, properties):
+    def matching_queries(node):
+        return [name for name, is_a_match in tests if is_a_match(node)]
+
+    results = {name: [] for name in queries}
+    for names, node, parent in _iter_matches(ast, matching_queries):
+        for name in names:
+            results[name].append(astnode.AstNode(parent, node))
+
+    return results
+
+
+def referenced_declarations(nodes: list, ast_index: astindex.AstIndex = None) -> dict:
     """
-    Find and return the first node that match the properties
-    :param ast: object representing the AST
-    :param properties: dictionary of the property to search (for example, {'name': 'transfer'})
+    Returns the inverted index of the Identifiers in the subtrees of nodes, built visiting
+    each subtree once: the accesses to many declarations are lookups instead of one visit each
+    :param nodes: list of objects of the AST (es. the statements of a function)
+    :param ast_index: (Optional) index of a tree containing the nodes, used instead of visiting them
+    :return: dictionary referencedDeclaration -> list of AstNode, in the order of the nodes
+    """
+    references = {}
+    for node in nodes:
+        for identifier in find_all_nodes(node, {'nodeType': 'Identifier'}, ast_index):
+            if 'referencedDeclaration' in identifier.dic:
+                references.setdefault(identifier.dic['referencedDeclaration'], []).append(identifier)
+
+    return references
+
+
+def linearized_contracts(ast, contract_name: str, ast_index: astindex.AstIndex = None) -> list:
+    """
+    Returns the ContractDefinition of the contract followed by the ones it inherits from,
+    in the order of its linearizedBaseContracts (from the most derived)
+    :param ast: object representing the AST, or its AstIndex
+    :param ast_index: (Optional) index of a tree containing ast, used instead of visiting ast
+    :return: list of dict, empty if the contract is not defined in ast
     """
-    return _find_all_nodes(None, ast, properties, [])
+    contracts = [x.dic for x in find_all_nodes(ast, {'nodeType': '^ContractDefinition$'}, ast_index)]
+    contracts_by_id = {x.get('id'): x for x in contracts}
+
+    for contract in contracts:
+        if contract.get('name') == contract_name:
+            linearized = contract.get('linearizedBaseContracts') or [contract.get('id')]
+            return [contracts_by_id[x] for x in linearized if x in contracts_by_id]
+
+    return []
 
 
 def write_on_file(asts_json):
@@ -226,73 +713,26 @@ def write_on_file(asts_json):
         json.dump(asts_json, outfile)
 
 
+def signature_index(ast) -> signatureindex.SignatureIndex:
+    """
+    Builds the index of the signatures of the functions of each contract (see SignatureIndex)
+    :param ast: object representing the AST, or its AstIndex
+    """
+    return signatureindex.SignatureIndex(index(ast))
+
+
 def isERC20(main_ast: str):
     """
     Takes in input the AST of the Solidity code
     Checks if it is a valid ERC20 contract
-    :param main_ast: the root ast
+    :param main_ast: the root ast, or its AstIndex
+    :return: the first ContractDefinition implementing the ERC20 functions, None if missing
 
     Example:
         asts_json = compile(filename)
-        erc20 = isERC20(asts_json[1])
+        erc20 = isERC20(asts_json[0])
     """
 
     # We need to check that at least one contract of the file implements the ERC20 interface
-    contracts = find_all_nodes(main_ast, {'nodeType': 'ContractDefinition'})
-
-    erc_20_interface = [
-        {
-            'name': 'transfer',
-            'implemented': True,
-            'parameters': [ {'type': 'address'}, {'type': 'uint256'}],
-            'returnParameters': [ { 'type': 'bool' }]
-        },
-        {
-            'name': 'transferFrom',
-            'implemented': True,
-            'parameters': [{'type': 'address'}, {'type': 'address'}, {'type': 'uint256'}],
-            'returnParameters': [{'type': 'bool'}]
-        },
-        {
-            'name': 'approve',
-            'implemented': True,
-            'parameters': [{'type': 'address'}, {'type': 'uint256'}],
-            'returnParameters': [{'type': 'bool'}]
-        },
-        {
-            'name': 'balanceOf',
-            'implemented': True,
-            'parameters': [{'type': 'address'}],
-            'returnParameters': [{'type': 'uint256' }]
-        },
-        {
-            'name': 'allowance',
-            'implemented': True,
-            'parameters': [{'type': 'address'}, {'type': 'address'}],
-            'returnParameters': [{'type': 'uint256'}]
-        }
-    ]
-
-    for contract in contracts:
-        print("contract", contract['name'])
-        functions = find_all_nodes(contract, {'nodeType': 'FunctionDefinition'})
-
-        matching_contract = None
-        for expected_function in erc_20_interface:
-
-            found = None
-            for function in functions:
-                if match_function(function, expected_function):
-                    found = function
-                    break
-
-            if not found:
-                # I have no match for the expected_function in this contract
-                # break and skip the contract
-                matching_contract = False
-                break
-
-        if matching_contract == None:
-            # I'm here because I found a contract which implements the ERC20 interface
-            return contract
-
+    contracts = signature_index(main_ast).implementing(ERC20_INTERFACE)
+    return contracts[0] if contracts else None
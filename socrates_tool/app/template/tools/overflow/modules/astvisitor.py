@@ -1,13 +1,30 @@
+import copy
+from models import astnode
+from models import overlay
+from models import signatureindex
 from modules import asthelper
 from modules import expressionhelper
 
+# budgets of the paths enumeration (see enumerate_paths): paths of a function,
+# iterations of a loop on a path, nodes of the statements of a path
+MAX_PATHS = 8
+MAX_LOOP_ITERATIONS = 2
+MAX_PATH_NODES = 2000
 
-def filter_statements(events, statements_nodes):
+BRANCH_STATEMENTS = ['IfStatement']
+LOOP_STATEMENTS = ['ForStatement', 'WhileStatement']
+
+# calls inlined into the statements of a helper inlined, the deeper ones are not
+MAX_INLINE_DEPTH = 4
+
+
+def filter_statements(events, statements_nodes, ast_index=None):
 	"""
 	Analyzes all the statements passed to the function.
 	Returns a list with the first not-banned statements
 	:param events: List with the declaration IDs of the events
 	:param statements_nodes: List of statements as a list of astnode
+	:param ast_index: (Optional) AstIndex of the tree containing the statements
 	:return: List<AstNode> | []
 	"""
 	banned = ["ForStatement", "IfStatement", "WhileStatement"]
@@ -31,7 +48,7 @@ def filter_statements(events, statements_nodes):
 		#  - if it is an event -> just skip
 		#  - otherwise -> reject
 
-		function_call_node = asthelper.find_node(node, {"nodeType": "^FunctionCall$"})
+		function_call_node = asthelper.find_node(node, {"nodeType": "^FunctionCall$"}, ast_index)
 
 		# Check the function call (typeConversion pass the check)
 		# Skip the logs, save the require, abort if there is a custom function call
@@ -53,7 +70,545 @@ def filter_statements(events, statements_nodes):
 	return return_list
 
 
-def check_for_overflow_candidate(node):
+def _statements(node) -> list:
+	"""
+	Returns the statements of the body of a branch or a loop (a Block or a single statement)
+	"""
+	if not node:
+		return []
+	if node['nodeType'] == 'Block':
+		return list(node['statements'])
+	return [node]
+
+
+def _size(node) -> int:
+	"""
+	Returns the number of nodes in the subtree of node
+	"""
+	size = 0
+	stack = [node]
+	while stack:
+		current = stack.pop()
+		if type(current) is dict:
+			if 'nodeType' in current:
+				size += 1
+			stack += [x for x in current.values() if type(x) is dict or type(x) is list]
+		elif type(current) is list:
+			stack += [x for x in current if type(x) is dict or type(x) is list]
+	return size
+
+
+def _guard(condition: dict, holds: bool = True) -> dict:
+	"""
+	Returns the statement require(condition), or require(!(condition)) if the condition does not hold,
+	the constraint of a branch taken by a path. The statement is not part of the AST.
+	"""
+	bool_type = {'typeIdentifier': 't_bool', 'typeString': 'bool'}
+
+	if not holds:
+		condition = {
+			'nodeType': 'UnaryOperation', 'operator': '!', 'prefix': True, 'typeDescriptions': bool_type,
+			'subExpression': {'nodeType': 'TupleExpression', 'components': [condition], 'isInlineArray': False, 'typeDescriptions': bool_type}
+		}
+
+	return {
+		'nodeType': 'ExpressionStatement',
+		'expression': {
+			'nodeType': 'FunctionCall', 'kind': 'functionCall', 'arguments': [condition], 'names': [],
+			'expression': {'nodeType': 'Identifier', 'name': 'require', 'typeDescriptions': {'typeIdentifier': 't_function_require_pure$_t_bool_$returns$__$', 'typeString': 'function (bool) pure'}},
+			'typeDescriptions': {'typeIdentifier': 't_tuple$__$', 'typeString': 'tuple()'}
+		}
+	}
+
+
+def _is_call_to(statement: dict, names: list) -> bool:
+	"""
+	Returns True if the statement is the call of a global function (es. revert, assert)
+	"""
+	expression = statement.get('expression') if statement['nodeType'] == 'ExpressionStatement' else None
+	return bool(expression) and expression['nodeType'] == 'FunctionCall' and expression['expression']['nodeType'] == 'Identifier' \
+		and expression['expression'].get('name') in names and (expression['expression'].get('referencedDeclaration') or -1) < 0
+
+
+def _aborts(node) -> bool:
+	"""
+	Returns True if the body of the branch ends the function with a failure:
+	revert(), throw or return false, the transactions taking it are not witnesses
+	"""
+	statements = _statements(node)
+	if not statements:
+		return False
+
+	last = statements[-1]
+	if last['nodeType'] == 'Throw' or _is_call_to(last, ['revert']):
+		return True
+
+	returned = last.get('expression') if last['nodeType'] == 'Return' else None
+	return bool(returned) and returned['nodeType'] == 'Literal' and returned.get('value') == 'false'
+
+
+def _as_guard(statement: dict):
+	"""
+	Returns the require statement equivalent to the statement, None if there is not:
+	assert(c) and if (c) revert(); (or throw, return false) without else are guards
+	"""
+	if _is_call_to(statement, ['assert']):
+		return _guard(statement['expression']['arguments'][0])
+
+	if statement['nodeType'] in BRANCH_STATEMENTS and _aborts(statement['trueBody']) and not statement.get('falseBody'):
+		return _guard(statement['condition'], False)
+
+	return None
+
+
+def _suffixed_copy(nodes: list, suffix: str, renamed: set = ()) -> list:
+	"""
+	Returns a copy of the nodes where the variables declared in the nodes (and the ones in renamed)
+	get the suffix, in their declarations and in the identifiers referring to them.
+	The ids of the copies get the suffix too, the expressions named after them stay distinct.
+	"""
+	nodes = copy.deepcopy(nodes)
+
+	declarations = set(renamed)
+	for node in nodes:
+		declarations.update(x['id'] for x in asthelper.find_all_nodes(node, {'nodeType': '^VariableDeclaration$'}))
+
+	stack = list(nodes)
+	while stack:
+		current = stack.pop()
+		if type(current) is list:
+			stack += current
+			continue
+		if type(current) is not dict:
+			continue
+
+		if current.get('nodeType') in ['VariableDeclaration', 'Identifier']:
+			reference = current.get('id') if current['nodeType'] == 'VariableDeclaration' else current.get('referencedDeclaration')
+			if reference in declarations:
+				current['name'] = current['name'] + suffix
+				if current['nodeType'] == 'Identifier':
+					current['referencedDeclaration'] = '{}{}'.format(reference, suffix)
+
+		if 'id' in current:
+			current['id'] = '{}{}'.format(current['id'], suffix)
+
+		stack += [x for x in current.values() if type(x) is dict or type(x) is list]
+
+	return nodes
+
+
+def _iteration(nodes: list, iteration: int, renamed: set) -> list:
+	"""
+	Returns a copy of the nodes for an iteration of a loop (see _suffixed_copy),
+	so the iterations of a path do not share variables.
+	"""
+	return _suffixed_copy(nodes, '_it{}'.format(iteration), renamed)
+
+
+def _loop_counter(loop: dict):
+	"""
+	Returns (declaration, first value, step) of the counter of a for loop such as
+	for (uint i = 0; i < n; i++), None if the loop has not a counter of this form
+	"""
+	initialization = loop.get('initializationExpression')
+	increment = loop.get('loopExpression')
+
+	if not initialization or initialization['nodeType'] != 'VariableDeclarationStatement' or len(initialization['declarations']) != 1:
+		return None
+	if not increment or increment['nodeType'] != 'ExpressionStatement':
+		return None
+
+	declaration = initialization['declarations'][0]
+	first_value = initialization.get('initialValue')
+	if not declaration or not first_value or first_value['nodeType'] != 'Literal' or not str(first_value['value']).isdigit():
+		return None
+
+	expression = increment['expression']
+	if expression['nodeType'] == 'UnaryOperation' and expression['operator'] == '++':
+		counter, step = expression['subExpression'], '1'
+	elif expression['nodeType'] == 'Assignment' and expression['operator'] == '+=' and expression['rightHandSide']['nodeType'] == 'Literal':
+		counter, step = expression['leftHandSide'], str(expression['rightHandSide']['value'])
+	else:
+		return None
+
+	if counter['nodeType'] != 'Identifier' or counter.get('referencedDeclaration') != declaration['id'] or not step.isdigit():
+		return None
+
+	return declaration, int(first_value['value']), int(step)
+
+
+def _unroll(loop: dict, iterations: int):
+	"""
+	Returns the statements of a path executing the loop for the given number of iterations:
+	before each iteration its condition holds, after the last one it does not.
+	The counter of a for loop (see _loop_counter) gets its value in each iteration. The assignments
+	are not modeled (as for any statement), so the other loops are executed only with 0 iterations.
+	None if the loop can not be unrolled.
+	"""
+	condition = loop.get('condition')
+	if not condition or asthelper.find_node(loop['body'], {'nodeType': '^(Break|Continue)$'}):
+		return None
+
+	counter = None
+	statements = []
+	if loop['nodeType'] == 'ForStatement':
+		counter = _loop_counter(loop)
+		initialization = loop.get('initializationExpression')
+		if initialization and initialization['nodeType'] != 'VariableDeclarationStatement':
+			return None
+		if initialization:
+			statements.append(initialization)
+
+	if iterations and not counter:
+		return None
+
+	renamed = set()
+	if counter:
+		renamed.add(counter[0]['id'])
+
+	for iteration in range(iterations + 1):
+		if iteration == 0:
+			iteration_condition, body = condition, _statements(loop['body'])
+		else:
+			iteration_condition, *body = _iteration([condition] + _statements(loop['body']), iteration, renamed)
+			if counter:
+				declaration, first_value, step = counter
+				value = first_value + iteration * step
+				statements.append({
+					'nodeType': 'VariableDeclarationStatement', 'id': '{}_it{}'.format(declaration['id'], iteration),
+					'declarations': _iteration([declaration], iteration, renamed),
+					'initialValue': {'nodeType': 'Literal', 'kind': 'number', 'value': str(value), 'typeDescriptions': {
+						'typeIdentifier': 't_rational_{}_by_1'.format(value), 'typeString': 'int_const {}'.format(value)}}
+				})
+
+		if iteration == iterations:
+			statements.append(_guard(iteration_condition, False))
+		else:
+			statements.append(_guard(iteration_condition))
+			statements += body
+
+	return statements
+
+
+def _substitute(node, replace):
+	"""
+	Returns a copy of node where the subtrees for which replace returns a node are replaced by it
+	"""
+	replacement = replace(node)
+	if replacement is not None:
+		return replacement
+	if type(node) is dict:
+		return {key: _substitute(value, replace) for key, value in node.items()}
+	if type(node) is list:
+		return [_substitute(x, replace) for x in node]
+	return node
+
+
+def _replace_references(node, declaration_id, replacement: dict):
+	"""
+	Returns a copy of node where the identifiers referring to the declaration are replaced by replacement
+	"""
+	def replace(x):
+		if type(x) is dict and x.get('nodeType') == 'Identifier' and x.get('referencedDeclaration') == declaration_id:
+			return copy.deepcopy(replacement)
+		return None
+
+	return _substitute(node, replace)
+
+
+def _rename_references(nodes: list, renamed: dict) -> list:
+	"""
+	Returns a copy of the nodes where the identifiers referring to a renamed declaration refer to its new one
+	:param renamed: dict, id of a declaration -> the VariableDeclaration replacing it
+	"""
+	for declaration_id, declaration in renamed.items():
+		identifier = {'nodeType': 'Identifier', 'name': declaration['name'], 'referencedDeclaration': declaration['id'],
+			'typeDescriptions': declaration['typeDescriptions']}
+		nodes = [_replace_references(x, declaration_id, identifier) for x in nodes]
+	return nodes
+
+
+def _refers_to(node, declaration_id) -> bool:
+	"""
+	Returns True if an identifier in the node refers to the declaration (the ids of the unrolled loops are strings)
+	"""
+	stack = [node]
+	while stack:
+		current = stack.pop()
+		if type(current) is dict:
+			if current.get('nodeType') == 'Identifier' and current.get('referencedDeclaration') == declaration_id:
+				return True
+			stack.extend(current.values())
+		elif type(current) is list:
+			stack.extend(current)
+	return False
+
+
+def _operation(operator: str, left: dict, right: dict, type_descriptions: dict) -> dict:
+	"""
+	Returns the binary operation (a comparison if type_descriptions is bool), not part of the AST
+	"""
+	return {'nodeType': 'BinaryOperation', 'operator': operator, 'leftExpression': left, 'rightExpression': right,
+		'commonType': left.get('typeDescriptions') or type_descriptions, 'typeDescriptions': type_descriptions}
+
+
+def _closed_form(index: dict, condition: dict, term: dict, type_descriptions: dict) -> dict:
+	"""
+	Returns the sum of the term over the iterations of a loop satisfying the condition (see expressionhelper.ClosedForm),
+	not part of the AST. The index is the identifier of an iteration in the condition and in the term, it has no declaration.
+	"""
+	return {'nodeType': 'ClosedForm', 'index': index, 'condition': condition, 'term': term, 'typeDescriptions': type_descriptions}
+
+
+def _local_variable(declaration_id: str, name: str, type_descriptions: dict, initial_value: dict = None) -> dict:
+	"""
+	Returns the declaration statement of a local variable, not part of the AST
+	"""
+	return {
+		'nodeType': 'VariableDeclarationStatement', 'id': '{}_statement'.format(declaration_id), 'initialValue': initial_value,
+		'declarations': [{'nodeType': 'VariableDeclaration', 'id': declaration_id, 'name': name, 'stateVariable': False,
+			'typeDescriptions': type_descriptions}]
+	}
+
+
+def _summarize_loop(loop: dict, events: list = ()):
+	"""
+	Summarizes a for loop accumulating values over an array, without unrolling it: the values it
+	accumulates are given by their closed form, whatever the number of iterations (up to max_array_len).
+	 - sum over an array: total += values[i] gives total_loop = total + Sum(values[k] for each iteration k)
+	 - counter increment: count++, count += c gives count_loop = count + c * iterations
+	 - mapping update: balances[receivers[i]] += value gives balances_update = balances[receivers[i_any]] + value,
+	   where i_any is any iteration of the loop (an element overflows if the update of one iteration does),
+	   reading elements of the arrays (i_any < receivers.length) and accounts of the mappings (receivers[i_any] >= 0)
+	The statements after the loop refer to the accumulated variables (es. total_loop instead of total).
+	The other assignments of the loop are not modeled (as for any statement), the events are skipped.
+
+	:param loop: ForStatement with a counter (see _loop_counter) and a condition i < bound or i <= bound
+	:param events: List of the EventDefinitions
+	:return: List of the alternatives of a path (statements, renamed declarations), see enumerate_paths:
+	the loop is not executed or it is executed at least once. None if the loop can not be summarized
+	"""
+	if loop['nodeType'] != 'ForStatement':
+		return None
+
+	counter = _loop_counter(loop)
+	condition = loop.get('condition')
+	if not counter or counter[2] != 1 or not condition or condition['nodeType'] != 'BinaryOperation' or condition['operator'] not in ['<', '<=']:
+		return None
+
+	declaration, first_value, _ = counter
+	counter_id = declaration['id']
+	bound = condition['rightExpression']
+	left_expression = condition['leftExpression']
+	if left_expression['nodeType'] != 'Identifier' or left_expression.get('referencedDeclaration') != counter_id or _refers_to(bound, counter_id):
+		return None
+
+	events_ids = [x['id'] for x in events]
+	bool_type = {'typeIdentifier': 't_bool', 'typeString': 'bool'}
+	counter_type = declaration['typeDescriptions']
+	first_iteration = loop['initializationExpression']['initialValue']
+	index = {'nodeType': 'Identifier', 'name': '{}_k'.format(declaration['name']), 'typeDescriptions': counter_type}
+	any_iteration = _local_variable('{}_any'.format(counter_id), '{}_any'.format(declaration['name']), counter_type)
+	any_declaration = any_iteration['declarations'][0]
+	any_reference = {'nodeType': 'Identifier', 'name': any_declaration['name'], 'referencedDeclaration': any_declaration['id'],
+		'typeDescriptions': counter_type}
+
+	iterations = _operation('-', bound, first_iteration, counter_type)
+	if condition['operator'] == '<=':
+		iterations = _operation('+', iterations, {'nodeType': 'Literal', 'value': '1', 'typeDescriptions': first_iteration['typeDescriptions']}, counter_type)
+	iterations = {'nodeType': 'TupleExpression', 'components': [iterations], 'isInlineArray': False, 'typeDescriptions': counter_type}
+
+	def at_any_iteration(node):
+		# the value of the node in the iteration i_any, the elements of the arrays (lists in the script) are selected among the iterations
+		if not _refers_to(node, counter_id):
+			return node
+		if not asthelper.find_node(node, {'nodeType': '^IndexAccess$'}):
+			return _replace_references(node, counter_id, any_reference)
+		return _closed_form(index, _operation('==', any_reference, index, bool_type), _replace_references(node, counter_id, index), node['typeDescriptions'])
+
+	executed = []
+	renamed = {}
+	updates_mapping = False
+	# elements read by the iteration i_any
+	accesses = []
+	for statement in _statements(loop['body']):
+		if statement['nodeType'] == 'EmitStatement':
+			continue
+		if statement['nodeType'] != 'ExpressionStatement':
+			return None
+
+		expression = statement['expression']
+		if expression['nodeType'] == 'FunctionCall':
+			if expression['expression'].get('referencedDeclaration') in events_ids:
+				continue
+			return None
+
+		# accumulated variable and the value added by each iteration
+		if expression['nodeType'] == 'UnaryOperation' and expression['operator'] == '++':
+			target, term = expression['subExpression'], None
+		elif expression['nodeType'] == 'Assignment' and expression['operator'] == '+=':
+			target, term = expression['leftHandSide'], expression['rightHandSide']
+		elif expression['nodeType'] == 'Assignment' and expression['operator'] == '=' and expression['rightHandSide']['nodeType'] == 'BinaryOperation' \
+				and expression['rightHandSide']['operator'] == '+' \
+				and astnode.AstNode(None, expression['rightHandSide']['leftExpression']).to_sol_string() == astnode.AstNode(None, expression['leftHandSide']).to_sol_string():
+			target, term = expression['leftHandSide'], expression['rightHandSide']['rightExpression']
+		elif expression['nodeType'] == 'Assignment':
+			# not modeled
+			continue
+		else:
+			return None
+
+		if term is not None and (asthelper.find_node(term, {'nodeType': '^(FunctionCall|Assignment)$'}) or asthelper.find_node(term, {'operator': r'^(\+\+|--)$'})):
+			return None
+
+		type_descriptions = target['typeDescriptions']
+
+		if target['nodeType'] == 'Identifier' and target.get('referencedDeclaration') != counter_id:
+			target_id = target['referencedDeclaration']
+			if target_id in renamed:
+				return None
+
+			if term is None:
+				closed_form = _operation('*', {'nodeType': 'Literal', 'value': '1', 'typeDescriptions': first_iteration['typeDescriptions']}, iterations, type_descriptions)
+			elif not _refers_to(term, counter_id):
+				term = {'nodeType': 'TupleExpression', 'components': [term], 'isInlineArray': False, 'typeDescriptions': term['typeDescriptions']}
+				closed_form = _operation('*', term, iterations, type_descriptions)
+			else:
+				in_iterations = _operation('&&', _operation('>=', index, first_iteration, bool_type),
+					_operation(condition['operator'], index, bound, bool_type), bool_type)
+				closed_form = _closed_form(index, in_iterations, _replace_references(term, counter_id, index), type_descriptions)
+
+			accumulated_value = dict(_operation('+', dict(target), closed_form, type_descriptions), id='{}_loop_value'.format(target_id))
+			accumulated = _local_variable('{}_loop'.format(target_id), '{}_loop'.format(target['name']), type_descriptions, accumulated_value)
+			executed.append(accumulated)
+			renamed[target_id] = accumulated['declarations'][0]
+
+		elif target['nodeType'] == 'IndexAccess' and target['baseExpression']['nodeType'] == 'Identifier' and term is not None:
+			base = target['baseExpression']
+			updates_mapping = True
+			accesses += [x.dic for x in asthelper.find_all_nodes([target, term], {'nodeType': '^IndexAccess$'}) if _refers_to(x.dic, counter_id)]
+			update_id = '{}_{}_update'.format(base.get('referencedDeclaration'), statement.get('id'))
+			update_value = dict(_operation('+', at_any_iteration(target), at_any_iteration(term), type_descriptions), id='{}_value'.format(update_id))
+			executed.append(_local_variable(update_id, '{}_update'.format(base['name']), type_descriptions, update_value))
+		else:
+			return None
+
+	# the iteration i_any is one of the executed iterations
+	in_loop = _operation('&&', _operation('>=', any_reference, first_iteration, bool_type), _replace_references(condition, counter_id, any_reference), bool_type)
+
+	# the elements read are the ones of the arrays (not the unused elements of the lists, es. -1 for address[]),
+	# the keys of the mappings are accounts and their unsigned values are not negative
+	elements = []
+	for access in accesses:
+		base, access_index = access['baseExpression'], access['indexExpression']
+		base_type, value_type = base['typeDescriptions']['typeString'], access['typeDescriptions']['typeString']
+		zero = {'nodeType': 'Literal', 'value': '0', 'typeDescriptions': {'typeIdentifier': 't_rational_0_by_1', 'typeString': 'int_const 0'}}
+		if base_type.startswith('mapping'):
+			# the key is the index of an account (0 is the first one, not the null address)
+			elements.append(_guard(dict(_operation('>=', at_any_iteration(access_index), zero, bool_type), commonType=counter_type)))
+			if value_type.startswith('uint'):
+				elements.append(_guard(_operation('>=', at_any_iteration(access), zero, bool_type)))
+		elif '[' in base_type and ']' in base_type:
+			length = {'nodeType': 'MemberAccess', 'expression': base, 'memberName': 'length', 'typeDescriptions': counter_type}
+			elements.append(_guard(_operation('<', at_any_iteration(access_index), length, bool_type)))
+
+	if updates_mapping:
+		executed = [any_iteration, _guard(in_loop)] + elements + executed
+
+	not_executed = [_guard(_replace_references(condition, counter_id, first_iteration), False)]
+	executed = [_guard(_replace_references(condition, counter_id, first_iteration))] + executed
+
+	return [(not_executed, {}), (executed, renamed)]
+
+
+def enumerate_paths(statements: list, max_paths: int = MAX_PATHS, max_iterations: int = MAX_LOOP_ITERATIONS, max_nodes: int = MAX_PATH_NODES,
+		events: list = (), truncated: list = None) -> list:
+	"""
+	Enumerates the paths through the statements of a function: each path is the list of statements
+	it executes, the branches taken are require statements of their conditions (see _guard) and
+	the loops are summarized (see _summarize_loop) or unrolled up to max_iterations.
+	The guards not written as requires (see _as_guard) are requires, and the branches ending with a
+	failure (see _aborts) are not taken. A path ends with its first return statement, the paths
+	reaching a revert or throw statement (or a branch whose alternatives all fail) are not enumerated:
+	the function does not change the state on them.
+
+	The enumeration has budgets, so the time to generate the constraints does not depend on the
+	branches of the function: the alternatives of a branch beyond max_paths paths are not enumerated,
+	and when a statement would make the path larger than max_nodes nodes, the path is cut before it.
+	A path cut by a budget does not execute the whole function, it is not returned.
+
+	:param statements: List of statements, the body of a function
+	:param events: List of the EventDefinitions, the events emitted by a loop do not prevent its summary
+	:param truncated: (Optional) List the paths cut by a budget are appended to
+	:return: List<List<dict>>, the paths in depth-first order (branch taken first, then fewer iterations first)
+	"""
+	paths = []
+
+	# paths being built: (statements executed, statements left, number of nodes)
+	pending = [([], list(statements), 0)]
+
+	while pending:
+		path, left, size = pending.pop()
+		reverted = False
+		cut = False
+
+		while left:
+			statement, left = left[0], left[1:]
+
+			statement = _as_guard(statement) or statement
+
+			# alternatives: (statements, declarations renamed in the statements left)
+			alternatives = None
+			if statement['nodeType'] in BRANCH_STATEMENTS:
+				alternatives = [
+					([_guard(statement['condition'])] + _statements(statement['trueBody']), {}),
+					([_guard(statement['condition'], False)] + _statements(statement.get('falseBody')), {})
+				]
+				alternatives = [x for x, body in zip(alternatives, [statement['trueBody'], statement.get('falseBody')]) if not _aborts(body)]
+				if not alternatives:
+					reverted = True
+					break
+			elif statement['nodeType'] in LOOP_STATEMENTS:
+				alternatives = _summarize_loop(statement, events)
+				if alternatives is None:
+					alternatives = [(_unroll(statement, x), {}) for x in range(max_iterations + 1)]
+					alternatives = [x for x in alternatives if x[0] is not None]
+
+			if alternatives is not None:
+				# the alternatives fitting in the budget of paths, the others are not enumerated
+				room = max_paths - len(paths) - len(pending)
+				alternatives = [(x, _rename_references(left, renamed) if renamed else left) for x, renamed in alternatives[:room]]
+				# no room left, the path is cut before the statement
+				if not alternatives:
+					cut = True
+					break
+				for alternative, alternative_left in reversed(alternatives[1:]):
+					pending.append((list(path), alternative + alternative_left, size))
+				left = alternatives[0][0] + alternatives[0][1]
+				continue
+
+			if statement['nodeType'] == 'Throw' or _is_call_to(statement, ['revert']):
+				reverted = True
+				break
+
+			size += _size(statement)
+			if size > max_nodes:
+				cut = True
+				break
+
+			path.append(statement)
+			if statement['nodeType'] == 'Return':
+				break
+
+		if cut and truncated is not None:
+			truncated.append(path)
+		elif not reverted and not cut:
+			paths.append(path)
+
+	return paths
+
+
+def check_for_overflow_candidate(node, annotations: overlay.Overlay = None):
 	"""
 	Checks if the node contains an expression which can potentially produce an overflow
 	meaning an expression which is not wrapped by any cast, which involves the operator
@@ -64,6 +619,7 @@ def check_for_overflow_candidate(node):
 	operator.
 
 	:param node: 	Node could be an Expression or AstNode (Tuple or Literal) in both cases, they have a dictionary called 'dic'.
+	:param annotations: Overlay of the analysis, the expression replaced by a variable is annotated there (the AST is not modified)
 	:return: List of tuples [(AstNode, {exp_id: expression}], where the AstNode is a node which of type Identifier
 	and it is refereeing to a newly created variable called exp_id. The seconds object of the tuple is the map
 	between the name of the variable added and its expression.
@@ -78,6 +634,9 @@ def check_for_overflow_candidate(node):
 	if not node:
 		return None
 
+	if annotations is None:
+		annotations = overlay.Overlay()
+
 	if node.parent:
 		node.parent = None
 
@@ -91,6 +650,14 @@ def check_for_overflow_candidate(node):
 		# The expression is wrapped by a cast, if wrapped, can't be a candidate
 		return None
 
+	if asthelper.find_parent(first_expression, {'nodeType': '^ClosedForm$'}) is not None:
+		# The expression is a term of the summary of a loop, it depends on the iteration
+		return None
+
+	# negated expression, es. require(!(a + b > c))
+	if first_expression['operator'] == '!':
+		return check_for_overflow_candidate(expressionhelper.Expression(first_expression['subExpression']), annotations)
+
 	if first_expression['operator'] in whitelist_operators:
 		exp_map = {}
 		if 'name' not in first_expression.dic:
@@ -100,15 +667,14 @@ def check_for_overflow_candidate(node):
 			exp_map[exp_name] = expressionhelper.Expression(first_expression.dic)
 
 			# override
-			first_expression.dic['name'] = exp_name
-			first_expression.dic['nodeType'] = 'Identifier'
+			first_expression.dic = annotations.annotate(first_expression.dic, {'name': exp_name, 'nodeType': 'Identifier'})
 
 		return [(first_expression, exp_map)]
 
 	# recursive case
 	if first_expression['operator'] in logic_operators:
-		left_candidates = check_for_overflow_candidate(expressionhelper.Expression(first_expression['leftExpression']))
-		right_candidates = check_for_overflow_candidate(expressionhelper.Expression(first_expression['rightExpression']))
+		left_candidates = check_for_overflow_candidate(expressionhelper.Expression(first_expression['leftExpression']), annotations)
+		right_candidates = check_for_overflow_candidate(expressionhelper.Expression(first_expression['rightExpression']), annotations)
 		if left_candidates is not None: expression_candidates += left_candidates
 		if right_candidates is not None: expression_candidates += right_candidates
 		return expression_candidates
@@ -116,7 +682,302 @@ def check_for_overflow_candidate(node):
 	return None
 
 
-def visit_ast(ast_json: list, function_name: str) -> dict:
+def _is_pure_expression(node) -> bool:
+	"""
+	Returns True if evaluating the expression has no side effects, so it can be copied in place of a parameter
+	"""
+	calls = asthelper.find_all_nodes(node, {'nodeType': '^FunctionCall$'})
+	return not any(x['kind'] != 'typeConversion' for x in calls) \
+		and not asthelper.find_node(node, {'nodeType': '^Assignment$'}) \
+		and not asthelper.find_node(node, {'operator': r'^(\+\+|--|delete)$'})
+
+
+def _summarize_definition(definition: dict):
+	"""
+	Summary of a modifier or a function, used to inline its calls:
+	 - a modifier whose body has one placeholder statement _ (not nested in a branch)
+	 - a function without modifiers, whose body is a list of statements without branches and loops,
+	   ended by the return of at most one value
+	The guards of both (es. if (paused) revert();) are requires, see _as_guard.
+	The statements the analysis does not handle are rejected by filter_statements, as in the function
+	under test. The calls inside the statements are inlined too, when the summary is used.
+
+	:param definition: ModifierDefinition | FunctionDefinition
+	:return: dict: {'parameters', 'statements', 'returned'} | None if it can not be inlined
+	"""
+	if not definition.get('body') or not definition['body'].get('statements'):
+		return None
+
+	statements = list(definition['body']['statements'])
+	returned = None
+
+	if definition['nodeType'] == 'ModifierDefinition':
+		if [x['nodeType'] for x in statements].count('PlaceholderStatement') != 1:
+			return None
+	else:
+		if definition.get('modifiers') or definition.get('isConstructor') or definition.get('kind') in ['constructor', 'fallback', 'receive']:
+			return None
+		if statements[-1]['nodeType'] == 'Return':
+			returned = statements.pop()['expression']
+		if len((definition.get('returnParameters') or {}).get('parameters') or []) > 1 or returned and returned['nodeType'] == 'TupleExpression':
+			return None
+
+	# no branches (but the guards), loops and returns: a path through the caller is a path through the helper
+	statements = [_as_guard(x) or x for x in statements]
+	if any(x['nodeType'] not in ['ExpressionStatement', 'VariableDeclarationStatement', 'EmitStatement', 'PlaceholderStatement'] for x in statements):
+		return None
+
+	return {
+		'parameters': [x['id'] for x in definition['parameters']['parameters']],
+		'statements': statements,
+		'returned': returned
+	}
+
+
+def _contract_of(context: dict, node: dict) -> dict:
+	"""
+	Returns the ContractDefinition containing the node, None if the node is not in the tree
+	"""
+	ast_index = context['ast_index']
+	if isinstance(node, astnode.AstNode):
+		node = node.dic
+	while node is not None and node.get('nodeType') != 'ContractDefinition':
+		node = ast_index.parent(node) if node in ast_index else None
+	return node
+
+
+def _linearized_ids(context: dict, function_node) -> list:
+	"""
+	Without a contract under test, returns the ids of the contracts an internal call of the function under test
+	is dispatched in: the contract of the function and the ones it inherits from, from the most derived.
+	None if there is a contract under test, context['functions'] has only the ones of its contracts (see visit_context)
+	"""
+	if context['contract_name'] is not None:
+		return None
+
+	contract = _contract_of(context, function_node)
+	if contract is None:
+		return []
+	return contract.get('linearizedBaseContracts') or [contract.get('id')]
+
+
+def _dispatched(context: dict, definition: dict, function_node) -> dict:
+	"""
+	Returns the definition executed by an internal call to the function from the function under test:
+	the one overriding it, if any (the functions of the libraries are not overridden)
+	"""
+	if definition['nodeType'] != 'FunctionDefinition':
+		return definition
+
+	contract = _contract_of(context, definition)
+	if contract is not None and contract.get('contractKind') == 'library':
+		return definition
+
+	function_nodes = context['functions'].get(definition['name'], [])
+
+	# without a contract under test, the functions of the other contracts of the tree are not executed
+	linearized = _linearized_ids(context, function_node)
+	if linearized is not None:
+		contract_ids = [(_contract_of(context, x) or {}).get('id') for x in function_nodes]
+		function_nodes = [x for _, x in sorted(
+			[(linearized.index(y), x) for x, y in zip(function_nodes, contract_ids) if y in linearized], key=lambda z: z[0])]
+
+	fingerprint = signatureindex.signature(definition)
+	for overriding in function_nodes:
+		if overriding['implemented'] and signatureindex.signature(overriding.dic) == fingerprint:
+			return overriding.dic
+	return definition
+
+
+def summary(context: dict, declaration_id, function_node):
+	"""
+	Returns the summary of the modifier or function called by the function under test (see _summarize_definition).
+	The summaries are computed once for the contract and stored in the context
+	(without a contract under test, once for the contract of each function under test, see _dispatched)
+
+	:param context: dict, returned by visit_context
+	:param declaration_id: id of the ModifierDefinition or FunctionDefinition (referencedDeclaration of its calls)
+	:param function_node: FunctionDefinition of the function under test
+	:return: dict | None
+	"""
+	summaries = context['summaries']
+	linearized = _linearized_ids(context, function_node)
+	key = declaration_id if linearized is None else (declaration_id, linearized[0] if linearized else None)
+
+	if key not in summaries:
+		summaries[key] = None
+		definition = context['ast_index'].node(declaration_id) if type(declaration_id) is int else None
+		if definition is not None and definition.get('nodeType') in ['ModifierDefinition', 'FunctionDefinition']:
+			summaries[key] = _summarize_definition(_dispatched(context, definition, function_node))
+	return summaries[key]
+
+
+def _instantiate(definition_summary: dict, arguments: list, suffix: str):
+	"""
+	Returns the statements and the returned expression of the summary for a call: the parameters
+	are replaced by the arguments and the declarations get the suffix of the call (see _suffixed_copy)
+	"""
+	nodes = list(definition_summary['statements'])
+	if definition_summary['returned'] is not None:
+		nodes.append(definition_summary['returned'])
+
+	for parameter_id, argument in zip(definition_summary['parameters'], arguments):
+		if argument['nodeType'] not in ['Identifier', 'Literal', 'IndexAccess', 'MemberAccess', 'TupleExpression']:
+			argument = {'nodeType': 'TupleExpression', 'components': [argument], 'isInlineArray': False, 'typeDescriptions': argument['typeDescriptions']}
+		nodes = [_replace_references(x, parameter_id, argument) for x in nodes]
+
+	nodes = _suffixed_copy(nodes, suffix)
+	if definition_summary['returned'] is not None:
+		return nodes[:-1], nodes[-1]
+	return nodes, None
+
+
+def _internal_call(context: dict, call: dict):
+	"""
+	Returns the declaration executed by the call and the arguments of its parameters:
+	 - the function of an Identifier, es. fee(x)
+	 - the library function of a MemberAccess, es. SafeMath.add(a, b), or a.add(b) with using SafeMath for uint:
+	   the receiver a is the first argument
+	None if the call does not execute a function of the contract or of a library (es. this.f(), token.transfer(...))
+
+	:param call: FunctionCall
+	:return: (referencedDeclaration, List of arguments) | None
+	"""
+	function = call['expression']
+	if call['kind'] != 'functionCall':
+		return None
+
+	if function['nodeType'] == 'Identifier':
+		return function.get('referencedDeclaration'), call['arguments']
+
+	if function['nodeType'] == 'MemberAccess' and type(function.get('referencedDeclaration')) is int:
+		definition = context['ast_index'].node(function['referencedDeclaration'])
+		contract = _contract_of(context, definition)
+		if contract is None or contract.get('contractKind') != 'library':
+			return None
+		if function['expression']['typeDescriptions']['typeString'].startswith('type(library '):
+			return function['referencedDeclaration'], call['arguments']
+		return function['referencedDeclaration'], [function['expression']] + call['arguments']
+
+	return None
+
+
+def inline_modifiers(context: dict, function_node) -> list:
+	"""
+	Returns the statements of the function under test with the ones of its modifiers (es. onlyOwner,
+	whenNotPaused): the placeholder _ of each modifier is replaced by the function body.
+	The modifiers which can not be summarized are not executed, as before.
+
+	:param context: dict, returned by visit_context
+	:param function_node: FunctionDefinition of the function under test
+	:return: List of statements
+	"""
+	statements = list(function_node['body']['statements'])
+
+	for invocation in reversed(function_node['modifiers'] or []):
+		modifier_summary = summary(context, invocation['modifierName'].get('referencedDeclaration'), function_node)
+		arguments = invocation.get('arguments') or []
+		if modifier_summary is None or not all(_is_pure_expression(x) for x in arguments):
+			continue
+
+		modifier_statements, _ = _instantiate(modifier_summary, arguments, '_in{}'.format(invocation['id']))
+		placeholder = [x['nodeType'] for x in modifier_statements].index('PlaceholderStatement')
+		statements = modifier_statements[:placeholder] + statements + modifier_statements[placeholder + 1:]
+
+	return statements
+
+
+def inline_calls(context: dict, function_node, statements: list, depth: int = MAX_INLINE_DEPTH) -> list:
+	"""
+	Returns the statements with the internal calls to the helpers inlined (see summary and _internal_call):
+	the statements of the helper precede the statement of the call, and its returned
+	expression replaces the call. The arguments of the calls are copied in place of the
+	parameters, so the calls with arguments having side effects are not inlined.
+	The calls which can not be inlined are rejected by filter_statements, as before.
+
+	:param context: dict, returned by visit_context
+	:param function_node: FunctionDefinition of the function under test
+	:param statements: List of the statements of a path (see enumerate_paths)
+	:param depth: calls inlined in the statements inlined
+	:return: List of statements
+	"""
+	inlined = []
+	for statement in statements:
+		calls = []
+		if depth > 0 and statement['nodeType'] in ['ExpressionStatement', 'VariableDeclarationStatement', 'Return']:
+			calls = [(x.dic, _internal_call(context, x.dic)) for x in asthelper.find_all_nodes(statement, {'nodeType': '^FunctionCall$'})]
+			calls = [(x, callee) for x, callee in calls if callee is not None and summary(context, callee[0], function_node) is not None
+				and all(_is_pure_expression(y) for y in callee[1])]
+
+		if not calls:
+			inlined.append(statement)
+			continue
+
+		call, (declaration_id, arguments) = calls[0]
+		helper_statements, returned = _instantiate(summary(context, declaration_id, function_node), arguments, '_in{}'.format(call['id']))
+
+		if statement['nodeType'] == 'ExpressionStatement' and statement['expression'] is call:
+			remaining = []
+		elif returned is not None:
+			remaining = [_substitute(statement, lambda x: returned if x is call else None)]
+		else:
+			inlined.append(statement)
+			continue
+
+		# the other calls of the statement and the ones of the helper
+		inlined += inline_calls(context, function_node, helper_statements, depth - 1) + inline_calls(context, function_node, remaining, depth)
+
+	return inlined
+
+
+def visit_context(ast_json: list, contract_name: str = None) -> dict:
+	"""
+	Collects what the visits of the functions of a contract have in common:
+	the index of the tree, the function definitions grouped by name, the events,
+	the state variables and the 'this' identifiers. The context is computed
+	once and then used by visit_function for every function under test.
+
+	:param ast_json: ast of the file generated using solc
+	:param contract_name: (Optional) str, contract under test, only the contract and the ones it inherits from are visited
+	:return: context: dict
+	"""
+	# Index the tree once, the following queries do not visit it again
+	ast_index = asthelper.index(ast_json)
+
+	# Contracts to visit, from the most derived (None is the whole tree)
+	contracts = [None]
+	if contract_name is not None:
+		contracts = asthelper.linearized_contracts(ast_index, contract_name)
+		if not contracts:
+			raise Exception("AstVisitErr", "No contract definition")
+
+	declarations = [asthelper.find_all_nodes_by_query(contract, {
+		'functions': {'nodeType': '^FunctionDefinition$'},
+		'events': {'nodeType': '^EventDefinition$'},
+		'state_variables': {'nodeType': 'VariableDeclaration', 'stateVariable': True},
+		'this_identifiers': {'nodeType': 'Identifier', 'name': 'this'}
+	}, ast_index) for contract in contracts]
+
+	# function name -> definitions, the function overriding the others comes first
+	functions = {}
+	for function_node in [x for d in declarations for x in d['functions']]:
+		functions.setdefault(function_node['name'], []).append(function_node)
+
+	return {
+		'ast_index': ast_index,
+		# None if the functions are looked up in the whole tree
+		'contract_name': contract_name,
+		'functions': functions,
+		'events': [x for d in declarations for x in d['events']],
+		# in storage order (from the base contracts)
+		'state_variables': [x for d in reversed(declarations) for x in d['state_variables']],
+		'this_identifiers': [x for d in declarations for x in d['this_identifiers']],
+		# id of a modifier or function -> its summary, see summary
+		'summaries': {}
+	}
+
+
+def visit_ast(ast_json: list, function_name: str, contract_name: str = None) -> dict:
 	"""
 	Given the AST of the complete solidity source file and
 	the function name of the function under test, visit_ast
@@ -129,33 +990,132 @@ def visit_ast(ast_json: list, function_name: str) -> dict:
 
 	:param ast_json: ast of the file generated using solc
 	:param function_name: str, function name under test
+	:param contract_name: (Optional) str, contract under test, only the contract and the ones it inherits from are visited
 	:return: inspected_parameters: dict
 	"""
-	function_nodes = asthelper.find_all_nodes(ast_json, {'nodeType': 'FunctionDefinition', 'name': "^" + function_name + "$"})
+	return visit_function(visit_context(ast_json, contract_name), function_name)
+
+
+def visit_contract(ast_json: list, function_names: list, contract_name: str = None) -> dict:
+	"""
+	Visits all the functions under test of a contract (see visit_ast),
+	the context shared by the functions is computed only once.
+	A function which can not be inspected does not stop the visit of the others.
+
+	:param ast_json: ast of the file generated using solc
+	:param function_names: List<str>, function names under test
+	:param contract_name: (Optional) str, contract under test
+	:return: dict, function name -> inspected_parameters or the Exception which explains the failure
+	"""
+	try:
+		context = visit_context(ast_json, contract_name)
+	except Exception as e:
+		return {function_name: e for function_name in function_names}
+
+	inspected_functions = {}
+	for function_name in function_names:
+		try:
+			inspected_functions[function_name] = visit_function(context, function_name)
+		except Exception as e:
+			inspected_functions[function_name] = e
+
+	return inspected_functions
+
+
+def function_definition(context: dict, function_name: str):
+	"""
+	Returns the definition of the function under test: the first one,
+	from the most derived contract, having a body with statements
+
+	:param context: dict, returned by visit_context
+	:param function_name: str, function name under test
+	:return: dict | None
+	"""
+	function_nodes = context['functions'].get(function_name, [])
 	function_nodes_with_body = [x for x in function_nodes if x['body'] and x['body']['statements']]
+	return function_nodes_with_body[0] if function_nodes_with_body else None
+
+
+def visit_function(context: dict, function_name: str) -> dict:
+	"""
+	Visits the function under test (see visit_ast) using the
+	context of its contract computed by visit_context
+
+	:param context: dict, returned by visit_context
+	:param function_name: str, function name under test
+	:return: inspected_parameters: dict, the ones of the first path which can be inspected (see visit_paths),
+	'paths' holds the inspected_parameters of every path (see mapper.paths_to_z3)
+	"""
+	inspected_paths = visit_paths(context, function_name)
+	return dict(inspected_paths[0], paths=inspected_paths)
+
+
+def visit_paths(context: dict, function_name: str) -> list:
+	"""
+	Visits each path through the function under test (see enumerate_paths),
+	the paths which can not be inspected are skipped, as the paths cut by the budgets
+	of the enumeration (the statements they do not execute would be missing from the constraints)
 
-	if not function_nodes_with_body:
+	:param context: dict, returned by visit_context
+	:param function_name: str, function name under test
+	:return: List<dict>, inspected_parameters of each path, in the order of enumerate_paths
+	"""
+	function_node = function_definition(context, function_name)
+
+	if function_node is None:
 		raise Exception("AstVisitErr", "No function definition")
 
-	function_node = function_nodes_with_body[0]
+	inspected_paths = []
+	errors = []
+	truncated = []
+	for path in enumerate_paths(inline_modifiers(context, function_node), max_nodes=MAX_PATH_NODES, events=context['events'], truncated=truncated):
+		try:
+			inspected_paths.append(_visit_path(context, function_node, path))
+		except Exception as e:
+			errors.append(e)
+
+	if not inspected_paths and not errors and truncated:
+		raise Exception("AstVisitErr", "Every path exceeds the budget of the enumeration")
+
+	if not inspected_paths and not errors:
+		raise Exception("AstVisitErr", "Every path reverts")
+
+	# no path can be inspected, the reason is the one of the first path
+	if not inspected_paths:
+		raise errors[0]
+
+	return inspected_paths
+
+
+def _visit_path(context: dict, function_node, function_statements: list) -> dict:
+	"""
+	Inspects the statements executed by a path through the function under test
 
-	function_body = function_node['body']
-	function_statements = function_body['statements']
+	:param context: dict, returned by visit_context
+	:param function_node: FunctionDefinition of the function under test
+	:param function_statements: List of the statements of the path (see enumerate_paths)
+	:return: inspected_parameters: dict
+	"""
+	ast_index = context['ast_index']
+
+	# The tree is not modified, the names given to the expressions are annotations of this visit
+	annotations = overlay.Overlay()
 
 	# ====
 	# ==== EXTRACT STATEMENTS AND CHECKS VALIDITY
 	# ====
 
 	# Enumerate all the stataments with a require
-	require_nodes = [i for (i, x) in enumerate(function_statements) if asthelper.find_node(x, {'name': '^require$'})]
+	require_nodes = [i for (i, x) in enumerate(function_statements) if asthelper.find_node(x, {'name': '^require$'}, ast_index)]
 
-	statements_under_inspection = function_statements
+	# Inline the calls to the helpers of the contract
+	statements_under_inspection = inline_calls(context, function_node, function_statements)
 
 	# Remove event emit statements
 	# Remove banned statements
-	events_definition_nodes = asthelper.find_all_nodes(ast_json, {'nodeType': '^EventDefinition$'})
+	events_definition_nodes = context['events']
 
-	filtered_statements = filter_statements(events_definition_nodes, statements_under_inspection)
+	filtered_statements = filter_statements(events_definition_nodes, statements_under_inspection, ast_index)
 
 	if not filtered_statements:
 		raise Exception("AstVisitErr", "Not handled statements")
@@ -183,10 +1143,10 @@ def visit_ast(ast_json: list, function_name: str) -> dict:
 
 	expression_candidates = []
 	expressions_map = []
-	requires_nodes = [x for x in filtered_statements if asthelper.find_node(x, {'name': '^require$'})]
+	requires_nodes = [x for x in filtered_statements if asthelper.find_node(x, {'name': '^require$'}, ast_index)]
 	for require_node in requires_nodes:
 		require_exp = expressionhelper.Expression(require_node['expression']['arguments'][0])
-		candidate_check_results = check_for_overflow_candidate(require_exp)
+		candidate_check_results = check_for_overflow_candidate(require_exp, annotations)
 		if candidate_check_results:
 			candidates_exp = [x[0] for x in candidate_check_results]
 			expression_map = [x[1] for x in candidate_check_results]
@@ -202,9 +1162,8 @@ def visit_ast(ast_json: list, function_name: str) -> dict:
 	local_variables_candidates = []
 	for lv in local_variables:
 		name = lv['declarations'][0]['name']
-		lv_exp = expressionhelper.Expression(lv['initialValue'])
-		lv_exp.dic['name'] = name # set a name to the expression
-		candidate_check_results = check_for_overflow_candidate(lv_exp)
+		lv_exp = expressionhelper.Expression(annotations.annotate(lv['initialValue'], {'name': name})) # set a name to the expression
+		candidate_check_results = check_for_overflow_candidate(lv_exp, annotations)
 		if candidate_check_results:
 			candidate_exp, expression_map = candidate_check_results[0]
 			local_variables_candidates.append(candidate_exp)
@@ -217,21 +1176,14 @@ def visit_ast(ast_json: list, function_name: str) -> dict:
 	# ====
 	# ==== ACCESSED STATE VARIABLES
 	# ====
-	# Enumerate all the state variables
-	state_variables_declaration = \
-		[x for x in asthelper.find_all_nodes(ast_json, {'nodeType': 'VariableDeclaration', 'stateVariable': True})]
+	# Enumerate all the state variables, in storage order (from the base contracts)
+	state_variables_declaration = context['state_variables']
 
 	# Find the accessed variables
 	# No repetition of variable accessed
-	# multiple times
-	accessed_state_variables = []
-	for state_variable_declaration in state_variables_declaration:
-		state_id = state_variable_declaration['id']
-		for statement in filtered_statements:
-			access = asthelper.find_node(statement, {'nodeType': 'Identifier', 'referencedDeclaration': state_id})
-			if access:
-				accessed_state_variables.append(state_variable_declaration)
-				break
+	# multiple times (the statements are visited once, not once per state variable)
+	references = asthelper.referenced_declarations(filtered_statements, ast_index)
+	accessed_state_variables = [x for x in state_variables_declaration if x['id'] in references]
 
 	# ====
 	# ==== FORMAL PARAMETERS
@@ -242,22 +1194,28 @@ def visit_ast(ast_json: list, function_name: str) -> dict:
 	map_id_variable_name = {}
 	local_variables_tmp = [x['declarations'][0] for x in local_variables ]
 
-	for v in local_variables_tmp + formal_parameters + accessed_state_variables:
+	# ====
+	# ==== FREE VARIABLES
+	# ====
+	# Variables declared without a value by the summaries of the loops (es. any iteration)
+	free_variables = [x['declarations'][0] for x in filtered_statements
+		if x['nodeType'] == 'VariableDeclarationStatement' and not x.get('initialValue') and x['declarations'][0]['id'] in references]
+
+	for v in local_variables_tmp + formal_parameters + accessed_state_variables + free_variables:
 		map_id_variable_name[str(v['id'])] = v['name']
 
 	# append 'this' identifier
-	this_identifiers = asthelper.find_all_nodes(ast_json, {'nodeType': 'Identifier', 'name': 'this'})
-
-	for this_id in this_identifiers:
+	for this_id in context['this_identifiers']:
 		map_id_variable_name[str(this_id['id'])] = this_id['name']
 		map_id_variable_name[str(this_id['referencedDeclaration'])] = this_id['name']
 
 	return {
 		'formal_parameters': formal_parameters,
-		'local_variables': local_variables,
-		'require_nodes': requires_nodes,
+		'local_variables': [annotations.resolve(x) for x in local_variables],
+		'require_nodes': [annotations.resolve(x) for x in requires_nodes],
 		'require_expression_map': expressions_map,
 		'candidate_for_overflow': variables_candidate_for_overflow,
 		'accessed_state_variables': accessed_state_variables,
+		'free_variables': free_variables,
 		'map_id_variable_name': map_id_variable_name
 	}
\ No newline at end of file
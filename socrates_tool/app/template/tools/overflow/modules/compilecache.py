@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+# Root folder of the cache, shared by every run on the same machine.
+# It can be moved (or disabled with SOL_OVERFLOW_CACHE=0) using environment variables
+CACHE_DIR = os.environ.get('SOL_OVERFLOW_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'sol-overflow'))
+CACHE_ENABLED = os.environ.get('SOL_OVERFLOW_CACHE', '1') != '0'
+
+# Upper bound of the cache on disk, least recently used entries are evicted first
+MAX_CACHE_SIZE = int(os.environ.get('SOL_OVERFLOW_CACHE_SIZE', 512 * 1024 * 1024))
+
+ENTRY_EXTENSION = '.json.z'
+
+# The size of the cache is tracked by the puts of this process: the cache is walked (see evict)
+# when the tracked size exceeds MAX_CACHE_SIZE, or every EVICT_INTERVAL puts for the entries of the other processes
+EVICT_INTERVAL = 256
+
+# Temporary files younger than this (seconds) are being written by another process, the older ones are leftovers
+TMP_MAX_AGE = 3600
+
+_solc_fingerprints = {}
+
+# CACHE_DIR -> [size after the last walk plus the bytes put since, puts since the last walk]
+_tracked_sizes = {}
+
+
+def solc_fingerprint(binary='solc') -> str:
+    """
+    Returns the sha256 of the solc binary in use, so that entries
+    produced by a different compiler version are never returned
+    :param binary: name or path of the compiler
+    :return: hex digest or the binary name if it cannot be found
+    """
+    path = shutil.which(binary)
+    if not path:
+        return binary
+
+    stat = os.stat(path)
+    signature = (path, stat.st_mtime, stat.st_size)
+
+    if signature not in _solc_fingerprints:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _solc_fingerprints[signature] = digest.hexdigest()
+
+    return _solc_fingerprints[signature]
+
+
+def make_key(source: bytes, flags: list) -> str:
+    """
+    Content address of a compilation
+    :param source: content of the compiled source code
+    :param flags: compiler flags which affect the output
+    :return: str: hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(hashlib.sha256(source).digest())
+    digest.update(solc_fingerprint().encode('utf8'))
+    digest.update('\0'.join(flags).encode('utf8'))
+    return digest.hexdigest()
+
+
+def _entry_path(key: str, extension: str = ENTRY_EXTENSION) -> str:
+    return os.path.join(CACHE_DIR, key[:2], key + extension)
+
+
+def get(key: str):
+    """
+    Returns the cached object for the key or None
+    Reading an entry marks it as recently used
+    """
+    if not CACHE_ENABLED:
+        return None
+
+    path = _entry_path(key)
+    try:
+        with open(path, 'rb') as f:
+            payload = f.read()
+        value = json.loads(zlib.decompress(payload).decode('utf8'))
+    except FileNotFoundError:
+        return None
+    except (OSError, zlib.error, ValueError):
+        # truncated or corrupted entry, drop it
+        _remove(path)
+        return None
+
+    try:
+        os.utime(path)
+    except OSError:
+        # evicted meanwhile by another process
+        pass
+
+    return value
+
+
+def put(key: str, value):
+    """
+    Stores the object (json serializable) compressed on disk
+    """
+    payload = zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf8'))
+    put_file(key, ENTRY_EXTENSION, lambda f: f.write(payload))
+
+
+def get_file(key: str, extension: str):
+    """
+    Returns the path of the cached file for the key (es. a binary snapshot) or None
+    Reading an entry marks it as recently used
+    """
+    if not CACHE_ENABLED:
+        return None
+
+    path = _entry_path(key, extension)
+    try:
+        os.utime(path)
+    except OSError:
+        # missing or evicted meanwhile by another process
+        return None
+
+    return path
+
+
+def put_file(key: str, extension: str, write):
+    """
+    Stores a file in the cache, write(f) writes its content on the binary file object f.
+    The entry is written on a temporary file and then renamed, so
+    concurrent processes never read a partially written entry
+    """
+    if not CACHE_ENABLED:
+        return
+
+    path = _entry_path(key, extension)
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+                f.flush()
+                size = os.fstat(f.fileno()).st_size
+            os.replace(tmp_path, path)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+    except OSError:
+        # the cache is an optimization, never fail the compilation
+        return
+
+    tracked = _tracked_sizes.get(CACHE_DIR)
+    if tracked is None:
+        tracked = _tracked_sizes[CACHE_DIR] = [evict(MAX_CACHE_SIZE), 0]
+        return
+
+    tracked[0] += size
+    tracked[1] += 1
+    if tracked[0] > MAX_CACHE_SIZE or tracked[1] >= EVICT_INTERVAL:
+        tracked[:] = [evict(MAX_CACHE_SIZE), 0]
+
+
+def remove(key: str, extension: str = ENTRY_EXTENSION):
+    """
+    Removes the entry for the key (es. when it cannot be read)
+    """
+    _remove(_entry_path(key, extension))
+
+
+def evict(max_size: int) -> int:
+    """
+    Removes the least recently used entries until the size of the cache
+    is below max_size. Entries removed by other processes are ignored, and the
+    temporary files being written by other processes (see put_file) are not removed.
+    :return: int: size of the cache left
+    """
+    entries = []
+    total_size = 0
+    now = time.time()
+
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith('.tmp') and now - stat.st_mtime < TMP_MAX_AGE:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+    if total_size <= max_size:
+        return total_size
+
+    for _, size, path in sorted(entries):
+        _remove(path)
+        total_size -= size
+        if total_size <= max_size:
+            break
+
+    return total_size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
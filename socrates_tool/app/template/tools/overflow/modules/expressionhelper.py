@@ -5,6 +5,8 @@ from models import astnode
 
 class Expression():
 
+	__slots__ = ('parent', 'dic', 'nodeType', 'operator', 'leftArgument', 'rightArgument')
+
 	def __init__(self, dic, parent = None):
 		self.parent = parent
 		self.dic = dic
@@ -65,7 +67,8 @@ class Expression():
 			if 'x' in value:
 				value = int(value, 16)
 			if int(value) == 0:
-				node.dic['name'] = 'null_address_index'
+				# the argument is read through its own copy, the AST is not modified
+				node.dic = dict(node.dic, name='null_address_index')
 
 	def to_string(self) -> str:
 		"""
@@ -109,3 +112,30 @@ class Expression():
 		return to_return
 
 
+class ClosedForm():
+	"""
+	Sum of a term over the iterations of a loop which satisfy a condition, the summary of a loop
+	(see astvisitor._summarize_loop). The node is not part of the AST:
+	{'nodeType': 'ClosedForm', 'index': Identifier, 'condition': expression, 'term': expression}
+	where the index is an iteration (from 0 to max_array_len) in the condition and in the term.
+	"""
+
+	__slots__ = ('parent', 'dic', 'index', 'condition', 'term')
+
+	def __init__(self, dic, parent = None):
+		self.parent = parent
+		self.dic = dic
+		self.index = astnode.AstNode(self.dic, self.dic['index'])
+		self.condition = astnode.AstNode(self.dic, self.dic['condition'])
+		self.term = astnode.AstNode(self.dic, self.dic['term'])
+
+	def __repr__(self):
+		return self.to_string()
+
+	def to_string(self) -> str:
+		"""
+		Returns the Z3 sum of the term over the iterations
+		:rtype: str
+		"""
+		return 'Sum([If({1}, {2}, 0) for {0} in range(max_array_len)])'.format(
+			self.index.to_string(), self.condition.to_string(), self.term.to_string())
@@ -448,6 +448,7 @@ def ast_to_z3(inspected_function: dict):
 	:return:
 	"""
 	local_variables = [x['declarations'][0] for x in inspected_function['local_variables']]
+	local_variables += inspected_function.get('free_variables', [])
 
 	formal_parameters = inspected_function['formal_parameters']
 
@@ -469,3 +470,49 @@ def ast_to_z3(inspected_function: dict):
 	generate_str = generate_str + overflow_constraints + require_conditions_overflow
 
 	return generate_str
+
+
+def paths_to_z3(inspected_paths: list) -> str:
+	"""
+	Maps each path through the function (see astvisitor.visit_paths) to its Z3 conditions.
+	With more paths, the conditions of each one are added in its own scope of the solver, and
+	the paths are checked in order until one is satisfiable: the script solves one query per path.
+	The paths which can not be mapped are skipped.
+
+	:param inspected_paths: List of the inspected objects of the paths
+	:return: str
+	"""
+	generated_paths = []
+	errors = []
+	for inspected_path in inspected_paths:
+		try:
+			generated_paths.append(ast_to_z3(inspected_path))
+		except Exception as e:
+			errors.append(e)
+
+	# no path can be mapped, the reason is the one of the first path
+	if not generated_paths:
+		raise errors[0]
+
+	if len(generated_paths) == 1:
+		return generated_paths[0]
+
+	generate_str = ""
+	path_names = []
+	for i, generated_path in enumerate(generated_paths):
+		path_name = 'path_{}'.format(i)
+		path_names.append(path_name)
+		body = '\n'.join('    ' + line if line else line for line in generated_path.split('\n'))
+		generate_str += "\n# === PATH {} OF {} ===\ndef {}():\n{}\n".format(i + 1, len(generated_paths), path_name, body)
+
+	generate_str += "\n# === PATHS: the first satisfiable one is solved ===\n"
+	generate_str += "for path in [{}]:\n".format(', '.join(path_names))
+	generate_str += "    solver.push()\n"
+	generate_str += "    path()\n"
+	generate_str += "    if solver.check() == sat:\n"
+	generate_str += "        break\n"
+	generate_str += "    solver.pop()\n"
+	generate_str += "else:\n"
+	generate_str += "    solver.add(False)\n"
+
+	return generate_str + "\n\n"
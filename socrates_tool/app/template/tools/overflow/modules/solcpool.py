@@ -0,0 +1,215 @@
+import json
+import os
+import queue
+import subprocess
+import threading
+from concurrent.futures import Future
+
+
+class _Request:
+
+    def __init__(self, sources, output_selection, allow_paths, targets):
+        self.sources = sources
+        self.output_selection = output_selection
+        self.allow_paths = allow_paths
+        self.targets = targets
+        self.future = Future()
+
+    def is_self_contained(self):
+        # without allowed paths solc cannot read imported files from disk,
+        # so the output will only contain the sources of the request
+        return not self.allow_paths and '*' not in self.targets
+
+
+class SolcPool:
+    """
+    Pool of worker threads compiling through solc --standard-json.
+
+    solc reads a single standard-json document from stdin and exits, so there is no
+    persistent compiler process: each batch forks a new solc. A worker takes the
+    pending requests (at most max_batch_size) and compiles them together, so fork/exec
+    and compiler startup are paid once per batch. A single caller compiling one file
+    at a time gains nothing, the requests must be given together (see submit_batch)
+    or come from concurrent callers.
+    """
+
+    def __init__(self, workers: int = None, max_batch_size: int = 64, binary: str = 'solc'):
+        self.binary = binary
+        self.max_batch_size = max_batch_size
+        self._requests = queue.Queue()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers or os.cpu_count() or 1)]
+
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, sources: dict, output_selection: dict, allow_paths: list = None, targets: list = None) -> Future:
+        """
+        Enqueue a compilation
+        :param sources: standard-json sources, es. {'A.sol': {'content': 'contract A {}'}}
+        :param output_selection: selection applied to each target, es. {'': ['ast'], '*': ['abi']}
+        :param allow_paths: folders solc can read imported files from
+        :param targets: source names the output is requested for (default: the given sources,
+        '*' includes the imported ones). solc does not emit anything for the other sources.
+        :return: Future resolved with the standard-json output restricted to the given sources
+        """
+        request = _Request(sources, output_selection, sorted(allow_paths or []), targets or list(sources))
+        self._requests.put([request])
+        return request.future
+
+    def submit_batch(self, requests: list) -> list:
+        """
+        Enqueue many compilations that are compiled together, with a solc invocation for
+        each max_batch_size requests (requests reading imports from disk are still compiled on their own)
+        :param requests: list of dict with the arguments of submit, es. [{'sources': ..., 'output_selection': ...}]
+        :return: list of Future, one for request
+        """
+        futures = []
+        batch = []
+        for arguments in requests:
+            request = _Request(arguments['sources'], arguments['output_selection'],
+                               sorted(arguments.get('allow_paths') or []),
+                               arguments.get('targets') or list(arguments['sources']))
+            futures.append(request.future)
+
+            if request.is_self_contained():
+                batch.append(request)
+            else:
+                self._requests.put([request])
+
+        for i in range(0, len(batch), self.max_batch_size):
+            self._requests.put(batch[i:i + self.max_batch_size])
+
+        return futures
+
+    def compile(self, sources: dict, output_selection: dict, allow_paths: list = None, targets: list = None) -> dict:
+        return self.submit(sources, output_selection, allow_paths, targets).result()
+
+    def close(self):
+        for _ in self._workers:
+            self._requests.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def _work(self):
+        while True:
+            requests = self._requests.get()
+            if requests is None:
+                return
+
+            batch = self._collect_batch(requests)
+
+            try:
+                self._compile_batch(batch)
+            except Exception as e:
+                for r in batch:
+                    if not r.future.done():
+                        r.future.set_exception(e)
+
+    def _collect_batch(self, requests):
+        """
+        Takes the pending requests that can be compiled together with requests.
+        Requests reading from disk or sharing a source name are left in the queue.
+        """
+        batch = list(requests)
+        if not all(r.is_self_contained() for r in batch) or len(batch) >= self.max_batch_size:
+            return batch
+
+        names = set()
+        for request in batch:
+            names.update(request.sources)
+
+        deferred = []
+
+        while len(batch) < self.max_batch_size:
+            try:
+                pending = self._requests.get_nowait()
+            except queue.Empty:
+                break
+
+            if pending is None:
+                deferred.append(pending)
+                break
+
+            pending_names = set()
+            for request in pending:
+                pending_names.update(request.sources)
+
+            if len(batch) + len(pending) > self.max_batch_size \
+                    or not all(r.is_self_contained() for r in pending) or names.intersection(pending_names):
+                deferred.append(pending)
+                continue
+
+            names.update(pending_names)
+            batch += pending
+
+        for pending in deferred:
+            self._requests.put(pending)
+
+        return batch
+
+    def _compile_batch(self, batch):
+        output = self._run(batch)
+
+        errors = [e for e in output.get('errors', []) if e.get('severity') == 'error']
+
+        if len(batch) > 1 and errors:
+            # errors stop the analysis of all the sources, so the requests with errors
+            # are compiled on their own and the others are compiled again together
+            failing_files = {e.get('sourceLocation', {}).get('file') for e in errors}
+            failing = [r for r in batch if failing_files.intersection(r.sources)]
+
+            if not failing:
+                # errors cannot be attributed to a source
+                failing = batch
+
+            for request in failing:
+                self._compile_batch([request])
+
+            others = [r for r in batch if r not in failing]
+            if others:
+                self._compile_batch(others)
+            return
+
+        for request in batch:
+            request.future.set_result(self._split_output(output, request, len(batch) == 1))
+
+    def _run(self, batch) -> dict:
+        sources = {}
+        output_selection = {}
+        allow_paths = set()
+
+        for request in batch:
+            sources.update(request.sources)
+            allow_paths.update(request.allow_paths)
+            for name in request.targets:
+                output_selection[name] = request.output_selection
+
+        standard_input = {
+            'language': 'Solidity',
+            'sources': sources,
+            'settings': {'outputSelection': output_selection}
+        }
+
+        command = [self.binary, '--standard-json']
+        if allow_paths:
+            command += ['--allow-paths', ','.join(sorted(allow_paths))]
+
+        result = subprocess.run(command, input=json.dumps(standard_input).encode('utf8'),
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        if not result.stdout:
+            raise Exception('AstCompileErr', result.stderr.decode('utf8'))
+
+        return json.loads(result.stdout.decode('utf8'))
+
+    @staticmethod
+    def _split_output(output, request, whole_output):
+        if whole_output:
+            return output
+
+        return {
+            'sources': {k: v for k, v in output.get('sources', {}).items() if k in request.sources},
+            'contracts': {k: v for k, v in output.get('contracts', {}).items() if k in request.sources},
+            'errors': [e for e in output.get('errors', [])
+                       if e.get('sourceLocation', {}).get('file') in request.sources]
+        }
@@ -0,0 +1,121 @@
+import inspect
+import shutil
+import tempfile
+from unittest import TestCase, mock
+from modules import analysiscache
+from modules import asthelper
+from modules import astvisitor
+from modules import compilecache
+from modules import mapper
+from modules import solcpool
+from tests.astbuilder import identifier, literal, operation, variable, declaration, require, function, contract, source_unit
+from utils import instrumentation
+
+
+def build_ast(state_type='uint256'):
+	# the same functions in two contracts, with other ids
+	def add_function(node_id, name, state_id, operator):
+		initial_value = operation(node_id + 9, operator, identifier(node_id + 10, 'a', node_id + 4), identifier(node_id + 11, 'foo', state_id, state_type))
+		return function(node_id, name, [variable(node_id + 4, 'a')], [declaration(node_id + 7, 'b', initial_value)])
+
+	def build_contract(node_id, name):
+		return contract(node_id, name, [
+			variable(node_id + 1, 'foo', state_type, True),
+			add_function(node_id + 10, 'add', node_id + 1, '+'),
+			add_function(node_id + 30, 'divide', node_id + 1, '/')
+		])
+
+	return source_unit([build_contract(100, 'A'), build_contract(200, 'B')])
+
+
+def build_instrumented_ast(offset):
+	# function mint(uint a) public { var nvar_<id> = foo + a; require(a * 2 > 1); } as instrumented,
+	# in a contract at a different position (the names of the variables depend on the ids)
+	def instrumented_contract(node_id, name):
+		initial_value = operation(node_id + 19, '+', identifier(node_id + 20, 'foo', node_id + 1), identifier(node_id + 21, 'a', node_id + 14))
+		condition = operation(node_id + 23, '>', operation(node_id + 24, '*', identifier(node_id + 25, 'a', node_id + 14), literal(node_id + 26, 2)), literal(node_id + 27, 1))
+		return contract(node_id, name, [
+			variable(node_id + 1, 'foo', 'uint256', True),
+			function(node_id + 10, 'mint', [variable(node_id + 14, 'a')], [
+				declaration(node_id + 17, 'nvar_{}'.format(node_id + 19), initial_value), require(node_id + 28, condition)
+			])
+		])
+
+	return source_unit([instrumented_contract(offset, 'A')])
+
+
+class TestAnalysiscache(TestCase):
+
+	def setUp(self):
+		self.original_cache_dir = compilecache.CACHE_DIR
+		compilecache.CACHE_DIR = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(compilecache.CACHE_DIR, ignore_errors=True)
+		compilecache.CACHE_DIR = self.original_cache_dir
+
+	def test_copies_share_the_key(self):
+		first = analysiscache.function_key(astvisitor.visit_context(build_ast(), 'A'), 'add')
+		second = analysiscache.function_key(astvisitor.visit_context(build_ast(), 'B'), 'add')
+		self.assertEqual(first, second)
+
+		# the types of the state variables are part of the key
+		other_type = analysiscache.function_key(astvisitor.visit_context(build_ast('uint8'), 'B'), 'add')
+		self.assertNotEqual(first, other_type)
+
+		self.assertNotEqual(first, analysiscache.function_key(astvisitor.visit_context(build_ast(), 'A'), 'divide'))
+		self.assertIsNone(analysiscache.function_key(astvisitor.visit_context(build_ast(), 'A'), 'missing'))
+
+	def test_results_and_verdicts_are_cached(self):
+		context = astvisitor.visit_context(build_ast(), 'A')
+		results = analysiscache.analyze_contract(build_ast(), ['add', 'divide', 'missing'], 'A')
+
+		self.assertEqual(compilecache.get(analysiscache.function_key(context, 'add')), {'z3': results['add']})
+		self.assertIn('b == a + foo', results['add'])
+
+		self.assertEqual(results['divide'].args[0], 'AstVisitErr')
+		self.assertEqual(compilecache.get(analysiscache.function_key(context, 'divide')), {'error': list(results['divide'].args)})
+		self.assertEqual(results['missing'].args, ('AstVisitErr', 'No function definition'))
+
+		# the copies in the other contract are read from the cache
+		results_b = analysiscache.analyze_contract(build_ast(), ['add', 'divide'], 'B')
+		self.assertEqual(results_b['add'], results['add'])
+		self.assertEqual(results_b['divide'].args, results['divide'].args)
+
+	def test_fingerprint_covers_the_analysis(self):
+		# the modules the analysis imports are part of the fingerprint, except the caches and the compiler pool
+		for module in analysiscache.ANALYSIS_MODULES:
+			for imported in vars(module).values():
+				if inspect.ismodule(imported) and imported.__name__.split('.')[0] in ['models', 'modules'] and imported not in [compilecache, solcpool]:
+					self.assertIn(imported, analysiscache.ANALYSIS_MODULES)
+
+	def test_generated_names_are_normalized(self):
+		first = astvisitor.visit_context(build_instrumented_ast(100), 'A')
+		second = astvisitor.visit_context(build_instrumented_ast(500), 'A')
+		self.assertEqual(analysiscache.function_key(first, 'mint'), analysiscache.function_key(second, 'mint'))
+
+		with mock.patch.object(mapper, 'paths_to_z3', wraps=mapper.paths_to_z3) as paths_to_z3:
+			results = analysiscache.analyze_contract(build_instrumented_ast(100), ['mint'], 'A')
+			results_other = analysiscache.analyze_contract(build_instrumented_ast(500), ['mint'], 'A')
+		self.assertEqual(paths_to_z3.call_count, 1)
+
+		# the constraints do not refer to the ids of the first copy
+		self.assertEqual(results_other['mint'], results['mint'])
+		self.assertIn('nvar_0 == foo + a', results['mint'])
+		self.assertIn('exp_1 == a * 2', results['mint'])
+		self.assertNotIn('119', results['mint'])
+
+	def test_instrumented_copies_share_the_key(self):
+		# the same function at another offset of the file, instrumented (see utils/instrumentation.py)
+		function_source = "function add(uint a) public {\n\t\tfoo += a;\n\t}"
+		sources = [
+			"pragma solidity ^0.4.22;\ncontract A {\n\tuint foo;\n\t" + function_source + "\n}\n",
+			"pragma solidity ^0.4.22;\ncontract Other {\n\tuint bar;\n\tfunction other() public { bar = 1; }\n}\n"
+				+ "contract A {\n\tuint foo;\n\t" + function_source + "\n}\n"
+		]
+		ast_jsons = [asthelper.compile_from_source(instrumentation.convert_reassignment(x)) for x in sources]
+
+		with mock.patch.object(mapper, 'paths_to_z3', wraps=mapper.paths_to_z3) as paths_to_z3:
+			results = [analysiscache.analyze_contract(x, ['add'], 'A')['add'] for x in ast_jsons]
+		self.assertEqual(paths_to_z3.call_count, 1)
+		self.assertEqual(results[0], results[1])
@@ -0,0 +1,137 @@
+"""
+	Builders of the AST nodes used by the tests which do not compile a source,
+	with the fields the visit reads. The ids are given by the tests, a builder
+	of a node with children uses the ids following its own (see each builder).
+"""
+
+
+def type_descriptions(type_string):
+	return {'typeIdentifier': 't_' + type_string.replace(' ', '_'), 'typeString': type_string}
+
+
+def identifier(node_id, name, declaration_id, type_string='uint256'):
+	return {'nodeType': 'Identifier', 'id': node_id, 'name': name, 'referencedDeclaration': declaration_id,
+		'overloadedDeclarations': [], 'src': '0:0:0', 'typeDescriptions': type_descriptions(type_string)}
+
+
+def literal(node_id, value):
+	if value in ['true', 'false']:
+		return {'nodeType': 'Literal', 'id': node_id, 'value': value, 'src': '0:0:0', 'typeDescriptions': type_descriptions('bool')}
+	return {'nodeType': 'Literal', 'id': node_id, 'value': str(value), 'src': '0:0:0',
+		'typeDescriptions': {'typeIdentifier': 't_rational_{}_by_1'.format(value), 'typeString': 'int_const {}'.format(value)}}
+
+
+def operation(node_id, operator, left, right, type_string='uint256'):
+	bool_result = operator in ['>', '<', '==', '!=', '>=', '<=', '&&', '||']
+	return {'nodeType': 'BinaryOperation', 'id': node_id, 'operator': operator, 'src': '0:0:0',
+		'leftExpression': left, 'rightExpression': right, 'commonType': type_descriptions(type_string),
+		'typeDescriptions': type_descriptions('bool' if bool_result else type_string)}
+
+
+def index_access(node_id, base, index, type_string='uint256'):
+	return {'nodeType': 'IndexAccess', 'id': node_id, 'baseExpression': base, 'indexExpression': index, 'src': '0:0:0',
+		'typeDescriptions': type_descriptions(type_string)}
+
+
+def member_access(node_id, expression, member_name, type_string='uint256'):
+	return {'nodeType': 'MemberAccess', 'id': node_id, 'expression': expression, 'memberName': member_name,
+		'referencedDeclaration': None, 'src': '0:0:0', 'typeDescriptions': type_descriptions(type_string)}
+
+
+def call(node_id, function, arguments, type_string='uint256'):
+	return {'nodeType': 'FunctionCall', 'id': node_id, 'kind': 'functionCall', 'names': [], 'src': '0:0:0',
+		'expression': function, 'arguments': arguments, 'typeDescriptions': type_descriptions(type_string)}
+
+
+def variable(node_id, name, type_string='uint256', state_variable=False):
+	# the type name is node_id + 1
+	return {'nodeType': 'VariableDeclaration', 'id': node_id, 'name': name, 'stateVariable': state_variable, 'src': '0:0:0',
+		'typeDescriptions': type_descriptions(type_string),
+		'typeName': {'nodeType': 'ElementaryTypeName', 'id': node_id + 1, 'name': type_string, 'src': '0:0:0', 'typeDescriptions': type_descriptions(type_string)}}
+
+
+def declaration(node_id, name, initial_value, type_string='uint256'):
+	# VariableDeclarationStatement (node_id - 1) of the variable node_id
+	return {'nodeType': 'VariableDeclarationStatement', 'id': node_id - 1, 'assignments': [node_id], 'src': '0:0:0',
+		'initialValue': initial_value, 'declarations': [variable(node_id, name, type_string)]}
+
+
+def expression_statement(node_id, expression):
+	return {'nodeType': 'ExpressionStatement', 'id': node_id, 'expression': expression, 'src': '0:0:0'}
+
+
+def builtin_call(node_id, name, arguments):
+	# statement calling a global function (es. require, revert), the call is node_id + 1
+	function = identifier(node_id + 2, name, -18, 'function (bool) pure')
+	return expression_statement(node_id, call(node_id + 1, function, arguments, 'tuple()'))
+
+
+def require(node_id, condition):
+	return builtin_call(node_id, 'require', [condition])
+
+
+def assignment(node_id, operator, left, right):
+	return expression_statement(node_id, {'nodeType': 'Assignment', 'id': node_id + 1, 'operator': operator, 'src': '0:0:0',
+		'leftHandSide': left, 'rightHandSide': right, 'typeDescriptions': left['typeDescriptions']})
+
+
+def increment(node_id, expression):
+	return expression_statement(node_id, {'nodeType': 'UnaryOperation', 'id': node_id + 1, 'operator': '++', 'prefix': False,
+		'subExpression': expression, 'src': '0:0:0', 'typeDescriptions': expression['typeDescriptions']})
+
+
+def block(node_id, statements):
+	return {'nodeType': 'Block', 'id': node_id, 'statements': statements, 'src': '0:0:0'}
+
+
+def if_statement(node_id, condition, true_body, false_body=None):
+	# the bodies are the blocks node_id + 1 and node_id + 2
+	return {'nodeType': 'IfStatement', 'id': node_id, 'condition': condition, 'src': '0:0:0',
+		'trueBody': block(node_id + 1, true_body), 'falseBody': block(node_id + 2, false_body) if false_body is not None else None}
+
+
+def for_statement(node_id, counter_id, bound, body, operator='<'):
+	# for (uint i = 0; i < bound; i++) { body }, the counter is the variable counter_id
+	counter = identifier(node_id + 3, 'i', counter_id)
+	return {'nodeType': 'ForStatement', 'id': node_id, 'src': '0:0:0',
+		'initializationExpression': declaration(counter_id, 'i', literal(node_id + 1, 0)),
+		'condition': operation(node_id + 2, operator, counter, bound),
+		'loopExpression': increment(node_id + 4, identifier(node_id + 6, 'i', counter_id)),
+		'body': block(node_id + 7, body)}
+
+
+def parameters(node_id, declarations):
+	return {'nodeType': 'ParameterList', 'id': node_id, 'parameters': declarations, 'src': '0:0:0'}
+
+
+def function(node_id, name, parameter_declarations, statements, modifiers=(), return_declarations=(), visibility='public'):
+	# the parameters, return parameters and body are node_id + 1, node_id + 2 and node_id + 3
+	return {'nodeType': 'FunctionDefinition', 'id': node_id, 'name': name, 'implemented': True, 'src': '0:0:0',
+		'visibility': visibility, 'stateMutability': 'nonpayable', 'modifiers': list(modifiers),
+		'parameters': parameters(node_id + 1, list(parameter_declarations)),
+		'returnParameters': parameters(node_id + 2, list(return_declarations)),
+		'body': block(node_id + 3, statements)}
+
+
+def modifier(node_id, name, statements, parameter_declarations=()):
+	# the parameters and body are node_id + 1 and node_id + 2
+	return {'nodeType': 'ModifierDefinition', 'id': node_id, 'name': name, 'src': '0:0:0',
+		'parameters': parameters(node_id + 1, list(parameter_declarations)), 'body': block(node_id + 2, statements)}
+
+
+def modifier_invocation(node_id, name, modifier_id, arguments=None):
+	return {'nodeType': 'ModifierInvocation', 'id': node_id, 'arguments': arguments, 'src': '0:0:0',
+		'modifierName': identifier(node_id + 1, name, modifier_id, 'modifier ()')}
+
+
+def placeholder(node_id):
+	return {'nodeType': 'PlaceholderStatement', 'id': node_id, 'src': '0:0:0'}
+
+
+def contract(node_id, name, nodes):
+	return {'nodeType': 'ContractDefinition', 'id': node_id, 'name': name, 'src': '0:0:0', 'contractKind': 'contract',
+		'linearizedBaseContracts': [node_id], 'baseContracts': [], 'nodes': nodes}
+
+
+def source_unit(contracts):
+	return [{'nodeType': 'SourceUnit', 'id': 0, 'src': '0:0:0', 'nodes': contracts}]
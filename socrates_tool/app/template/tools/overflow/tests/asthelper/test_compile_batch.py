@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from modules import asthelper
+from modules import compilecache
+from modules import solcpool
+from tests import stubsolc
+
+
+class TestCompile_batch(TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.binary, self.log = stubsolc.write_stub_solc(self.folder)
+
+		self.original_cache_dir = compilecache.CACHE_DIR
+		compilecache.CACHE_DIR = os.path.join(self.folder, 'cache')
+		self.original_pool = asthelper._pool
+		asthelper._pool = solcpool.SolcPool(workers=1, binary=self.binary)
+
+	def tearDown(self):
+		asthelper._pool.close()
+		asthelper._pool = self.original_pool
+		compilecache.CACHE_DIR = self.original_cache_dir
+		shutil.rmtree(self.folder, ignore_errors=True)
+
+	def write_source(self, name, content):
+		filename = os.path.join(self.folder, name)
+		with open(filename, 'w') as f:
+			f.write(content)
+		return filename
+
+	def test_broken_source_does_not_fail_the_batch(self):
+		filenames = [self.write_source('A.sol', 'contract A {}'), self.write_source('B.sol', 'contract B { error }'),
+			self.write_source('C.sol', 'contract C {}')]
+		a, b, c = filenames
+
+		results = asthelper.compile_batch(filenames)
+
+		self.assertEqual([x['absolutePath'] for x in results[a]['asts']], [a])
+		self.assertEqual([x['absolutePath'] for x in results[c]['asts']], [c])
+		self.assertEqual(results[b].args, ('AstCompileErr', b + ': broken'))
+
+		# one invocation for the chunk, then the broken source is compiled on its own
+		self.assertEqual(stubsolc.invocations(self.log), [sorted(filenames), [b], [a, c]])
+
+	def test_chunks(self):
+		filenames = [self.write_source('{}.sol'.format(x), 'contract {} {{}}'.format(x)) for x in 'ABCDE']
+
+		# the worker does not merge the chunks
+		asthelper._pool.close()
+		asthelper._pool = solcpool.SolcPool(workers=1, max_batch_size=2, binary=self.binary)
+
+		results = asthelper.compile_batch(filenames, chunk_size=2)
+
+		self.assertEqual(sorted(results), filenames)
+		self.assertEqual(stubsolc.invocations(self.log), [filenames[:2], filenames[2:4], filenames[4:]])
+
+		# the results are read from the cache
+		self.assertEqual(asthelper.compile_batch(filenames, chunk_size=2), results)
+		self.assertEqual(len(stubsolc.invocations(self.log)), 3)
+
+	def test_chunks_are_bounded_by_the_pool(self):
+		filenames = [self.write_source('{}.sol'.format(x), 'contract {} {{}}'.format(x)) for x in 'ABC']
+
+		asthelper._pool.close()
+		asthelper._pool = solcpool.SolcPool(workers=1, max_batch_size=2, binary=self.binary)
+
+		asthelper.compile_batch(filenames, chunk_size=100)
+		self.assertEqual(stubsolc.invocations(self.log), [filenames[:2], filenames[2:]])
+
+	def test_target_comes_first(self):
+		output = {'sources': {name: {'id': i, 'ast': {'nodeType': 'SourceUnit', 'absolutePath': name}} for i, name in enumerate(['A.sol', 'B.sol', 'C.sol'])}}
+
+		# the source compiled, then the imported ones
+		result = asthelper._to_compilation_result('B.sol', output)
+		self.assertEqual([x['absolutePath'] for x in result['asts']], ['B.sol', 'A.sol', 'C.sol'])
@@ -0,0 +1,118 @@
+import argparse
+import importlib.util
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from modules import asthelper
+from modules import compilecache
+from modules import solcpool
+from tests import stubsolc
+
+RUN_SCRIPT = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', '..', 'run.py')
+
+
+class TestCompile_failures(TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		binary, self.log = stubsolc.write_stub_solc(self.folder)
+
+		self.original_cache_dir = compilecache.CACHE_DIR
+		compilecache.CACHE_DIR = os.path.join(self.folder, 'cache')
+		self.original_pool = asthelper._pool
+		asthelper._pool = solcpool.SolcPool(workers=1, binary=binary)
+
+	def tearDown(self):
+		asthelper._pool.close()
+		asthelper._pool = self.original_pool
+		compilecache.CACHE_DIR = self.original_cache_dir
+		shutil.rmtree(self.folder, ignore_errors=True)
+
+	def test_check_errors(self):
+		source = b'contract A { error }'
+		warning = {'severity': 'warning', 'formattedMessage': 'unused'}
+		error = {'severity': 'error', 'type': 'ParserError', 'formattedMessage': 'broken'}
+
+		# warnings are ignored
+		output = {'errors': [warning]}
+		self.assertIs(asthelper._check_errors(source, output), output)
+		asthelper._raise_if_known_failure(source)
+
+		with self.assertRaises(Exception) as raised:
+			asthelper._check_errors(source, {'errors': [warning, error]})
+		self.assertEqual(raised.exception.args, ('AstCompileErr', 'broken'))
+
+		# the error is recorded for the source
+		with self.assertRaises(Exception) as raised:
+			asthelper._raise_if_known_failure(source)
+		self.assertEqual(raised.exception.args, ('AstCompileErr', 'broken'))
+		asthelper._raise_if_known_failure(b'contract A {}')
+
+	def test_errors_of_the_compiler_are_not_recorded(self):
+		source = b'contract A {}'
+		error = {'severity': 'error', 'type': 'JSONError', 'message': 'invalid input'}
+
+		# without formattedMessage the message is reported
+		with self.assertRaises(Exception) as raised:
+			asthelper._check_errors(source, {'errors': [error]})
+		self.assertEqual(raised.exception.args, ('AstCompileErr', 'invalid input'))
+
+		asthelper._raise_if_known_failure(source)
+
+	def test_failure_key(self):
+		self.assertEqual(asthelper._failure_key(b'contract A {}'), asthelper._failure_key(b'contract A {}'))
+		self.assertNotEqual(asthelper._failure_key(b'contract A {}'), asthelper._failure_key(b'contract B {}'))
+
+		# the errors of a source with imports depend on the imported files
+		self.assertIsNone(asthelper._failure_key(b'import "./B.sol";\ncontract A {}'))
+
+	def test_known_failure_is_not_compiled_again(self):
+		source = 'contract A { error }'
+
+		with self.assertRaises(Exception) as first:
+			asthelper.compile_from_source(source)
+		self.assertEqual(first.exception.args[0], 'AstCompileErr')
+		self.assertEqual(len(stubsolc.invocations(self.log)), 1)
+
+		with self.assertRaises(Exception) as second:
+			asthelper.compile_from_source(source)
+		self.assertEqual(second.exception.args, first.exception.args)
+		self.assertEqual(len(stubsolc.invocations(self.log)), 1)
+
+	def test_run_precheck(self):
+		spec = importlib.util.spec_from_file_location('run', RUN_SCRIPT)
+		run = importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(run)
+
+		source = os.path.join(self.folder, 'A.sol')
+		with open(source, 'w') as f:
+			f.write('contract A { error }')
+		output_folder = os.path.join(self.folder, 'project')
+		args = argparse.Namespace(precheck=True, instrument=True, source=source, contract='A', testconfig=None, outputfolder=output_folder)
+
+		# the contract is rejected before the project is set up
+		with self.assertRaises(SystemExit) as raised:
+			run.main(args)
+		self.assertNotEqual(raised.exception.code, 0)
+		self.assertFalse(os.path.exists(output_folder))
+
+		# a later run reads the diagnostic from the cache
+		self.assertIsNone(run.check_compiles(source))
+		self.assertEqual(len(stubsolc.invocations(self.log)), 1)
+
+	def test_run_precheck_is_read_by_the_analysis(self):
+		spec = importlib.util.spec_from_file_location('run', RUN_SCRIPT)
+		run = importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(run)
+
+		source = os.path.join(self.folder, 'A.sol')
+		with open(source, 'w') as f:
+			f.write('contract A {}')
+
+		compilation = run.check_compiles(source)
+		self.assertEqual(compilation['filename'], source)
+
+		# main.py compiles the source again (see main.py main)
+		self.assertEqual(asthelper.compile_contract(source), compilation)
+		self.assertEqual(len(stubsolc.invocations(self.log)), 1)
@@ -0,0 +1,81 @@
+import sys
+from unittest import TestCase
+from modules import asthelper
+
+
+def nested_blocks(depth):
+	ast = {'nodeType': 'Identifier', 'name': 'x'}
+	for i in range(depth):
+		ast = {'nodeType': 'Block', 'id': i, 'statements': [ast]}
+	return ast
+
+
+class TestFind_nodes(TestCase):
+
+	def test_deeper_than_the_recursion_limit(self):
+		ast = nested_blocks(sys.getrecursionlimit() * 2)
+
+		identifier = asthelper.find_node(ast, {'nodeType': 'Identifier'})
+		self.assertEqual(identifier['name'], 'x')
+		self.assertEqual(asthelper.find_parent(identifier, {'nodeType': 'Block'})['id'], 0)
+		self.assertEqual(len(asthelper.find_all_nodes(ast, {'nodeType': 'Block'})), sys.getrecursionlimit() * 2)
+
+	def test_depth_first_order(self):
+		ast = nested_blocks(3)
+		ast['statements'].append({'nodeType': 'Identifier', 'name': 'y'})
+
+		names = [x['name'] for x in asthelper.find_all_nodes(ast, {'nodeType': 'Identifier'})]
+		self.assertEqual(names, ['x', 'y'])
+
+		ids = [x['id'] for x in asthelper.iter_nodes(ast, {'nodeType': 'Block'})]
+		self.assertEqual(ids, [2, 1, 0])
+
+	def test_not_found(self):
+		self.assertFalse(asthelper.find_node(nested_blocks(3), {'nodeType': 'Literal'}))
+		self.assertEqual(asthelper.find_all_nodes(nested_blocks(3), {'nodeType': 'Literal'}), [])
+
+	def test_many_queries_in_one_visit(self):
+		ast = nested_blocks(3)
+		ast['statements'].append({'nodeType': 'Identifier', 'name': 'y'})
+		queries = {
+			'identifiers': {'nodeType': 'Identifier'},
+			'blocks': {'nodeType': 'Block'},
+			'y': {'name': '^y$'},
+			'literals': {'nodeType': 'Literal'}
+		}
+
+		results = asthelper.find_all_nodes_by_query(ast, queries)
+
+		self.assertEqual(list(results), list(queries))
+		for name, properties in queries.items():
+			self.assertEqual([x.dic for x in results[name]], [x.dic for x in asthelper.find_all_nodes(ast, properties)])
+
+		indexed = asthelper.find_all_nodes_by_query(asthelper.index(ast), queries)
+		self.assertEqual([x.dic for x in indexed['blocks']], [x.dic for x in results['blocks']])
+
+	def test_linearized_contracts(self):
+		ast = {'nodeType': 'SourceUnit', 'nodes': [
+			{'nodeType': 'ContractDefinition', 'id': 1, 'name': 'Base', 'linearizedBaseContracts': [1], 'nodes': []},
+			{'nodeType': 'ContractDefinition', 'id': 2, 'name': 'Unrelated', 'linearizedBaseContracts': [2], 'nodes': []},
+			{'nodeType': 'ContractDefinition', 'id': 3, 'name': 'Token', 'linearizedBaseContracts': [3, 1], 'nodes': []}
+		]}
+
+		for ast_index in [None, asthelper.index(ast)]:
+			contracts = asthelper.linearized_contracts(ast, 'Token', ast_index)
+			self.assertEqual([x['name'] for x in contracts], ['Token', 'Base'])
+			self.assertEqual(asthelper.linearized_contracts(ast, 'Missing', ast_index), [])
+
+	def test_referenced_declarations(self):
+		statements = [
+			{'nodeType': 'ExpressionStatement', 'expression': {'nodeType': 'Identifier', 'name': 'a', 'referencedDeclaration': 4}},
+			{'nodeType': 'Return', 'expression': {'nodeType': 'BinaryOperation', 'operator': '+',
+				'leftExpression': {'nodeType': 'Identifier', 'name': 'b', 'referencedDeclaration': 5},
+				'rightExpression': {'nodeType': 'Identifier', 'name': 'a', 'referencedDeclaration': 4}}},
+			{'nodeType': 'ExpressionStatement', 'expression': {'nodeType': 'Identifier', 'name': 'c'}}
+		]
+
+		for ast_index in [None, asthelper.index(statements)]:
+			references = asthelper.referenced_declarations(statements, ast_index)
+			self.assertEqual(sorted(references), [4, 5])
+			self.assertEqual([x['name'] for x in references[4]], ['a', 'a'])
+			self.assertEqual(references[5][0]['name'], 'b')
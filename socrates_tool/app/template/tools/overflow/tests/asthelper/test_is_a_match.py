@@ -0,0 +1,31 @@
+from unittest import TestCase
+from modules import asthelper
+
+
+class TestIs_a_match(TestCase):
+
+	def test_anchored_literal(self):
+		self.assertTrue(asthelper._is_a_match({'name': 'require'}, {'name': '^require$'}))
+		self.assertFalse(asthelper._is_a_match({'name': 'requires'}, {'name': '^require$'}))
+		self.assertFalse(asthelper._is_a_match({'name': 'require'}, {'value': '^require$'}))
+
+	def test_substring_and_regex(self):
+		node = {'nodeType': 'VariableDeclarationStatement'}
+		self.assertTrue(asthelper._is_a_match(node, {'nodeType': 'VariableDeclaration'}))
+		self.assertTrue(asthelper._is_a_match(node, {'nodeType': '.*Statement'}))
+		self.assertFalse(asthelper._is_a_match(node, {'nodeType': '^VariableDeclaration$'}))
+
+	def test_int_and_bool(self):
+		self.assertTrue(asthelper._is_a_match({'referencedDeclaration': 12}, {'referencedDeclaration': 12}))
+		self.assertFalse(asthelper._is_a_match({'referencedDeclaration': 120}, {'referencedDeclaration': 12}))
+		self.assertTrue(asthelper._is_a_match({'stateVariable': True}, {'stateVariable': True}))
+		self.assertFalse(asthelper._is_a_match({'stateVariable': False}, {'stateVariable': True}))
+
+	def test_scalars_as_string(self):
+		self.assertTrue(asthelper._is_a_match({'value': None}, {'value': 'None'}))
+		self.assertTrue(asthelper._is_a_match({'id': 120}, {'id': '^12'}))
+
+	def test_subtrees_never_match_a_string(self):
+		node = {'nodeType': 'ExpressionStatement', 'expression': {'nodeType': 'Identifier', 'name': 'x'}}
+		self.assertFalse(asthelper._is_a_match(node, {'expression': 'Identifier'}))
+		self.assertFalse(asthelper._is_a_match(['x'], {'name': 'x'}))
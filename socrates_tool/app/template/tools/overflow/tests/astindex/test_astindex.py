@@ -0,0 +1,63 @@
+from unittest import TestCase
+from modules import asthelper
+
+
+def build_ast():
+	return [{
+		'nodeType': 'SourceUnit', 'id': 1,
+		'nodes': [{
+			'nodeType': 'ContractDefinition', 'id': 2, 'name': 'A',
+			'nodes': [
+				{'nodeType': 'VariableDeclaration', 'id': 3, 'name': 'a', 'stateVariable': True},
+				{'nodeType': 'FunctionDefinition', 'id': 4, 'name': 'f', 'body': {
+					'nodeType': 'Block', 'id': 5, 'statements': [
+						{'nodeType': 'VariableDeclarationStatement', 'id': 6, 'declarations': [
+							{'nodeType': 'VariableDeclaration', 'id': 7, 'name': 'b', 'stateVariable': False}
+						]},
+						{'nodeType': 'ExpressionStatement', 'id': 8, 'expression': {
+							'nodeType': 'Identifier', 'id': 9, 'name': 'a', 'referencedDeclaration': 3
+						}}
+					]
+				}}
+			]
+		}]
+	}]
+
+
+class TestAstIndex(TestCase):
+
+	def test_same_results_as_the_visit(self):
+		ast = build_ast()
+		ast_index = asthelper.index(ast)
+		queries = [
+			{'nodeType': 'VariableDeclaration'},
+			{'nodeType': 'VariableDeclaration', 'stateVariable': True},
+			{'nodeType': '.*Statement'},
+			{'name': '^a$'},
+			{'nodeType': 'Missing'}
+		]
+
+		for query in queries:
+			walked = asthelper.find_all_nodes(ast, query)
+			indexed = asthelper.find_all_nodes(ast_index, query)
+			self.assertEqual([x.dic for x in walked], [x.dic for x in indexed])
+
+	def test_subtree_query(self):
+		ast = build_ast()
+		ast_index = asthelper.index(ast)
+		block = ast_index.node(5)
+
+		identifier = asthelper.find_node(block['statements'][1], {'nodeType': 'Identifier'}, ast_index)
+		self.assertEqual(identifier['id'], 9)
+
+		# the parents stop at the queried subtree
+		self.assertEqual(asthelper.find_parent(identifier, {'nodeType': 'ExpressionStatement'})['id'], 8)
+		self.assertFalse(asthelper.find_parent(identifier, {'nodeType': 'Block'}))
+
+		self.assertFalse(asthelper.find_node(block['statements'][0], {'nodeType': 'Identifier'}, ast_index))
+
+	def test_parent_and_ids(self):
+		ast_index = asthelper.index(build_ast())
+		self.assertEqual(ast_index.parent(ast_index.node(7))['id'], 6)
+		self.assertEqual(ast_index.parent(ast_index.node(1)), None)
+		self.assertEqual(len(ast_index.subtree(ast_index.node(4))), 6)
@@ -0,0 +1,152 @@
+from unittest import TestCase
+from models import astnode
+from modules.astvisitor import enumerate_paths
+from tests.astbuilder import identifier, literal, operation, declaration, if_statement, for_statement, index_access, assignment, increment, builtin_call
+
+"""
+	enumerate_paths
+
+	Enumerates the paths through the statements of a function: each path is the list of statements
+	it executes, the branches taken are require statements of their conditions and the loops are
+	summarized or unrolled up to max_iterations. The branches ending with revert, throw or return false
+	are not taken, nor are the paths reaching a revert or a throw. A path ends with its first return statement.
+"""
+
+
+def describe(path):
+	descriptions = []
+	for statement in path:
+		if statement['nodeType'] == 'VariableDeclarationStatement' and not statement['initialValue']:
+			descriptions.append(statement['declarations'][0]['name'])
+		elif statement['nodeType'] == 'VariableDeclarationStatement':
+			descriptions.append('{} = {}'.format(statement['declarations'][0]['name'], astnode.AstNode(None, statement['initialValue']).to_string()))
+		elif statement['nodeType'] == 'ExpressionStatement':
+			descriptions.append('require({})'.format(astnode.AstNode(None, statement['expression']['arguments'][0]).to_string()))
+		else:
+			descriptions.append(statement['nodeType'])
+	return descriptions
+
+
+class TestEnumerate_paths(TestCase):
+
+	def test_no_branches(self):
+		statements = [declaration(1, 'a', literal(3, 5)), {'nodeType': 'Return', 'id': 4}, declaration(5, 'b', literal(7, 1))]
+		self.assertEqual(enumerate_paths(statements), [statements[:2]])
+
+	def test_if_statement(self):
+		x = identifier(2, 'x', 1)
+		statements = [if_statement(10, operation(3, '>', x, literal(4, 5)), [declaration(20, 'a', literal(22, 1))]), {'nodeType': 'Return', 'id': 30}]
+
+		paths = [describe(x) for x in enumerate_paths(statements)]
+		self.assertEqual(paths, [
+			['require(x > 5)', 'a = 1', 'Return'],
+			['require(Not((x > 5)))', 'Return']
+		])
+
+	def test_for_statement(self):
+		n = identifier(2, 'n', 1)
+		body = [declaration(20, 's', operation(22, '+', identifier(23, 'i', 10), n))]
+		statements = [for_statement(30, 10, n, body)]
+
+		paths = [describe(x) for x in enumerate_paths(statements)]
+		self.assertEqual(paths, [
+			['i = 0', 'require(Not((i < n)))'],
+			['i = 0', 'require(i < n)', 's = i + n', 'i_it1 = 1', 'require(Not((i_it1 < n)))'],
+			['i = 0', 'require(i < n)', 's = i + n', 'i_it1 = 1', 'require(i_it1 < n)', 's_it1 = i_it1 + n', 'i_it2 = 2', 'require(Not((i_it2 < n)))']
+		])
+
+		# the copies of the iterations have their own ids, the AST is not modified
+		last_path = enumerate_paths(statements)[-1]
+		self.assertEqual(last_path[5]['initialValue']['id'], '22_it1')
+		self.assertEqual(body[0]['declarations'][0]['name'], 's')
+
+	def test_budgets(self):
+		x = identifier(2, 'x', 1)
+		statements = [if_statement(10 * i, operation(10 * i + 3, '>', x, literal(10 * i + 4, i)), []) for i in range(1, 5)]
+
+		self.assertEqual(len(enumerate_paths(statements)), 8)
+		self.assertEqual(len(enumerate_paths(statements, max_paths=3)), 3)
+		self.assertEqual(len(enumerate_paths(statements, max_paths=100)), 16)
+
+		# the path is cut before the statement exceeding the nodes, it is not returned
+		truncated = []
+		self.assertEqual(enumerate_paths(statements, max_paths=1, max_nodes=8, truncated=truncated), [])
+		self.assertEqual([describe(x) for x in truncated], [['require(x > 1)']])
+
+		# only the paths cut by the budget are truncated
+		truncated = []
+		self.assertEqual(len(enumerate_paths(statements, max_paths=2, max_nodes=100, truncated=truncated)), 2)
+		self.assertEqual(truncated, [])
+
+	def test_summarized_loop(self):
+		n = identifier(2, 'n', 1)
+		body = [
+			assignment(20, '+=', identifier(22, 'total', 3), index_access(23, identifier(24, 'values', 4), identifier(25, 'i', 10))),
+			increment(26, identifier(28, 'count', 5))
+		]
+		statements = [for_statement(30, 10, n, body), declaration(40, 'after', operation(42, '+', identifier(43, 'total', 3), literal(44, 1)))]
+
+		# the sum and the counter are given by their closed form, the statements after the loop refer to them
+		paths = [describe(x) for x in enumerate_paths(statements)]
+		self.assertEqual(paths, [
+			['require(Not((0 < n)))', 'after = total + 1'],
+			['require(0 < n)',
+				'total_loop = total + Sum([If(And(i_k >= 0, i_k < n), values[i_k], 0) for i_k in range(max_array_len)])',
+				'count_loop = count + 1 * (n - 0)',
+				'after = total_loop + 1']
+		])
+
+		# the closed forms are nodes, with the expressions they are computed from
+		closed_form = enumerate_paths(statements)[1][1]['initialValue']['rightExpression']
+		self.assertEqual(closed_form['nodeType'], 'ClosedForm')
+		self.assertEqual(closed_form['term']['baseExpression']['referencedDeclaration'], 4)
+		self.assertEqual(closed_form['condition']['rightExpression']['rightExpression']['referencedDeclaration'], 1)
+
+		# the loop is summarized whatever the number of its iterations, the AST is not modified
+		self.assertEqual(len(enumerate_paths(statements, max_iterations=100)), 2)
+		self.assertEqual(statements[1]['initialValue']['leftExpression']['name'], 'total')
+
+	def test_summarized_mapping_update(self):
+		n = identifier(2, 'n', 1)
+		receiver = index_access(23, identifier(24, 'receivers', 4, 'address[] memory'), identifier(25, 'i', 10), 'address')
+		body = [assignment(20, '+=', index_access(22, identifier(26, 'balances', 3, 'mapping(address => uint256)'), receiver), identifier(27, 'value', 5))]
+		statements = [for_statement(30, 10, n, body)]
+
+		# the update of any iteration can overflow, the elements read are in the array and in the mapping
+		paths = [describe(x) for x in enumerate_paths(statements)]
+		self.assertEqual(paths[1], ['require(0 < n)', 'i_any', 'require(And(i_any >= 0, i_any < n))',
+			'require(Sum([If(i_any == i_k, receivers[i_k], 0) for i_k in range(max_array_len)]) >= 0)',
+			'require(Sum([If(i_any == i_k, balances[receivers[i_k]], 0) for i_k in range(max_array_len)]) >= 0)',
+			'require(i_any < receivers_length)',
+			'balances_update = Sum([If(i_any == i_k, balances[receivers[i_k]], 0) for i_k in range(max_array_len)]) + value'])
+
+		# a loop with other statements is unrolled
+		body.append(declaration(50, 's', identifier(52, 'value', 5)))
+		self.assertEqual(len(enumerate_paths(statements)), 3)
+
+	def test_native_guards(self):
+		x = identifier(2, 'x', 1)
+		return_false = {'nodeType': 'Return', 'id': 60, 'expression': literal(61, 'false')}
+		statements = [
+			if_statement(10, operation(13, '>', x, literal(14, 10)), [builtin_call(20, 'revert', [])]),
+			if_statement(30, operation(33, '==', x, literal(34, 5)), [{'nodeType': 'Throw', 'id': 40}], [declaration(42, 'a', literal(44, 1))]),
+			builtin_call(50, 'assert', [operation(53, '!=', x, literal(54, 3))]),
+			if_statement(55, operation(58, '<', x, literal(59, 1)), [return_false]),
+			{'nodeType': 'Return', 'id': 70}
+		]
+
+		# the branches reverting are not taken, one path is left
+		paths = [describe(x) for x in enumerate_paths(statements)]
+		self.assertEqual(paths, [
+			['require(Not((x > 10)))', 'require(Not((x == 5)))', 'a = 1', 'require(x != 3)', 'require(Not((x < 1)))', 'Return']
+		])
+
+		# the paths reaching a revert or a throw, or a branch whose alternatives all fail, are not enumerated
+		self.assertEqual(enumerate_paths([builtin_call(80, 'revert', []), declaration(90, 'b', literal(92, 1))]), [])
+		statements = [
+			if_statement(100, operation(103, '>', x, literal(104, 1)), [declaration(110, 'c', literal(112, 1))], [{'nodeType': 'Throw', 'id': 113}]),
+			if_statement(120, operation(123, '>', x, literal(124, 2)), [builtin_call(130, 'revert', [])], [builtin_call(140, 'revert', [])])
+		]
+		self.assertEqual(enumerate_paths(statements), [])
+		self.assertEqual([describe(x) for x in enumerate_paths(statements[:1] + [{'nodeType': 'Throw', 'id': 150}])], [])
+		self.assertEqual([describe(x) for x in enumerate_paths(statements[:1])], [['require(x > 1)', 'c = 1']])
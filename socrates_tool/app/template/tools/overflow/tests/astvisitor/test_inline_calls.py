@@ -0,0 +1,125 @@
+from unittest import TestCase
+from models import astnode
+from modules.astvisitor import visit_context, visit_paths
+from tests.astbuilder import identifier, literal, operation, member_access, call, variable, declaration, require, function, modifier, modifier_invocation, placeholder, contract, source_unit
+
+"""
+	inline_modifiers, inline_calls
+
+	The statements of the modifiers (es. onlyOwner) and of the internal helpers
+	called by the function under test are part of its paths: the guards of the
+	modifiers are requires of the function, the value returned by a helper
+	replaces its call.
+"""
+
+
+def build_ast():
+	msg_sender = member_access(10, identifier(11, 'msg', -15, 'msg'), 'sender', 'address')
+
+	# modifier onlyOwner() { require(msg.sender == owner); _; }
+	only_owner = modifier(20, 'onlyOwner', [
+		require(23, operation(26, '==', msg_sender, identifier(27, 'owner', 2, 'address'))),
+		placeholder(28)
+	])
+
+	# function fee(uint v) internal view returns (uint) { require(v > 0); return v * rate; }
+	fee = function(30, 'fee', [variable(34, 'v')], [
+		require(38, operation(41, '>', identifier(42, 'v', 34), literal(43, 0))),
+		{'nodeType': 'Return', 'id': 44, 'src': '0:0:0', 'expression': operation(45, '*', identifier(46, 'v', 34), identifier(47, 'rate', 4))}
+	], return_declarations=[variable(36, '')], visibility='internal')
+
+	# function pay(uint x) public onlyOwner { uint total = fee(x) + 1; require(total > 3); }
+	fee_call = call(62, identifier(63, 'fee', 30, 'function (uint256) view returns (uint256)'), [identifier(64, 'x', 54)])
+	pay = function(50, 'pay', [variable(54, 'x')], [
+		declaration(59, 'total', operation(61, '+', fee_call, literal(65, 1))),
+		require(66, operation(69, '>', identifier(70, 'total', 59), literal(71, 3)))
+	], modifiers=[modifier_invocation(56, 'onlyOwner', 20)])
+
+	return source_unit([contract(1, 'C', [variable(2, 'owner', 'address', True), variable(4, 'rate', 'uint256', True), only_owner, fee, pay])])
+
+
+def build_library_ast():
+	# library SafeMath { function add(uint a, uint b) internal pure returns (uint) { uint c = a + b; require(c >= a); return c; } }
+	add = function(110, 'add', [variable(114, 'a'), variable(116, 'b')], [
+		declaration(121, 'c', operation(123, '+', identifier(124, 'a', 114), identifier(125, 'b', 116))),
+		require(126, operation(129, '>=', identifier(130, 'c', 121), identifier(131, 'a', 114))),
+		{'nodeType': 'Return', 'id': 132, 'src': '0:0:0', 'expression': identifier(133, 'c', 121)}
+	], return_declarations=[variable(118, '')], visibility='internal')
+	safe_math = dict(contract(100, 'SafeMath', [add]), contractKind='library')
+
+	# contract C { using SafeMath for uint; uint rate; function deposit(uint x) public { uint sum = x.add(rate); uint direct = SafeMath.add(x, 1); } }
+	add_type = 'function (uint256, uint256) pure returns (uint256)'
+	bound = dict(member_access(162, identifier(163, 'x', 154), 'add', add_type), referencedDeclaration=110)
+	direct = dict(member_access(172, identifier(173, 'SafeMath', 100, 'type(library SafeMath)'), 'add', add_type), referencedDeclaration=110)
+	deposit = function(150, 'deposit', [variable(154, 'x')], [
+		declaration(159, 'sum', call(161, bound, [identifier(164, 'rate', 4)])),
+		declaration(169, 'direct', call(171, direct, [identifier(174, 'x', 154), literal(175, 1)]))
+	])
+
+	return source_unit([safe_math, contract(1, 'C', [variable(4, 'rate', 'uint256', True), deposit])])
+
+
+def build_unrelated_ast():
+	# contract B { function fee(uint v) internal pure returns (uint) { return v * 3; } }
+	# contract A { function fee(uint v) internal pure returns (uint) { return v * 2; } function pay(uint x) public { uint total = fee(x); } }
+	def fee(node_id, factor):
+		return function(node_id, 'fee', [variable(node_id + 4, 'v')], [
+			{'nodeType': 'Return', 'id': node_id + 8, 'src': '0:0:0', 'expression': operation(node_id + 9, '*', identifier(node_id + 10, 'v', node_id + 4), literal(node_id + 11, factor))}
+		], return_declarations=[variable(node_id + 6, '')], visibility='internal')
+
+	fee_call = call(262, identifier(263, 'fee', 230, 'function (uint256) pure returns (uint256)'), [identifier(264, 'x', 254)])
+	pay = function(250, 'pay', [variable(254, 'x')], [declaration(259, 'total', fee_call)])
+
+	return source_unit([contract(200, 'B', [fee(210, 3)]), contract(201, 'A', [fee(230, 2), pay])])
+
+
+class TestInline_calls(TestCase):
+
+	def test_modifiers_and_helpers(self):
+		context = visit_context(build_ast(), 'C')
+		inspected_function = visit_paths(context, 'pay')[0]
+
+		requires = [astnode.AstNode(None, x['expression']['arguments'][0]).to_string() for x in inspected_function['require_nodes']]
+		self.assertEqual(requires, ['msg_sender == owner', 'x > 0', 'total > 3'])
+
+		# the call is replaced by the returned expression
+		initial_value = inspected_function['local_variables'][0]['initialValue']
+		self.assertEqual(astnode.AstNode(None, initial_value['leftExpression']).to_string(), 'x * rate')
+
+		accessed_state_variables = [x['name'] for x in inspected_function['accessed_state_variables']]
+		self.assertEqual(accessed_state_variables, ['owner', 'rate'])
+
+		# the summaries are computed once for the contract, a helper without summary is not inlined
+		self.assertEqual(sorted(x for x, y in context['summaries'].items() if y is not None), [20, 30])
+		context['summaries'][30] = None
+		with self.assertRaises(Exception):
+			visit_paths(context, 'pay')
+
+	def test_library_functions(self):
+		inspected_function = visit_paths(visit_context(build_library_ast(), 'C'), 'deposit')[0]
+
+		# the receiver of the bound call is the first argument
+		requires = [astnode.AstNode(None, x['expression']['arguments'][0]).to_string() for x in inspected_function['require_nodes']]
+		self.assertEqual(requires, ['c_in161 >= x', 'c_in171 >= x'])
+
+		# the sums of the library are candidates, with the arguments of each call
+		self.assertEqual([x.dic['name'] for x in inspected_function['candidate_for_overflow']], ['c_in161', 'c_in171'])
+		operands = [[astnode.AstNode(None, x['initialValue'][y]).to_string() for y in ['leftExpression', 'rightExpression']]
+			for x in inspected_function['local_variables'] if x['initialValue']['nodeType'] == 'BinaryOperation']
+		self.assertEqual(operands, [['x', 'rate'], ['x', '1']])
+
+		# the calls to a contract are not inlined
+		context = visit_context(build_library_ast(), 'C')
+		context['ast_index'].node(100)['contractKind'] = 'contract'
+		with self.assertRaises(Exception):
+			visit_paths(context, 'deposit')
+
+	def test_without_contract_under_test(self):
+		# the functions of every contract are visited, the call is dispatched in the contract of pay
+		context = visit_context(build_unrelated_ast())
+		self.assertEqual([x['id'] for x in context['functions']['fee']], [210, 230])
+
+		inspected_function = visit_paths(context, 'pay')[0]
+		initial_value = inspected_function['local_variables'][0]['initialValue']
+		self.assertEqual(astnode.AstNode(None, initial_value['rightExpression']).to_string(), '2')
+		self.assertEqual(list(context['summaries']), [(230, 201)])
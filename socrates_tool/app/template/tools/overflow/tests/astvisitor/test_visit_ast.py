@@ -1,6 +1,8 @@
+import json
 from unittest import TestCase
 from modules import asthelper
-from modules.astvisitor import visit_ast
+from modules import mapper
+from modules.astvisitor import visit_ast, visit_contract, visit_context, visit_paths
 
 """
 	visit_ast
@@ -311,3 +313,108 @@ class TestVisit_ast(TestCase):
 
 
 
+
+	def test_visit_ast_contract_under_test(self):
+		source = """
+			pragma solidity ^0.4.22;
+			contract Base {
+				uint foo;
+				function testFunction (uint bar) public returns (uint) {
+					uint baz = foo + bar;
+					return baz;
+				}
+			}
+			contract Unrelated {
+				uint other;
+				function testFunction (uint bar) public returns (uint) {
+					uint qux = other * bar;
+					return qux;
+				}
+			}
+			contract testContract is Base {
+			}
+		"""
+		ast_json, function_name = self.before_test(source)
+		collected_obj = visit_ast(ast_json, function_name, 'testContract')
+		candidate_for_overflow_name = [x.dic['name'] for x in collected_obj['candidate_for_overflow']]
+		accessed_state_variables = [x['name'] for x in collected_obj['accessed_state_variables']]
+		self.assertEqual(candidate_for_overflow_name, ['baz'])
+		self.assertEqual(accessed_state_variables, ['foo'])
+
+		with self.assertRaises(Exception) as context:
+			visit_ast(ast_json, function_name, 'Missing')
+		self.assertTrue('AstVisitErr' in str(context.exception))
+
+	def test_visit_ast_does_not_modify_the_ast(self):
+		source = """
+			pragma solidity ^0.4.22;
+			contract testContract {
+				uint foo;
+				function testFunction (address to) public returns (string) {
+					uint bar = foo + 5;
+					require(to != 0x0 && 6 + foo > 5 * foo);
+					return 'helloWorld';
+				}
+			}
+		"""
+		ast_json, function_name = self.before_test(source)
+		original = json.dumps(ast_json)
+
+		first = visit_ast(ast_json, function_name)
+		self.assertEqual(json.dumps(ast_json), original)
+
+		# the same tree can be visited again
+		second = visit_ast(ast_json, function_name)
+		self.assertEqual(mapper.ast_to_z3(first), mapper.ast_to_z3(second))
+
+	def test_visit_contract(self):
+		source = """
+			pragma solidity ^0.4.22;
+			contract testContract {
+				uint foo;
+				function testFunction (uint bar) public returns (string) {
+					uint baz = foo + bar;
+					return 'helloWorld';
+				}
+				function other (uint bar) public returns (string) {
+					uint baz = 5;
+					return 'helloWorld';
+				}
+			}
+		"""
+		ast_json, function_name = self.before_test(source)
+		inspected_functions = visit_contract(ast_json, [function_name, 'other', 'missing'], 'testContract')
+
+		self.assertEqual(mapper.ast_to_z3(inspected_functions[function_name]), mapper.ast_to_z3(visit_ast(ast_json, function_name)))
+		self.assertEqual(inspected_functions['other'].args[0], 'AstVisitErr')
+		self.assertEqual(inspected_functions['missing'].args, ('AstVisitErr', 'No function definition'))
+
+		# the failure of the contract is the failure of all its functions
+		inspected_functions = visit_contract(ast_json, [function_name, 'other'], 'Missing')
+		self.assertEqual(inspected_functions[function_name].args, ('AstVisitErr', 'No contract definition'))
+		self.assertEqual(inspected_functions['other'].args, ('AstVisitErr', 'No contract definition'))
+
+	def test_visit_paths(self):
+		source = """
+			pragma solidity ^0.4.22;
+			contract testContract {
+				function testFunction (uint bar) public returns (string) {
+					if (bar > 10) {
+						uint baz = bar * 2;
+					} else {
+						uint qux = bar + 1;
+					}
+					require(bar < 100);
+					return 'helloWorld';
+				}
+			}
+		"""
+		ast_json, function_name = self.before_test(source)
+		inspected_paths = visit_paths(visit_context(ast_json, 'testContract'), function_name)
+
+		candidates = [[x.dic['name'] for x in path['candidate_for_overflow']] for path in inspected_paths]
+		self.assertEqual(candidates, [['baz'], ['qux']])
+
+		z3_generated_code = mapper.paths_to_z3(inspected_paths)
+		self.assertIn('def path_0():', z3_generated_code)
+		self.assertIn('solver.add(Not((bar > 10)))', z3_generated_code)
@@ -0,0 +1,53 @@
+from unittest import TestCase, mock
+from modules import astvisitor
+from modules.astvisitor import visit_context, visit_function, visit_paths
+from tests.astbuilder import identifier, literal, operation, variable, declaration, require, if_statement, function, contract, source_unit
+
+"""
+	visit_paths, visit_function
+
+	Each path through the function under test is inspected on its own, the
+	paths cut by the budgets of the enumeration (see enumerate_paths) are not:
+	the statements they do not execute would be missing from the constraints.
+"""
+
+
+def build_ast():
+	# function split(uint x) public { if (x > 5) { uint a = x * 2; uint b = a * a + x * x; } else { uint c = x + 1; } require(x < 100); }
+	x = lambda node_id: identifier(node_id, 'x', 14)
+	large_body = [
+		declaration(30, 'a', operation(32, '*', x(33), literal(34, 2))),
+		declaration(40, 'b', operation(42, '+', operation(43, '*', identifier(44, 'a', 30), identifier(45, 'a', 30)), operation(46, '*', x(47), x(48))))
+	]
+	split = function(10, 'split', [variable(14, 'x')], [
+		if_statement(20, operation(23, '>', x(24), literal(25, 5)), large_body, [declaration(50, 'c', operation(52, '+', x(53), literal(54, 1)))]),
+		require(60, operation(63, '<', x(64), literal(65, 100)))
+	])
+	return source_unit([contract(1, 'C', [split])])
+
+
+class TestVisit_paths(TestCase):
+
+	def test_paths(self):
+		context = visit_context(build_ast(), 'C')
+
+		candidates = [[x.dic['name'] for x in path['candidate_for_overflow']] for path in visit_paths(context, 'split')]
+		self.assertEqual(candidates, [['a', 'b'], ['c']])
+
+		# the first path, with every path
+		inspected_function = visit_function(context, 'split')
+		self.assertEqual([x.dic['name'] for x in inspected_function['candidate_for_overflow']], ['a', 'b'])
+		self.assertEqual(len(inspected_function['paths']), 2)
+
+	def test_paths_cut_by_the_budget(self):
+		context = visit_context(build_ast(), 'C')
+
+		# the branch with the larger body exceeds the nodes, the other path is inspected
+		with mock.patch.object(astvisitor, 'MAX_PATH_NODES', 25):
+			inspected_paths = visit_paths(context, 'split')
+		self.assertEqual([[x.dic['name'] for x in path['candidate_for_overflow']] for path in inspected_paths], [['c']])
+
+		with mock.patch.object(astvisitor, 'MAX_PATH_NODES', 1):
+			with self.assertRaises(Exception) as raised:
+				visit_paths(context, 'split')
+		self.assertEqual(raised.exception.args, ('AstVisitErr', 'Every path exceeds the budget of the enumeration'))
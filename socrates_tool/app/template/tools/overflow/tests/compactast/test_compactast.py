@@ -0,0 +1,152 @@
+import os
+import tempfile
+from unittest import TestCase
+from models import compactast
+from modules import asthelper
+
+
+def build_ast():
+	return [{
+		'nodeType': 'SourceUnit', 'id': 1, 'src': '0:300:0',
+		'nodes': [
+			{'nodeType': 'PragmaDirective', 'id': 2, 'src': '0:24:0', 'literals': ['solidity', '^', '0.4', '.24']},
+			{'nodeType': 'ContractDefinition', 'id': 3, 'name': 'A', 'src': '26:270:0', 'linearizedBaseContracts': [3], 'nodes': [
+				{'nodeType': 'VariableDeclaration', 'id': 4, 'name': 'a', 'stateVariable': True, 'src': '40:6:0', 'value': None},
+				{'nodeType': 'EventDefinition', 'id': 5, 'name': 'E', 'src': '50:10:0'},
+				{'nodeType': 'FunctionDefinition', 'id': 6, 'name': 'f', 'src': '60:100:0', 'body': {
+					'nodeType': 'Block', 'id': 7, 'src': '80:80:0', 'statements': [
+						{'nodeType': 'VariableDeclarationStatement', 'id': 8, 'src': '90:10:0', 'declarations': [
+							{'nodeType': 'VariableDeclaration', 'id': 9, 'name': 'b', 'stateVariable': False, 'src': '90:6:0'}
+						]},
+						{'nodeType': 'ExpressionStatement', 'id': 10, 'src': '100:2:0', 'expression': {
+							'nodeType': 'Identifier', 'id': 11, 'name': 'a', 'referencedDeclaration': 4, 'src': '100:1:0'
+						}}
+					]
+				}},
+				{'nodeType': 'FunctionDefinition', 'id': 12, 'name': 'g', 'src': '170:100:0', 'body': {
+					'nodeType': 'Block', 'id': 13, 'src': '180:10:0', 'statements': []
+				}}
+			]}
+		]
+	}]
+
+
+def build_copies():
+	# the same contract flattened twice, with other ids and src
+	def contract(first_id, start):
+		return {'nodeType': 'ContractDefinition', 'id': first_id, 'name': 'SafeMath', 'src': '{}:100:0'.format(start), 'nodes': [
+			{'nodeType': 'VariableDeclaration', 'id': first_id + 1, 'name': 'a', 'stateVariable': True, 'src': '{}:6:0'.format(start + 10),
+				'scope': first_id, 'typeDescriptions': {'typeIdentifier': 't_contract$_SafeMath_${}'.format(first_id)}},
+			{'nodeType': 'FunctionDefinition', 'id': first_id + 2, 'name': 'f', 'src': '{}:50:0'.format(start + 20), 'scope': first_id, 'body': {
+				'nodeType': 'Block', 'id': first_id + 3, 'src': '{}:40:0'.format(start + 30), 'statements': [
+					{'nodeType': 'Identifier', 'id': first_id + 4, 'name': 'a', 'referencedDeclaration': first_id + 1,
+						'overloadedDeclarations': [first_id + 2], 'src': '{}:1:0'.format(start + 35)}
+				]
+			}}
+		]}
+
+	return [{'nodeType': 'SourceUnit', 'id': 1, 'src': '0:300:0', 'nodes': [contract(10, 0), contract(30, 100)]}]
+
+
+class TestCompactAst(TestCase):
+
+	def test_same_results_as_the_index(self):
+		ast_index = asthelper.index(build_ast())
+		compact = asthelper.compact(build_ast())
+		queries = [
+			{'nodeType': 'VariableDeclaration'},
+			{'nodeType': 'VariableDeclaration', 'stateVariable': True},
+			{'nodeType': '.*Statement'},
+			{'name': '^a$'},
+			{'src': '^100:'},
+			{'nodeType': 'ContractDefinition'},
+			{'value': 'None'}
+		]
+
+		for query in queries:
+			expected = asthelper.find_all_nodes(ast_index, query)
+			found = asthelper.find_all_nodes(compact, query)
+			self.assertEqual([x.dic for x in expected], [x.dic for x in found])
+
+	def test_decodes_only_what_is_returned(self):
+		compact = asthelper.compact(build_ast())
+
+		function = asthelper.find_node(compact, {'nodeType': 'FunctionDefinition', 'name': '^f$'})
+		self.assertEqual(function['id'], 6)
+		self.assertEqual(len(compact._decoded), 1)
+
+		# queries on the subtree of a decoded node
+		identifier = asthelper.find_node(function['body'], {'nodeType': 'Identifier'}, compact)
+		self.assertEqual(identifier['referencedDeclaration'], 4)
+		self.assertEqual(asthelper.find_parent(identifier, {'nodeType': 'Block'})['id'], 7)
+		self.assertFalse(asthelper.find_parent(identifier, {'nodeType': 'ContractDefinition'}))
+		self.assertEqual(len(compact._decoded), 1)
+
+		# the parents outside the decoded nodes are decoded when read
+		self.assertEqual(asthelper.find_parent(function, {'nodeType': 'ContractDefinition'})['name'], 'A')
+
+	def test_whole_tree(self):
+		compact = asthelper.compact(build_ast())
+		self.assertEqual(compact.node(11)['name'], 'a')
+		self.assertEqual(compact.parent(compact.node(9))['id'], 8)
+		self.assertEqual(compact.ast, build_ast())
+		self.assertIs(compact.ast[0]['nodes'][1]['nodes'][2], compact.node(6))
+
+	def test_snapshot(self):
+		compact = asthelper.compact(build_ast())
+
+		with tempfile.TemporaryDirectory() as folder:
+			path = os.path.join(folder, 'snapshot.ast')
+			with open(path, 'wb') as f:
+				compact.save(f, {'filename': 'A.sol'})
+
+			snapshot = compactast.CompactAst.load(path)
+
+			self.assertEqual(snapshot.metadata, {'filename': 'A.sol'})
+			self.assertEqual(snapshot.node_types(), compact.node_types())
+
+			for query in [{'nodeType': 'FunctionDefinition', 'name': '^g$'}, {'name': '^a$'}, {'nodeType': '.*Statement'}]:
+				expected = asthelper.find_all_nodes(compact, query)
+				found = asthelper.find_all_nodes(snapshot, query)
+				self.assertEqual([x.dic for x in expected], [x.dic for x in found])
+
+			self.assertEqual(snapshot.ast, build_ast())
+
+	def test_not_a_snapshot(self):
+		with tempfile.TemporaryDirectory() as folder:
+			path = os.path.join(folder, 'snapshot.ast')
+			with open(path, 'wb') as f:
+				f.write(b'{"nodeType": "SourceUnit"}')
+
+			with self.assertRaises(ValueError):
+				compactast.CompactAst.load(path)
+
+	def test_copies_share_the_payload(self):
+		compact = asthelper.compact(build_copies())
+
+		# root, two members for each contract, one payload for each copy of a member
+		self.assertEqual(len(compact._unit_payloads), 5)
+		self.assertEqual(len(compact._payloads), 3)
+
+		self.assertEqual(compact.node(34)['referencedDeclaration'], 31)
+		self.assertEqual(compact.node(31)['typeDescriptions']['typeIdentifier'], 't_contract$_SafeMath_$30')
+		self.assertEqual(compact.ast, build_copies())
+
+		functions = asthelper.find_all_nodes(compact, {'nodeType': 'FunctionDefinition'})
+		hashes = [asthelper.structural_hash(x.dic, compact) for x in functions]
+		self.assertEqual(hashes[0], hashes[1])
+		self.assertEqual(hashes[0], asthelper.structural_hash(build_copies()[0]['nodes'][0]['nodes'][1]))
+		self.assertNotEqual(hashes[0], asthelper.structural_hash(build_ast()[0]['nodes'][1]['nodes'][2]))
+
+	def test_nodes_at_offsets(self):
+		for ast_index in [asthelper.index(build_ast()), asthelper.compact(build_ast())]:
+			self.assertEqual(ast_index.node_at_offset(95)['id'], 9)
+			self.assertEqual(ast_index.node_at_offset(100)['id'], 11)
+			self.assertEqual(ast_index.node_at_offset(175)['id'], 12)
+			self.assertEqual(ast_index.node_at_offset(25)['id'], 1)
+			self.assertIsNone(ast_index.node_at_offset(300))
+			self.assertIsNone(ast_index.node_at_offset(0, 1))
+
+			self.assertEqual([x['id'] for x in ast_index.nodes_overlapping(85, 101)], [1, 3, 6, 7, 8, 9, 10, 11])
+			self.assertEqual([x['id'] for x in ast_index.nodes_overlapping(100, 100)], [1, 3, 6, 7, 10, 11])
+			self.assertEqual(ast_index.nodes_overlapping(300, 400), [])
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase, mock
+from modules import compilecache
+
+
+class Test_compilecache(TestCase):
+
+	def setUp(self):
+		self.original_cache_dir = compilecache.CACHE_DIR
+		compilecache.CACHE_DIR = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(compilecache.CACHE_DIR, ignore_errors=True)
+		compilecache.CACHE_DIR = self.original_cache_dir
+
+	def test_put_and_get(self):
+		key = compilecache.make_key(b'contract A {}', ['--ast-compact-json'])
+		self.assertIsNone(compilecache.get(key))
+		compilecache.put(key, [{'nodeType': 'SourceUnit'}])
+		self.assertEqual(compilecache.get(key), [{'nodeType': 'SourceUnit'}])
+
+	def test_key_depends_on_flags(self):
+		source = b'contract A {}'
+		self.assertNotEqual(compilecache.make_key(source, ['--abi']), compilecache.make_key(source, ['--ast-compact-json']))
+		self.assertNotEqual(compilecache.make_key(source, ['--abi']), compilecache.make_key(b'contract B {}', ['--abi']))
+
+	def test_corrupted_entry_is_a_miss(self):
+		key = compilecache.make_key(b'contract A {}', ['--abi'])
+		compilecache.put(key, {'A': []})
+		with open(compilecache._entry_path(key), 'wb') as f:
+			f.write(b'not compressed')
+		self.assertIsNone(compilecache.get(key))
+		self.assertFalse(os.path.exists(compilecache._entry_path(key)))
+
+	def test_evict_least_recently_used(self):
+		old_key = compilecache.make_key(b'old', ['--abi'])
+		new_key = compilecache.make_key(b'new', ['--abi'])
+		compilecache.put(old_key, {'A': []})
+		compilecache.put(new_key, {'B': []})
+
+		now = time.time()
+		os.utime(compilecache._entry_path(old_key), (now - 100, now - 100))
+
+		compilecache.evict(os.path.getsize(compilecache._entry_path(new_key)))
+		self.assertIsNone(compilecache.get(old_key))
+		self.assertEqual(compilecache.get(new_key), {'B': []})
+
+	def test_evict_keeps_the_files_being_written(self):
+		key = compilecache.make_key(b'contract A {}', ['--abi'])
+		compilecache.put(key, {'A': []})
+
+		# the temporary file of a put of another process
+		tmp_path = os.path.join(os.path.dirname(compilecache._entry_path(key)), 'entry.tmp')
+		with open(tmp_path, 'wb') as f:
+			f.write(b'partial')
+
+		compilecache.evict(0)
+		self.assertIsNone(compilecache.get(key))
+		self.assertTrue(os.path.exists(tmp_path))
+
+		# the temporary files left by a process which stopped are removed
+		old = time.time() - compilecache.TMP_MAX_AGE - 1
+		os.utime(tmp_path, (old, old))
+		compilecache.evict(0)
+		self.assertFalse(os.path.exists(tmp_path))
+
+	def test_put_walks_the_cache_when_needed(self):
+		keys = [compilecache.make_key(str(i).encode('utf8'), ['--abi']) for i in range(6)]
+
+		with mock.patch.object(compilecache, 'evict', wraps=compilecache.evict) as evict, \
+				mock.patch.object(compilecache, 'EVICT_INTERVAL', 4):
+			# the first put of the process walks the cache, then every EVICT_INTERVAL puts
+			for key in keys:
+				compilecache.put(key, {'A': []})
+			self.assertEqual(evict.call_count, 2)
+
+			# and when the size put exceeds the bound
+			with mock.patch.object(compilecache, 'MAX_CACHE_SIZE', 1):
+				compilecache.put(keys[0], {'A': []})
+			self.assertEqual(evict.call_count, 3)
+
+	def test_put_and_get_file(self):
+		key = compilecache.make_key(b'contract A {}', ['--standard-json'])
+		self.assertIsNone(compilecache.get_file(key, '.ast'))
+
+		compilecache.put_file(key, '.ast', lambda f: f.write(b'snapshot'))
+		with open(compilecache.get_file(key, '.ast'), 'rb') as f:
+			self.assertEqual(f.read(), b'snapshot')
+
+		# entries with a different extension are independent
+		self.assertIsNone(compilecache.get(key))
+
+		compilecache.remove(key, '.ast')
+		self.assertIsNone(compilecache.get_file(key, '.ast'))
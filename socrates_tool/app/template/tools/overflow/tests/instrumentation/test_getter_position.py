@@ -0,0 +1,44 @@
+from unittest import TestCase
+from modules import asthelper
+from utils import instrumentation
+
+"""
+	_getter_position
+
+	The getter of a state variable is added at the end of the line of its declaration,
+	or just after the declaration if the line continues inside another member of the contract.
+	The offsets are the ones of the source unit instrumented, which is not always the first one
+	of the compilation (es. a source with imports).
+"""
+
+SOURCE = b'contract A {\n    uint[] a; // list\n    uint[] b; function f() public {\n    }\n}\n'
+
+
+def src(text, source_index=1):
+	start = SOURCE.index(text)
+	return '{}:{}:{}'.format(start, len(text), source_index)
+
+
+def build_ast():
+	def state_variable(node_id, name):
+		return {'nodeType': 'VariableDeclaration', 'id': node_id, 'name': name, 'stateVariable': True, 'src': src(b'uint[] ' + name.encode('utf8'))}
+
+	f = {'nodeType': 'FunctionDefinition', 'id': 4, 'name': 'f', 'src': src(b'function f() public {\n    }')}
+	contract = {'nodeType': 'ContractDefinition', 'id': 1, 'name': 'A', 'src': src(SOURCE.rstrip(b'\n')), 'nodes': [state_variable(2, 'a'), state_variable(3, 'b'), f]}
+	return asthelper.compact([{'nodeType': 'SourceUnit', 'id': 0, 'src': src(SOURCE), 'nodes': [contract]}])
+
+
+class TestGetter_position(TestCase):
+
+	def test_getter_position(self):
+		ast = build_ast()
+		source_index = instrumentation._source_index(ast)
+		self.assertEqual(source_index, 1)
+
+		a, b = [x for x in asthelper.find_all_nodes(ast, {'nodeType': 'VariableDeclaration'})]
+
+		# after the comment, at the end of the line
+		self.assertEqual(instrumentation._getter_position(ast, SOURCE, a, source_index), SOURCE.index(b'\n', SOURCE.index(b'// list')))
+
+		# the line continues in the function, just after the semicolon
+		self.assertEqual(instrumentation._getter_position(ast, SOURCE, b, source_index), SOURCE.index(b'uint[] b;') + len(b'uint[] b;'))
@@ -0,0 +1,64 @@
+import argparse
+import os
+import z3
+from unittest import TestCase
+from modules.astvisitor import visit_context, visit_paths
+from modules.mapper import paths_to_z3
+from tests.astbuilder import identifier, index_access, assignment, for_statement, variable, function, contract, source_unit
+
+"""
+	paths_to_z3
+
+	The generated script is run with the helpers of the template, the state
+	variables read from the blockchain are constants.
+"""
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', '..', 'resources', 'top_template.txt')
+
+
+def run_script(generated_code, state_value):
+	with open(TEMPLATE, 'r') as template_file:
+		template = template_file.read()
+	helpers = template[template.index('# === CONSTANTS ==='):template.index('def get_state_variable')]
+
+	script = {}
+	exec('from z3 import *\nimport itertools\n' + helpers, script)
+	script.update({
+		'get_state_variable': lambda contract_instance, base, *args: state_value,
+		'contract_instance': None, 'args': argparse.Namespace(distinct=False),
+		'accounts_concrete': [0, 1, 2], 'accounts_len': 3, 'user_address_index': 0, 'null_address_index': 4, 'solver': z3.Solver()
+	})
+	exec("msg_sender, msg_value, msg_gas = Ints('msg_sender msg_value msg_gas')\n" + generated_code, script)
+	return script
+
+
+def build_ast():
+	# function batch(address[] receivers, uint n, uint value) public { for (uint i = 0; i < n; i++) { balances[receivers[i]] += value; } }
+	balances_type = 'mapping(address => uint256)'
+	receiver = index_access(54, identifier(55, 'receivers', 14, 'address[] memory'), identifier(56, 'i', 20), 'address')
+	body = [assignment(50, '+=', index_access(52, identifier(53, 'balances', 2, balances_type), receiver), identifier(57, 'value', 18))]
+	batch = function(10, 'batch', [variable(14, 'receivers', 'address[] memory'), variable(16, 'n'), variable(18, 'value')], [
+		for_statement(30, 20, identifier(40, 'n', 16), body)
+	])
+	return source_unit([contract(1, 'C', [variable(2, 'balances', balances_type, True), batch])])
+
+
+class TestPaths_to_z3(TestCase):
+
+	def test_mapping_update_in_loop(self):
+		generated_code = paths_to_z3(visit_paths(visit_context(build_ast(), 'C'), 'batch'))
+		script = run_script(generated_code, 10)
+		solver = script['solver']
+
+		# the balance of a receiver overflows
+		self.assertEqual(solver.check(), z3.sat)
+		model = solver.model()
+		self.assertLess(model.eval(script['i_any']).as_long(), model.eval(script['receivers_length']).as_long())
+
+		# the update is not read out of the array, nor from an unconstrained element of the mapping
+		solver.push()
+		solver.add(script['i_any'] >= script['receivers_length'])
+		self.assertEqual(solver.check(), z3.unsat)
+		solver.pop()
+		solver.add(script['balances_update'] < 0)
+		self.assertEqual(solver.check(), z3.unsat)
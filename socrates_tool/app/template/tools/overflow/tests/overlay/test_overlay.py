@@ -0,0 +1,47 @@
+import json
+from unittest import TestCase
+from models import overlay
+
+
+def build_statement():
+	return {'nodeType': 'ExpressionStatement', 'id': 1, 'expression': {
+		'nodeType': 'BinaryOperation', 'id': 2, 'operator': '>',
+		'leftExpression': {'nodeType': 'BinaryOperation', 'id': 3, 'operator': '+',
+			'leftExpression': {'nodeType': 'Identifier', 'id': 4, 'name': 'a'},
+			'rightExpression': {'nodeType': 'Literal', 'id': 5, 'value': '1'}},
+		'rightExpression': {'nodeType': 'Identifier', 'id': 6, 'name': 'a'}
+	}}
+
+
+class TestOverlay(TestCase):
+
+	def test_the_ast_is_not_modified(self):
+		statement = build_statement()
+		original = json.dumps(statement)
+		annotations = overlay.Overlay()
+
+		addition = statement['expression']['leftExpression']
+		copy = annotations.annotate(addition, {'name': 'exp_3', 'nodeType': 'Identifier'})
+		self.assertIs(annotations.annotate(addition, {'checked': True}), copy)
+		self.assertIs(annotations.get(addition), copy)
+		self.assertEqual(json.dumps(statement), original)
+
+		resolved = annotations.resolve(statement)
+		self.assertEqual(resolved['expression']['leftExpression']['name'], 'exp_3')
+		self.assertTrue(resolved['expression']['leftExpression']['checked'])
+		self.assertEqual(json.dumps(statement), original)
+
+		# only the path to the annotated node is copied
+		self.assertIsNot(resolved, statement)
+		self.assertIsNot(resolved['expression'], statement['expression'])
+		self.assertIs(resolved['expression']['rightExpression'], statement['expression']['rightExpression'])
+		self.assertIs(resolved['expression']['leftExpression']['leftExpression'], addition['leftExpression'])
+
+	def test_without_annotations(self):
+		statement = build_statement()
+		annotations = overlay.Overlay()
+		self.assertIs(annotations.resolve(statement), statement)
+
+		annotations.annotate(statement['expression']['rightExpression'], {'name': 'b'})
+		self.assertIs(annotations.resolve(statement['expression']['leftExpression']), statement['expression']['leftExpression'])
+		self.assertEqual(overlay.Overlay().resolve(statement), build_statement())
@@ -0,0 +1,60 @@
+from unittest import TestCase
+from modules import asthelper
+
+_ids = []
+
+
+def parameter(type_name):
+	_ids.append(len(_ids) + 100)
+	return {'nodeType': 'VariableDeclaration', 'id': _ids[-1], 'name': '',
+		'typeName': {'nodeType': 'ElementaryTypeName', 'name': type_name}}
+
+
+def function(name, parameters, returns, implemented=True):
+	_ids.append(len(_ids) + 100)
+	return {'nodeType': 'FunctionDefinition', 'id': _ids[-1], 'name': name, 'implemented': implemented,
+		'parameters': {'nodeType': 'ParameterList', 'parameters': [parameter(x) for x in parameters]},
+		'returnParameters': {'nodeType': 'ParameterList', 'parameters': [parameter(x) for x in returns]}}
+
+
+def build_ast():
+	def basic():
+		return [
+			function('transfer', ['address', 'uint'], ['bool']),
+			function('balanceOf', ['address'], ['uint256'])
+		]
+
+	def standard():
+		return [
+			function('transferFrom', ['address', 'address', 'uint256'], ['bool']),
+			function('approve', ['address', 'uint256'], ['bool']),
+			function('allowance', ['address', 'address'], ['uint256'])
+		]
+
+	return [{'nodeType': 'SourceUnit', 'id': 1, 'nodes': [
+		{'nodeType': 'ContractDefinition', 'id': 2, 'name': 'Basic', 'linearizedBaseContracts': [2], 'nodes': basic()},
+		{'nodeType': 'ContractDefinition', 'id': 3, 'name': 'Standard', 'linearizedBaseContracts': [3, 2], 'nodes': standard()},
+		{'nodeType': 'ContractDefinition', 'id': 4, 'name': 'Token', 'linearizedBaseContracts': [4, 3, 2], 'nodes': basic() + standard()},
+		{'nodeType': 'ContractDefinition', 'id': 5, 'name': 'Abstract', 'linearizedBaseContracts': [5], 'nodes': [
+			function(x['name'], [], [], implemented=False) for x in basic() + standard()
+		]}
+	]}]
+
+
+class TestSignatureIndex(TestCase):
+
+	def test_signatures(self):
+		signature_index = asthelper.signature_index(build_ast())
+		basic = signature_index.contracts[0]
+		self.assertEqual(signature_index.signatures(basic), {'transfer(address,uint256)returns(bool)', 'balanceOf(address)returns(uint256)'})
+		self.assertEqual(signature_index.signatures(signature_index.contracts[3]), set())
+
+	def test_erc20(self):
+		for ast in [build_ast(), asthelper.index(build_ast()), asthelper.compact(build_ast())]:
+			self.assertEqual(asthelper.isERC20(ast)['name'], 'Token')
+
+		signature_index = asthelper.signature_index(build_ast())
+		implementing = signature_index.implementing(asthelper.ERC20_INTERFACE, inherited=True)
+		self.assertEqual([x['name'] for x in implementing], ['Standard', 'Token'])
+
+		self.assertIsNone(asthelper.isERC20(build_ast()[0]['nodes'][0]))
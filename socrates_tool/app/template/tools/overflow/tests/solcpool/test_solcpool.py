@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+from unittest import TestCase
+from modules import solcpool
+from tests import stubsolc
+
+
+def request(name, content='contract A {}'):
+	return {'sources': {name: {'content': content}}, 'output_selection': {'': ['ast']}}
+
+
+class TestSolcpool(TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.binary, self.log = stubsolc.write_stub_solc(self.folder)
+
+		# a single worker takes the whole batch
+		self.pool = solcpool.SolcPool(workers=1, binary=self.binary)
+
+	def tearDown(self):
+		self.pool.close()
+		shutil.rmtree(self.folder, ignore_errors=True)
+
+	def test_batch_is_compiled_once(self):
+		futures = self.pool.submit_batch([request('A.sol'), request('B.sol'), request('C.sol')])
+		outputs = [x.result() for x in futures]
+
+		self.assertEqual(stubsolc.invocations(self.log), [['A.sol', 'B.sol', 'C.sol']])
+
+		# each request receives the output of its own sources
+		self.assertEqual([list(x['sources']) for x in outputs], [['A.sol'], ['B.sol'], ['C.sol']])
+		self.assertEqual([x['errors'] for x in outputs], [[], [], []])
+
+	def test_batch_is_split_by_max_batch_size(self):
+		self.pool.close()
+		self.pool = solcpool.SolcPool(workers=1, max_batch_size=2, binary=self.binary)
+
+		futures = self.pool.submit_batch([request('A.sol'), request('B.sol'), request('C.sol')])
+		self.assertEqual([list(x.result()['sources']) for x in futures], [['A.sol'], ['B.sol'], ['C.sol']])
+		self.assertEqual(stubsolc.invocations(self.log), [['A.sol', 'B.sol'], ['C.sol']])
+
+	def test_failing_request_is_compiled_on_its_own(self):
+		futures = self.pool.submit_batch([request('A.sol'), request('B.sol', 'contract B { error }'), request('C.sol')])
+		outputs = [x.result() for x in futures]
+
+		# the batch, then the failing request alone and the others together again
+		self.assertEqual(stubsolc.invocations(self.log), [['A.sol', 'B.sol', 'C.sol'], ['B.sol'], ['A.sol', 'C.sol']])
+
+		self.assertEqual([e['sourceLocation']['file'] for e in outputs[1]['errors']], ['B.sol'])
+		self.assertEqual(outputs[0]['errors'], [])
+		self.assertEqual(list(outputs[2]['sources']), ['C.sol'])
+
+	def test_split_output_attributes_errors_by_file(self):
+		output = {
+			'sources': {'A.sol': {'id': 0}, 'B.sol': {'id': 1}},
+			'contracts': {'A.sol': {'A': {}}, 'B.sol': {'B': {}}},
+			'errors': [
+				{'severity': 'warning', 'message': 'a', 'sourceLocation': {'file': 'A.sol'}},
+				{'severity': 'error', 'message': 'b', 'sourceLocation': {'file': 'B.sol'}},
+				{'severity': 'error', 'message': 'no location'}
+			]
+		}
+		a_request = solcpool._Request({'A.sol': {'content': ''}}, {'': ['ast']}, [], ['A.sol'])
+		b_request = solcpool._Request({'B.sol': {'content': ''}}, {'': ['ast']}, [], ['B.sol'])
+
+		a_output = solcpool.SolcPool._split_output(output, a_request, False)
+		self.assertEqual(a_output['sources'], {'A.sol': {'id': 0}})
+		self.assertEqual(a_output['contracts'], {'A.sol': {'A': {}}})
+		self.assertEqual([e['message'] for e in a_output['errors']], ['a'])
+		self.assertEqual([e['message'] for e in solcpool.SolcPool._split_output(output, b_request, False)['errors']], ['b'])
+
+		# the output of a request compiled on its own is returned as it is
+		self.assertIs(solcpool.SolcPool._split_output(output, a_request, True), output)
@@ -0,0 +1,51 @@
+import json
+import os
+import stat
+import sys
+
+"""
+	solc --standard-json stand-in for the tests which do not need the compiler:
+	it logs the sources of each invocation and reports an error for each source
+	containing 'error'. The AST of a source is a SourceUnit without nodes.
+"""
+
+STUB_SOLC = """#!{executable}
+import json
+import sys
+
+standard_input = json.loads(sys.stdin.read())
+with open({log!r}, 'a') as log:
+	log.write(json.dumps(sorted(standard_input['sources'])) + '\\n')
+
+output = {{'sources': {{}}, 'contracts': {{}}, 'errors': []}}
+for i, (name, source) in enumerate(sorted(standard_input['sources'].items())):
+	output['sources'][name] = {{'id': i, 'ast': {{'nodeType': 'SourceUnit', 'id': i, 'absolutePath': name, 'nodes': []}}}}
+	output['contracts'][name] = {{}}
+	if 'error' in source['content']:
+		output['errors'].append({{'severity': 'error', 'type': 'ParserError', 'formattedMessage': name + ': broken',
+			'message': 'broken', 'sourceLocation': {{'file': name, 'start': 0, 'end': 1}}}})
+print(json.dumps(output))
+"""
+
+
+def write_stub_solc(folder):
+	"""
+	Writes the stub in the folder
+	:return: (path of the binary, path of the log of its invocations)
+	"""
+	binary = os.path.join(folder, 'solc')
+	log = os.path.join(folder, 'invocations.log')
+	with open(binary, 'w') as f:
+		f.write(STUB_SOLC.format(executable=sys.executable, log=log))
+	os.chmod(binary, os.stat(binary).st_mode | stat.S_IEXEC)
+	return binary, log
+
+
+def invocations(log):
+	"""
+	Returns the source names of each invocation of the stub, in order
+	"""
+	if not os.path.exists(log):
+		return []
+	with open(log, 'r') as f:
+		return [json.loads(x) for x in f.read().splitlines()]
@@ -8,17 +8,77 @@ sys.path.append("./tools/overflow")
 
 from modules import asthelper
 
+# =============
+# === SPANS ===
+# =============
+
+
+def _span(node) -> tuple:
+    """
+    Returns the byte offsets (start, end) of the node in the source
+    """
+    start, length, _ = node['src'].split(':')
+    start = int(start)
+    return start, start + int(length)
+
+
+def _replace_spans(source: str, edits: list) -> str:
+    """
+    Applies the edits to the source, without searching the text to edit
+    :param edits: list of (start, end, text), start and end are byte offsets as in the src of the nodes.
+    An edit overlapping a previous one (es. in the body of an edited if) is skipped.
+    :return: edited source code
+    """
+    encoded = source.encode('utf8')
+    pieces = []
+    position = 0
+
+    for start, end, text in sorted(edits, key=lambda x: x[0]):
+        if start < position:
+            continue
+        pieces += [encoded[position:start], text.encode('utf8', 'surrogateescape')]
+        position = end
+
+    pieces.append(encoded[position:])
+    return b''.join(pieces).decode('utf8')
+
+
+def _text(source: bytes, start: int, end: int) -> str:
+    # a span can end in the middle of a character, it is encoded back as it was
+    return source[start:end].decode('utf8', 'surrogateescape')
+
+
 # ==============
 # === GETTER ===
 # ==============
 
 
-def _inject_getter_function(source, list_name):
-    before_index = source.index(list_name) + source[source.index(list_name):].index('\n')
-    before = source[:before_index]
-    after = source[before_index:]
-    middle = " function get_{0}_len() public constant returns(uint count) {{  return {0}.length;  }}".format(list_name)
-    return before + middle + after
+def _source_index(ast) -> int:
+    """
+    Returns the index of the source unit being instrumented, the one of the offsets in the src of its nodes
+    (solc numbers the source units of a compilation, the imported ones are not in the AST of compile_from_source)
+    """
+    source_unit = asthelper.find_node(ast, {'nodeType': '^SourceUnit$'})
+    return int(source_unit['src'].split(':')[2])
+
+
+def _getter_position(ast, source: bytes, declaration, source_index: int) -> int:
+    """
+    Returns where the getter of the state variable can be added: at the end of the line of the
+    declaration, or just after it if the line continues with another member of the contract
+    :param source_index: index of the source unit of the declaration (see _source_index)
+    """
+    _, end = _span(declaration)
+    line_end = source.find(b'\n', end)
+    if line_end == -1:
+        line_end = len(source)
+
+    node = ast.node_at_offset(line_end, source_index)
+    if node is not None and node['nodeType'] == 'ContractDefinition':
+        return line_end
+
+    # after the semicolon
+    return end + 1
 
 
 def inject_getter_functions(source: str):
@@ -27,19 +87,22 @@ def inject_getter_functions(source: str):
     :param source: original source code
     :return: edited source code
     """
-    ast = asthelper.compile_from_source(source)
+    ast = asthelper.compile_from_source(source, compact=True)
 
     state_variables = \
         [x for x in asthelper.find_all_nodes(ast, {'nodeType': 'VariableDeclaration', 'stateVariable': True})]
 
     state_variables_list = [x for x in state_variables if 't_array' in x['typeDescriptions']['typeIdentifier']]
-    state_variables_names = [x['name'] for x in state_variables_list]
 
-    edited_source = source
-    for state_variable in state_variables_names:
-        edited_source = _inject_getter_function(edited_source, state_variable)
+    encoded = source.encode('utf8')
+    source_index = _source_index(ast)
+    edits = []
+    for state_variable in state_variables_list:
+        position = _getter_position(ast, encoded, state_variable, source_index)
+        getter = " function get_{0}_len() public constant returns(uint count) {{  return {0}.length;  }}".format(state_variable['name'])
+        edits.append((position, position, getter))
 
-    return edited_source
+    return _replace_spans(source, edits)
 
 
 # ===========================
@@ -54,24 +117,21 @@ def all_declarations_public(source: str) -> str:
     :return: edited_source: str
     """
 
-    ast = asthelper.compile_from_source(source)
+    ast = asthelper.compile_from_source(source, compact=True)
 
     nodes = asthelper.find_all_nodes(ast, {'nodeType': 'VariableDeclaration', 'stateVariable': True})
-    destination = source
+    encoded = source.encode('utf8')
+    edits = []
 
     declaration_re = re.compile(r"(address|string|bool|bytes?\d*|u?int\d*|mapping.*\))(\[\d*\]|)?\s*(public|private|internal|external|)?\s+(\w+)\s*(;|=)")
 
     for n in nodes:
-        start, length, _ = n['src'].split(':')
-        start = int(start); length = int(length)
-        line = source[start:start+length+1]
-    #    print("before: ", line)
-        left, right = tuple(destination.split(line, 1))
+        start, end = _span(n)
+        line = _text(encoded, start, end + 1)
         middle = declaration_re.sub(r"\g<1>\g<2> public \g<4> \g<5>", line)
-        destination = left + middle + right
-    #    print("after: ", middle)
+        edits.append((start, end + 1, middle))
 
-    return destination
+    return _replace_spans(source, edits)
 
 
 # ===================================
@@ -84,35 +144,34 @@ def ifrevert2require(source: str) -> str:
     :param source:
     :return:
     """
-    ast = asthelper.compile_from_source(source)
+    ast = asthelper.compile_from_source(source, compact=True)
     if_nodes = asthelper.find_all_nodes(ast, {'nodeType': '^IfStatement$'})
 
-    edited_source = source
+    edits = []
 
     for node in if_nodes:
 
         try:
-            reverts = asthelper.find_node(node['trueBody'], {'nodeType': '^Identifier$', 'name': '^revert$'})
+            true_body = asthelper.find_all_nodes_by_query(node['trueBody'], {
+                'reverts': {'nodeType': '^Identifier$', 'name': '^revert$'},
+                'returns': {'nodeType': '^Return$'},
+                'false_literals': {'nodeType': '^Literal$', 'value': '^false$'}
+            })
+            reverts = true_body['reverts']
 
             # Check for return false
             return_false = False
             if 'statements' in node['trueBody']:
                 if_statements = node['trueBody']['statements']
                 if len(if_statements) == 1:
-                    return_statement = asthelper.find_node(node['trueBody'], {'nodeType': '^Return$'})
-                    if return_statement and asthelper.find_node(node['trueBody'], {'nodeType': '^Literal$', 'value': '^false$'}):
+                    if true_body['returns'] and true_body['false_literals']:
                         return_false = True
             elif 'expression' in node['trueBody']:
-                return_statement = asthelper.find_node(node['trueBody'], {'nodeType': '^Return$'})
-                if return_statement and asthelper.find_node(node['trueBody'], {'nodeType': '^Literal$', 'value': '^false$'}):
+                if true_body['returns'] and true_body['false_literals']:
                     return_false = True
 
             if reverts or return_false:
-                start, length, _ = node['src'].split(':')
-                start = int(start)
-                length = int(length)
-                line = source[start:start + length + 1]
-                left, right = tuple(edited_source.split(line, 1))
+                start, end = _span(node)
 
                 # other way
                 # new_line = line.replace('if', 'require')
@@ -121,13 +180,13 @@ def ifrevert2require(source: str) -> str:
 
                 if_condition = asthelper.astnode.AstNode(None, node['condition']).to_sol_string()
                 require_statement = 'require(({}) == false);\n'.format(if_condition)
-                edited_source = left + require_statement + right
+                edits.append((start, end + 1, require_statement))
         except Exception as e:
             # an error while editing some if, maybe contains a function
             # just skip
             continue
 
-    return edited_source
+    return _replace_spans(source, edits)
 
 
 def throw2revert(source: str) -> str:
@@ -161,24 +220,27 @@ def convert_fallback_function(source: str) -> str:
 
 def convert_reassignment(source: str) -> str:
     regex = r"^[\s|\t]*([^\s]+)\s+(\+|\-|\*)?=\s+([^;]*)"
-    ast = asthelper.compile_from_source(source)
+    ast = asthelper.compile_from_source(source, compact=True)
     assigment_nodes = asthelper.find_all_nodes(ast, {'nodeType': '^Assignment$'})
 
-    edited_source = source
+    encoded = source.encode('utf8')
+    edits = []
 
     for node in assigment_nodes:
-        start, length, _ = node['src'].split(':')
-        start = int(start)
-        length = int(length)
-        line = source[start:start + length + 1]
-        line_rgx = r'^[\s|\t]*' + re.escape(line)
-        pieces = re.compile(line_rgx, re.M).split(edited_source, 1)
-
-        if len(pieces) != 2:
-            # not exact "LINE" match found
-            continue
+        start, end = _span(node)
+        line = _text(encoded, start, end + 1)
+
+        # the assignment must start its line, the indentation is replaced too
+        line_start = start
+        while line_start > 0 and encoded[line_start - 1:line_start].isspace():
+            line_start -= 1
+        if line_start > 0:
+            first_line_end = encoded.find(b'\n', line_start, start)
+            if first_line_end == -1:
+                # not at the beginning of a line
+                continue
+            line_start = first_line_end + 1
 
-        left, right = tuple(pieces)
         name = 'var nvar_{1}'.format(node['typeDescriptions']['typeString'], node['id'])
 
         new_line = line
@@ -190,9 +252,9 @@ def convert_reassignment(source: str) -> str:
             subst = name + ' = \g<1> \g<2> \g<3>'
             new_line = re.sub(regex, subst, new_line, re.M)
 
-        edited_source = left + new_line + right
+        edits.append((line_start, end + 1, new_line))
 
-    return edited_source
+    return _replace_spans(source, edits)
 
 
 def main(args):